@@ -0,0 +1,229 @@
+"""
+In-memory фейк Supabase: подмножество PostgREST (/rest/v1) и Storage (/storage/v1),
+которого хватает клиенту supabase-py в DataBaseService. Работает как локальный
+aiohttp-сервер с настраиваемой задержкой ответа.
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+# Первичные ключи таблиц; для них генерируются автоинкрементные значения
+PRIMARY_KEYS = {
+    'users': 'user_id',
+    'customer': 'customer_id',
+    'executor': 'executor_id',
+    'subject': 'subject_id',
+    'section': 'section_id',
+    'task_type': 'task_type_id',
+    'task': 'task_id',
+}
+
+_OPERATORS = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a is not None and a > b,
+    'gte': lambda a, b: a is not None and a >= b,
+    'lt': lambda a, b: a is not None and a < b,
+    'lte': lambda a, b: a is not None and a <= b,
+}
+
+
+def _coerce(value: str):
+    """Приводит значение из query string к int/float/bool/None, как это сделал бы Postgres."""
+    if value == 'null':
+        return None
+    if value in ('true', 'false'):
+        return value == 'true'
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value.strip('"')
+
+
+def _parse_filter(raw: str):
+    """Разбирает PostgREST-фильтр вида `eq.5`, `in.(1,2)`, `is.null`, `not.is.null`."""
+    negate = raw.startswith('not.')
+    if negate:
+        raw = raw[4:]
+    op, _, value = raw.partition('.')
+    if op == 'in':
+        values = {_coerce(v) for v in value.strip('()').split(',') if v}
+        check = lambda a: a in values
+    elif op == 'is':
+        expected = _coerce(value)
+        check = lambda a: a is expected
+    else:
+        expected = _coerce(value)
+        compare = _OPERATORS[op]
+        check = lambda a: compare(a, expected)
+    return (lambda a: not check(a)) if negate else check
+
+
+def catalog_rows(subjects: int = 5, sections_per_subject: int = 10, task_types: int = 4) -> dict[str, list[dict]]:
+    """Строки справочников бенчмарка с явными id: одинаковые для фейка Supabase и для SQLite."""
+    sections = [
+        {'section_id': (subject_id - 1) * sections_per_subject + n + 1, 'subject_id': subject_id,
+         'section_name': f"Раздел {subject_id}.{n + 1}"}
+        for subject_id in range(1, subjects + 1) for n in range(sections_per_subject)
+    ]
+    return {
+        'subject': [{'subject_id': i, 'subject_name': f"Предмет {i}"} for i in range(1, subjects + 1)],
+        'section': sections,
+        'task_type': [{'task_type_id': i, 'type_name': f"Тип {i}"} for i in range(1, task_types + 1)],
+    }
+
+
+class FakeSupabase:
+    """Хранилище таблиц и объектов плюс aiohttp-приложение, которое их обслуживает."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tables: dict[str, list[dict]] = {}
+        self.objects: dict[str, bytes] = {}
+        self.calls = Counter()
+        self._sequences = Counter()
+
+    # --- Данные ---
+
+    def seed_catalog(self, **sizes):
+        """Заполняет справочники предметов, разделов и типов задач (см. catalog_rows)."""
+        for table, rows in catalog_rows(**sizes).items():
+            for row in rows:
+                self.insert(table, row)
+
+    def insert(self, table: str, row: dict) -> dict:
+        row = dict(row)
+        pk = PRIMARY_KEYS.get(table)
+        if pk:
+            if row.get(pk) is None:
+                self._sequences[table] += 1
+                row[pk] = self._sequences[table]
+            else:
+                self._sequences[table] = max(self._sequences[table], row[pk])
+        row.setdefault('created_at', time.strftime('%Y-%m-%dT%H:%M:%S'))
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def upsert(self, table: str, row: dict, on_conflict: str | None) -> dict:
+        keys = (on_conflict or PRIMARY_KEYS.get(table, '')).split(',')
+        if all(row.get(k) is not None for k in keys if k):
+            for existing in self.tables.get(table, []):
+                if all(existing.get(k) == row.get(k) for k in keys):
+                    existing.update(row)
+                    return existing
+        return self.insert(table, row)
+
+    def select(self, table: str, filters: list) -> list[dict]:
+        return [row for row in self.tables.get(table, [])
+                if all(check(row.get(column)) for column, check in filters)]
+
+    # --- HTTP ---
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._latency_middleware], client_max_size=64 * 1024 * 1024)
+        app.router.add_route('*', '/rest/v1/{table}', self._handle_rest)
+        app.router.add_post('/storage/v1/object/list/{bucket}', self._handle_list)
+        app.router.add_post('/storage/v1/object/{bucket}/{path:.+}', self._handle_upload)
+        app.router.add_put('/storage/v1/object/{bucket}/{path:.+}', self._handle_upload)
+        # add_get регистрирует и HEAD
+        app.router.add_get('/storage/v1/object/public/{bucket}/{path:.+}', self._handle_download)
+        return app
+
+    @web.middleware
+    async def _latency_middleware(self, request: web.Request, handler):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        return await handler(request)
+
+    async def _handle_rest(self, request: web.Request) -> web.Response:
+        table = request.match_info['table']
+        self.calls[f"{request.method} {table}"] += 1
+
+        filters, order, limit, offset = [], None, None, 0
+        for key, value in request.query.items():
+            if key == 'select' or key == 'on_conflict' or key == 'columns':
+                continue
+            if key == 'order':
+                order = value
+            elif key == 'limit':
+                limit = int(value)
+            elif key == 'offset':
+                offset = int(value)
+            else:
+                filters.append((key, _parse_filter(value)))
+
+        body = await request.json() if request.can_read_body else None
+        prefer = request.headers.get('Prefer', '')
+
+        if request.method == 'GET':
+            rows = self.select(table, filters)
+        elif request.method == 'POST':
+            payload = body if isinstance(body, list) else [body]
+            if 'resolution=merge-duplicates' in prefer:
+                on_conflict = request.query.get('on_conflict')
+                rows = [self.upsert(table, row, on_conflict) for row in payload]
+            else:
+                rows = [self.insert(table, row) for row in payload]
+        elif request.method == 'PATCH':
+            rows = self.select(table, filters)
+            for row in rows:
+                row.update(body)
+        elif request.method == 'DELETE':
+            rows = self.select(table, filters)
+            removed = {id(row) for row in rows}
+            self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in removed]
+        else:
+            raise web.HTTPMethodNotAllowed(request.method, ['GET', 'POST', 'PATCH', 'DELETE'])
+
+        if order:
+            for part in reversed(order.split(',')):
+                column, _, direction = part.partition('.')
+                rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)),
+                              reverse=direction.startswith('desc'))
+        rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+        return web.json_response(rows, status=201 if request.method == 'POST' else 200)
+
+    async def _handle_upload(self, request: web.Request) -> web.Response:
+        key = f"{request.match_info['bucket']}/{request.match_info['path']}"
+        self.calls['upload'] += 1
+        upsert = request.headers.get('x-upsert') == 'true'
+        if key in self.objects and not upsert:
+            return web.json_response(
+                {'statusCode': '409', 'error': 'Duplicate', 'message': 'The resource already exists'},
+                status=400,
+            )
+        if request.content_type.startswith('multipart/'):
+            content = b''
+            async for part in (await request.multipart()):
+                content = await part.read()
+        else:
+            content = await request.read()
+        self.objects[key] = content
+        return web.json_response({'Key': key})
+
+    async def _handle_list(self, request: web.Request) -> web.Response:
+        bucket = request.match_info['bucket']
+        self.calls['list'] += 1
+        body = await request.json()
+        prefix = f"{bucket}/{body.get('prefix', '').strip('/')}/".replace('//', '/')
+        search = body.get('search', '')
+        names = [key[len(prefix):] for key in self.objects if key.startswith(prefix)]
+        entries = [{'name': name} for name in names if '/' not in name and name.startswith(search)]
+        return web.json_response(entries[:body.get('limit', 100)])
+
+    async def _handle_download(self, request: web.Request) -> web.Response:
+        key = f"{request.match_info['bucket']}/{request.match_info['path']}"
+        self.calls['download'] += 1
+        if key not in self.objects:
+            raise web.HTTPNotFound()
+        return web.Response(body=self.objects[key])
+
+    def stats(self) -> dict:
+        return {'calls': dict(self.calls), 'rows': {t: len(rows) for t, rows in self.tables.items()}}
@@ -0,0 +1,96 @@
+"""
+Фейковый Telegram Bot API: принимает вызовы методов бота и раздаёт файлы по /file/bot<token>/...
+Отвечает минимально валидными объектами, чтобы aiogram мог их распарсить.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from itertools import count
+
+from aiohttp import web
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+
+# Методы, которые в реальном API возвращают отправленное/изменённое сообщение
+_MESSAGE_METHODS = {
+    'sendMessage', 'sendPhoto', 'sendDocument', 'sendMediaGroup', 'copyMessage', 'forwardMessage',
+    'editMessageText', 'editMessageReplyMarkup', 'editMessageCaption',
+}
+
+
+class FakeTelegram:
+    """Сервер Bot API с настраиваемой задержкой и размером отдаваемых файлов."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, file_size: int = 200 * 1024):
+        self.latency = latency
+        self.jitter = jitter
+        self.file_size = file_size
+        self.calls = Counter()
+        self._message_ids = count(1)
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._latency_middleware])
+        app.router.add_post('/bot{token}/{method}', self._handle_method)
+        app.router.add_get('/file/bot{token}/{path:.+}', self._handle_file)
+        return app
+
+    @web.middleware
+    async def _latency_middleware(self, request: web.Request, handler):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        return await handler(request)
+
+    def _message(self, params: dict) -> dict:
+        chat_id = params.get('chat_id', 0)
+        message = {
+            'message_id': int(params.get('message_id') or next(self._message_ids)),
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            'from': BOT_USER,
+        }
+        if 'text' in params:
+            message['text'] = params['text']
+        if 'caption' in params:
+            message['caption'] = params['caption']
+        if 'photo' in params:
+            message['photo'] = [{'file_id': str(params['photo']), 'file_unique_id': 'p', 'width': 1, 'height': 1}]
+        return message
+
+    async def _handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.calls[method] += 1
+        params = dict(await request.post())
+        if 'reply_markup' in params and isinstance(params['reply_markup'], str):
+            params['reply_markup'] = json.loads(params['reply_markup'])
+
+        if method in _MESSAGE_METHODS:
+            result = self._message(params)
+            if 'inline_message_id' in params:
+                result = True
+        elif method == 'getMe':
+            result = BOT_USER
+        elif method == 'getFile':
+            file_id = params['file_id']
+            result = {
+                'file_id': file_id,
+                'file_unique_id': file_id[-16:],
+                'file_size': self.file_size,
+                'file_path': f"photos/{file_id}.jpg",
+            }
+        elif method == 'getUpdates':
+            await asyncio.sleep(float(params.get('timeout', 0) or 0))
+            result = []
+        else:
+            # deleteMessage, answerCallbackQuery, setMyCommands и прочие булевы методы
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def _handle_file(self, request: web.Request) -> web.Response:
+        self.calls['download'] += 1
+        return web.Response(body=b'\0' * self.file_size, content_type='image/jpeg')
+
+    def stats(self) -> dict:
+        return {'calls': dict(self.calls)}
@@ -0,0 +1,291 @@
+"""
+Оффлайн-окружение для бенчмарков: поднимает фейковые Bot API и Supabase,
+подключает к ним настоящий Dispatcher из start.py и прогоняет через него апдейты.
+С DATABASE_BACKEND=sqlite данные живут во временной базе SQLite с тем же справочником.
+"""
+import asyncio
+import concurrent.futures
+import importlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from itertools import count
+from pathlib import Path
+
+from aiohttp import web
+
+from bench.fake_supabase import FakeSupabase, catalog_rows
+from bench.fake_telegram import FakeTelegram, BOT_USER
+
+BENCH_TOKEN = "123456:BENCH-TOKEN"
+# supabase-py проверяет, что ключ похож на JWT
+BENCH_DATABASE_KEY = "bench.bench.bench"
+
+
+async def _serve(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+class _ServerThread:
+    """
+    aiohttp-приложение в отдельном потоке со своим event loop. Клиент supabase-py синхронный:
+    его запрос блокирует основной loop, и фейк, обслуживаемый тем же loop, не смог бы ответить.
+    """
+
+    def __init__(self, app: web.Application, name: str):
+        self._app = app
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._ready: concurrent.futures.Future[str] = concurrent.futures.Future()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            runner, url = self._loop.run_until_complete(_serve(self._app))
+        except BaseException as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(url)
+        self._loop.run_forever()
+        self._loop.run_until_complete(runner.cleanup())
+        self._loop.close()
+
+    def start(self) -> str:
+        self._thread.start()
+        return self._ready.result(timeout=10)
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+
+
+class ErrorCounter(logging.Handler):
+    """
+    Считает записи уровня ERROR и выше: обработчики бота ловят свои исключения и только
+    логируют их, поэтому ошибка сценария видна лишь в логе.
+    """
+
+    def __init__(self, samples: int = 5):
+        super().__init__(logging.ERROR)
+        self.count = 0
+        self.samples: list[str] = []
+        self._max_samples = samples
+
+    def emit(self, record: logging.LogRecord):
+        self.count += 1
+        if len(self.samples) < self._max_samples:
+            self.samples.append(f"{record.name}: {record.getMessage()}")
+
+
+def _seed_sqlite_catalog(path: str):
+    """Создаёт схему и заполняет справочник теми же строками, что и фейк Supabase."""
+    from database.models import migrate
+    from database.sqlite_repository import connect
+
+    connection = connect(path)
+    try:
+        migrate(connection, 'sqlite')
+        for table, rows in catalog_rows().items():
+            columns = list(rows[0])
+            connection.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row[column] for column in columns) for row in rows],
+            )
+    finally:
+        connection.close()
+
+
+class BenchEnvironment:
+    """
+    Запускает фейки, выставляет переменные окружения и импортирует start.py.
+    Импорт происходит только в start(), потому что настройки читаются из окружения при импорте utils.config.
+    """
+
+    def __init__(self, api_latency: float = 0.0, db_latency: float = 0.0, jitter: float = 0.0,
+                 file_size: int = 200 * 1024):
+        self.telegram = FakeTelegram(latency=api_latency, jitter=jitter, file_size=file_size)
+        self.supabase = FakeSupabase(latency=db_latency, jitter=jitter)
+        self.supabase.seed_catalog()
+        self._runners: list[web.AppRunner] = []
+        self._supabase_thread: _ServerThread | None = None
+        self._tmpdir: tempfile.TemporaryDirectory | None = None
+        self.errors = ErrorCounter()
+        self.bot = None
+        self.dp = None
+        self._update_ids = count(1)
+
+    async def start(self):
+        if 'utils.config' in sys.modules:
+            raise RuntimeError("utils.config imported before BenchEnvironment.start(): "
+                               "import bot modules only after the environment is started")
+        from aiogram import Bot
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+
+        telegram_runner, telegram_url = await _serve(self.telegram.create_app())
+        self._runners = [telegram_runner]
+        self._supabase_thread = _ServerThread(self.supabase.create_app(), name='fake-supabase')
+        supabase_url = self._supabase_thread.start()
+
+        os.environ['API_TOKEN'] = BENCH_TOKEN
+        os.environ['DATABASE_URL'] = supabase_url
+        os.environ['API_DATABASE_KEY'] = BENCH_DATABASE_KEY
+        if os.getenv('DATABASE_BACKEND', '').lower() == 'sqlite':
+            # Своя временная база на каждый прогон, чтобы не трогать рабочий SQLITE_PATH
+            self._tmpdir = tempfile.TemporaryDirectory(prefix='bench-')
+            os.environ['SQLITE_PATH'] = str(Path(self._tmpdir.name) / 'bench.db')
+            _seed_sqlite_catalog(os.environ['SQLITE_PATH'])
+
+        logging.getLogger().addHandler(self.errors)
+        start = importlib.import_module('start')
+        self.dp = start.create_dispatcher()
+        self.bot = Bot(token=BENCH_TOKEN,
+                       session=AiohttpSession(api=TelegramAPIServer.from_base(telegram_url)))
+        # Тот же прогрев, что и при запуске бота: кэши справочников и ролей, буфер записи
+        await self.dp.emit_startup(bot=self.bot)
+        return self
+
+    async def stop(self):
+        if self.dp:
+            await self.dp.emit_shutdown(bot=self.bot)
+        if self.bot:
+            await self.bot.session.close()
+        from utils.http import close_http_session
+        await close_http_session()
+        for runner in self._runners:
+            await runner.cleanup()
+        if self._supabase_thread:
+            self._supabase_thread.stop()
+        logging.getLogger().removeHandler(self.errors)
+        if self._tmpdir:
+            from database.repository import get_repository
+            connection = getattr(get_repository(), '_connection', None)
+            if connection is not None:
+                connection.close()
+            self._tmpdir.cleanup()
+
+    async def feed(self, raw_update: dict):
+        """Прогоняет один апдейт через диспетчер так же, как это делает polling."""
+        from aiogram.types import Update
+        raw_update = dict(raw_update, update_id=next(self._update_ids))
+        update = Update.model_validate(raw_update, context={'bot': self.bot})
+        return await self.dp.feed_update(self.bot, update)
+
+
+class VirtualUser:
+    """Генерирует апдейты Telegram от имени одного пользователя."""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self._message_ids = count(1)
+        self._file_ids = count(1)
+        self.user = {'id': user_id, 'is_bot': False, 'first_name': f"User{user_id}",
+                     'username': f"user{user_id}"}
+        self.chat = {'id': user_id, 'type': 'private'}
+
+    def _base_message(self, **fields) -> dict:
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': self.chat,
+            'from': self.user,
+            **fields,
+        }
+
+    def text(self, text: str) -> dict:
+        fields = {'text': text}
+        if text.startswith('/'):
+            fields['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return {'message': self._base_message(**fields)}
+
+    def photo(self, file_size: int = 150_000) -> dict:
+        file_id = f"photo-{self.user_id}-{next(self._file_ids)}"
+        sizes = [
+            {'file_id': f"{file_id}-s", 'file_unique_id': f"{file_id}-s", 'width': 90, 'height': 90,
+             'file_size': file_size // 50},
+            {'file_id': file_id, 'file_unique_id': file_id, 'width': 1280, 'height': 960,
+             'file_size': file_size},
+        ]
+        return {'message': self._base_message(photo=sizes)}
+
+    def document(self, file_name: str = "task.pdf", mime_type: str = "application/pdf",
+                 file_size: int = 300_000) -> dict:
+        file_id = f"doc-{self.user_id}-{next(self._file_ids)}"
+        document = {'file_id': file_id, 'file_unique_id': file_id, 'file_name': file_name,
+                    'mime_type': mime_type, 'file_size': file_size}
+        return {'message': self._base_message(document=document)}
+
+    def callback(self, data: str) -> dict:
+        message = self._base_message(text="...")
+        message['from'] = BOT_USER
+        return {'callback_query': {
+            'id': f"{self.user_id}-{message['message_id']}",
+            'from': self.user,
+            'chat_instance': str(self.user_id),
+            'message': message,
+            'data': data,
+        }}
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """Сводка по задержкам в миллисекундах и пропускной способности."""
+    values = sorted(latencies)
+    return {
+        'updates': len(values),
+        'elapsed_sec': round(elapsed, 3),
+        'updates_per_sec': round(len(values) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p90_ms': round(percentile(values, 0.90) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+async def run_scripts(env: BenchEnvironment, scripts: list[tuple[list[dict], list[dict]]],
+                      concurrency: int) -> dict:
+    """
+    Выполняет сценарии пользователей параллельно (не более `concurrency` одновременно).
+    Каждый сценарий - пара (подготовка, измеряемые шаги): сначала у всех пользователей
+    проходит подготовка, затем замеряется вторая фаза. Апдейты одного пользователя
+    идут строго последовательно, как в реальном чате. errors - исключения, вышедшие из
+    диспетчера, плюс записи ERROR в логе за время прогона.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+    logged_before = env.errors.count
+
+    async def run_one(updates: list[dict], measured: bool):
+        nonlocal errors
+        async with semaphore:
+            for raw_update in updates:
+                started = time.perf_counter()
+                try:
+                    await env.feed(raw_update)
+                except Exception:
+                    errors += 1
+                if measured:
+                    latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(run_one(setup, False) for setup, _ in scripts))
+    started = time.perf_counter()
+    await asyncio.gather(*(run_one(steps, True) for _, steps in scripts))
+    result = summarize(latencies, time.perf_counter() - started)
+    result['errors'] = errors + env.errors.count - logged_before
+    return result
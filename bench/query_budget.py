@@ -0,0 +1,114 @@
+"""
+Бюджет запросов к БД по сценариям: один виртуальный пользователь проходит сценарий через
+настоящий Dispatcher (bench.harness), профилировщик (database/profiler.py) считает запросы
+измеряемой фазы, повторы одинаковых запросов внутри апдейта и веера N+1.
+
+Запуск из корня репозитория:
+    python -m bench.query_budget --output queries.json
+    python -m bench.query_budget --baseline queries.json --strict
+
+С --baseline завершается с кодом 1, если в каком-то сценарии запросов стало больше, чем
+в сохранённом прогоне; с --strict - ещё и при любом повторе одинакового запроса в апдейте.
+Фоновые сбросы write-behind (вне апдейтов) не учитываются.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from bench.harness import BenchEnvironment, VirtualUser
+from bench.scenarios import SCENARIOS
+from utils.logger import setup_logging, shutdown_logging
+
+USER_ID_STRIDE = 1_000_000
+
+
+async def run(args) -> tuple[dict, dict]:
+    env = await BenchEnvironment().start()
+    # Только после start(): настройки читаются из окружения, которое выставляет окружение бенчмарка
+    from database.profiler import instrument, profiler, find_repeats, find_fanout
+    from database.repository import get_repository
+
+    instrument(get_repository())
+    results, details = {}, {}
+    try:
+        names = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+        for index, name in enumerate(names, start=1):
+            setup, steps = SCENARIOS[name](VirtualUser(index * USER_ID_STRIDE), attachments=2, taps=1)
+            for raw_update in setup:
+                await env.feed(raw_update)
+            errors_before = env.errors.count
+            with profiler.collect() as records:
+                for raw_update in steps:
+                    await env.feed(raw_update)
+            records = [r for r in records if r.update_id is not None]
+            repeats = find_repeats(records)
+            fanout = find_fanout(records)
+            results[name] = {
+                'updates': len(steps),
+                'queries': sum(r.queries for r in records),
+                'repeats': sum(count - 1 for _, count in repeats),
+                'fanout': len(fanout),
+                # Запросы сценария, упавшего на ошибке, не годятся ни в бюджет, ни для сравнения
+                'errors': env.errors.count - errors_before,
+            }
+            details[name] = [f"repeated x{count}: {r.describe()}" for r, count in repeats] + \
+                            [f"N+1 x{count}: {r.describe()}" for r, count in fanout]
+    finally:
+        await env.stop()
+    if env.errors.count:
+        details['errors'] = env.errors.samples
+    return results, details
+
+
+def find_regressions(results: dict, baseline: dict, strict: bool) -> list[str]:
+    problems = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and current['queries'] > previous['queries']:
+            problems.append(f"{name}: queries {current['queries']} > {previous['queries']}")
+        if strict and current['repeats']:
+            problems.append(f"{name}: {current['repeats']} repeated queries")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='all', choices=['all', *SCENARIOS])
+    parser.add_argument('--output', help="куда сохранить результат в JSON")
+    parser.add_argument('--baseline', help="JSON предыдущего прогона для проверки регрессий")
+    parser.add_argument('--strict', action='store_true', help="считать ошибкой любой повтор запроса в апдейте")
+    args = parser.parse_args()
+
+    setup_logging(level=logging.getLevelName(logging.WARNING))
+    try:
+        results, details = asyncio.run(run(args))
+    finally:
+        shutdown_logging()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    for name, lines in details.items():
+        for line in lines:
+            print(f"{name}: {line}", file=sys.stderr)
+    failed = [name for name, result in results.items() if result['errors']]
+    if failed:
+        print(f"ERRORS in {', '.join(failed)}: query counts are not trustworthy, nothing saved", file=sys.stderr)
+        sys.exit(1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    problems = find_regressions(results, baseline, args.strict)
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
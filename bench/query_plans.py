@@ -0,0 +1,242 @@
+"""
+Проверка планов горячих запросов через EXPLAIN.
+
+На базе, заполненной реалистичным числом строк, каждый запрос должен идти по индексу:
+без полного сканирования таблиц и без сортировки во временном B-дереве.
+
+Запуск из корня репозитория:
+    python -m bench.query_plans                                    # временная база SQLite
+    python -m bench.query_plans --dsn postgresql://... --scale 0.5  # отдельная схема в PostgreSQL
+
+Схема создаётся миграциями из database/models.py. В PostgreSQL данные пишутся во временную
+схему, которая удаляется после проверки. Завершается с кодом 1, если хотя бы один запрос
+не использует индекс.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from database.models import PLACEHOLDER, migrate
+from database.sqlite_repository import _SELECT_USER_ROLE, _SELECT_RECENT_USER_ROLES, _SELECT_SECTIONS, \
+    _SELECT_CUSTOMER_ID, _SELECT_EXECUTOR_ID, _SELECT_TASK, _SELECT_OFFERS, SQLiteRepository
+
+# Число строк при --scale 1
+ROW_COUNTS = {
+    'subject': 50,
+    'section': 2_500,
+    'task_type': 10,
+    'users': 100_000,
+    'customer': 30_000,
+    'executor': 5_000,
+    'task': 200_000,
+    'offer_tasks': 20_000,   # заказы с откликами, по OFFERS_PER_TASK на каждый
+}
+OFFERS_PER_TASK = 5
+LINKS_PER_EXECUTOR = {'executor_subject': 3, 'executor_section': 10, 'executor_task_type': 3}
+BATCH = 5_000
+
+# Имя -> (SQL с параметрами `?`, параметры). Запросы репозитория берутся из sqlite_repository как есть
+HOT_QUERIES = {
+    'user_role': (_SELECT_USER_ROLE, (4242,)),
+    'recent_user_roles': (_SELECT_RECENT_USER_ROLES, (100,)),
+    'sections_by_subject': (_SELECT_SECTIONS, (7,)),
+    'customer_by_user': (_SELECT_CUSTOMER_ID, (4242,)),
+    'executor_by_user': (_SELECT_EXECUTOR_ID, (95_000,)),
+    'task_by_id': (_SELECT_TASK, (4242,)),
+    'offers_by_task': (_SELECT_OFFERS, (42,)),
+    'customer_recent_tasks': (
+        "SELECT task_id, status, created_at FROM task WHERE customer_id = ? ORDER BY created_at DESC LIMIT 10",
+        (42,),
+    ),
+    'open_tasks_feed': (
+        "SELECT task_id FROM task WHERE status = 'open' AND task_id < ? AND subject_id IN (?, ?, ?) "
+        "AND task_type_id IN (?, ?) ORDER BY task_id DESC LIMIT 6",
+        (150_000, 3, 7, 11, 1, 2),
+    ),
+    'executors_by_subject': ("SELECT executor_id FROM executor_subject WHERE subject_id = ?", (7,)),
+    'executors_by_section': ("SELECT executor_id FROM executor_section WHERE section_id = ?", (77,)),
+    'executors_by_task_type': ("SELECT executor_id FROM executor_task_type WHERE task_type_id = ?", (3,)),
+}
+# Запросы с подсказками планировщику SQLite (унарный плюс), в PostgreSQL не проверяются
+SQLITE_HOT_QUERIES = {
+    'broadcast_recipients_one_role': (
+        SQLiteRepository._recipients_query(['customer'], 'user_id') + " ORDER BY user_id LIMIT ?",
+        ('customer', 20_000, 1000),
+    ),
+    'broadcast_recipients_all_roles': (
+        SQLiteRepository._recipients_query(['customer', 'executor'], 'user_id') + " ORDER BY user_id LIMIT ?",
+        ('customer', 'executor', 20_000, 1000),
+    ),
+}
+
+
+def _rows(scale: float) -> dict[str, tuple[tuple[str, ...], object]]:
+    """Таблица -> (колонки, генератор строк); порядок соблюдает внешние ключи."""
+    rnd = random.Random(42)
+    n = {name: max(1, int(count * scale)) for name, count in ROW_COUNTS.items()}
+    n['subject'] = ROW_COUNTS['subject']
+    n['task_type'] = ROW_COUNTS['task_type']
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # Пользователи: сначала заказчики, затем исполнители, затем остальные
+    executor_user = n['customer']
+
+    def ts(i: int, total: int) -> str:
+        return (start + timedelta(seconds=i * 86_400 * 365 // total)).isoformat()
+
+    def links(count: int, upper: int):
+        for executor_id in range(1, n['executor'] + 1):
+            for value in rnd.sample(range(1, upper + 1), count):
+                yield executor_id, value
+
+    return {
+        'subject': (('subject_id', 'subject_name'),
+                    ((i, f"Предмет {i}") for i in range(1, n['subject'] + 1))),
+        'section': (('section_id', 'subject_id', 'section_name'),
+                    ((i, i % n['subject'] + 1, f"Раздел {i}") for i in range(1, n['section'] + 1))),
+        'task_type': (('task_type_id', 'type_name'),
+                      ((i, f"Тип {i}") for i in range(1, n['task_type'] + 1))),
+        'users': (('user_id', 'username', 'role'),
+                  ((i, f"user{i}", 'customer' if i <= executor_user else 'executor')
+                   for i in range(1, n['users'] + 1))),
+        'user_activity': (('user_id', 'last_seen'),
+                          ((i, ts(rnd.randrange(n['users']), n['users'])) for i in range(1, n['users'] + 1))),
+        'customer': (('customer_id', 'user_id', 'customer_name'),
+                     ((i, i, f"Заказчик {i}") for i in range(1, n['customer'] + 1))),
+        'executor': (('executor_id', 'user_id', 'executor_name', 'experience'),
+                     ((i, executor_user + i, f"Исполнитель {i}", i % 10) for i in range(1, n['executor'] + 1))),
+        'executor_subject': (('executor_id', 'subject_id'),
+                             links(LINKS_PER_EXECUTOR['executor_subject'], n['subject'])),
+        'executor_section': (('executor_id', 'section_id'),
+                             links(LINKS_PER_EXECUTOR['executor_section'], n['section'])),
+        'executor_task_type': (('executor_id', 'task_type_id'),
+                               links(LINKS_PER_EXECUTOR['executor_task_type'], n['task_type'])),
+        'task': (('task_id', 'customer_id', 'subject_id', 'section_id', 'task_type_id', 'description', 'created_at'),
+                 ((i, rnd.randint(1, n['customer']), i % n['subject'] + 1, i % n['section'] + 1,
+                   i % n['task_type'] + 1, f"Задача {i}", ts(i, n['task'])) for i in range(1, n['task'] + 1))),
+        'offer': (('task_id', 'executor_id', 'price', 'eta_hours'),
+                  ((task_id, executor_id, 500 + executor_id % 1000, 24)
+                   for task_id in range(1, n['offer_tasks'] + 1)
+                   for executor_id in rnd.sample(range(1, n['executor'] + 1), OFFERS_PER_TASK))),
+    }
+
+
+def _batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(connection, dialect: str, scale: float):
+    placeholder = PLACEHOLDER[dialect]
+    for table, (columns, rows) in _rows(scale).items():
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+        count = 0
+        for batch in _batches(rows, BATCH):
+            connection.execute("BEGIN")
+            if dialect == 'sqlite':
+                connection.executemany(query, batch)
+            else:
+                with connection.cursor() as cursor:
+                    cursor.executemany(query, batch)
+            connection.execute("COMMIT")
+            count += len(batch)
+        print(f"  {table}: {count} строк", file=sys.stderr)
+    connection.execute("ANALYZE")
+
+
+def sqlite_plan(connection, query: str, params: tuple) -> tuple[list[str], list[str]]:
+    """(строки плана, найденные проблемы) для SQLite."""
+    details = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    problems = [detail for detail in details
+                if (detail.startswith('SCAN') and 'USING' not in detail) or 'TEMP B-TREE' in detail]
+    return details, problems
+
+
+def postgres_plan(connection, query: str, params: tuple) -> tuple[list[str], list[str]]:
+    """(узлы плана, найденные проблемы) для PostgreSQL."""
+    row = connection.execute(f"EXPLAIN (FORMAT JSON) {query.replace('?', '%s')}", params).fetchone()
+    plan = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+    nodes, stack = [], [plan[0]['Plan']]
+    while stack:
+        node = stack.pop()
+        nodes.append(f"{node['Node Type']}" + (f" on {node['Relation Name']}" if 'Relation Name' in node else "")
+                     + (f" using {node['Index Name']}" if 'Index Name' in node else ""))
+        stack.extend(node.get('Plans', ()))
+    return nodes, [node for node in nodes if node.startswith('Seq Scan')]
+
+
+def check_plans(connection, dialect: str) -> dict:
+    explain = sqlite_plan if dialect == 'sqlite' else postgres_plan
+    results = {}
+    queries = {**HOT_QUERIES, **SQLITE_HOT_QUERIES} if dialect == 'sqlite' else HOT_QUERIES
+    for name, (query, params) in queries.items():
+        plan, problems = explain(connection, query, params)
+        results[name] = {'plan': plan, 'problems': problems}
+    return results
+
+
+def _open(args):
+    if args.dsn:
+        import psycopg
+        connection = psycopg.connect(args.dsn, autocommit=True)
+        schema = f"bench_query_plans_{os.getpid()}"
+        connection.execute(f"CREATE SCHEMA {schema}")
+        connection.execute(f"SET search_path TO {schema}")
+
+        def cleanup():
+            connection.execute(f"DROP SCHEMA {schema} CASCADE")
+            connection.close()
+        return connection, 'postgres', cleanup
+
+    from database.sqlite_repository import connect
+    directory = tempfile.TemporaryDirectory()
+    connection = connect(str(Path(directory.name) / 'query_plans.db'))
+
+    def cleanup():
+        connection.close()
+        directory.cleanup()
+    return connection, 'sqlite', cleanup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', help="PostgreSQL DSN; без него - временная база SQLite")
+    parser.add_argument('--scale', type=float, default=1.0, help="Множитель числа строк")
+    parser.add_argument('--json', action='store_true', help="Вывести результат в JSON")
+    args = parser.parse_args()
+
+    connection, dialect, cleanup = _open(args)
+    try:
+        migrate(connection, dialect)
+        started = time.perf_counter()
+        print(f"Заполнение базы ({dialect}, scale={args.scale})...", file=sys.stderr)
+        seed(connection, dialect, args.scale)
+        print(f"Заполнено за {time.perf_counter() - started:.1f} с", file=sys.stderr)
+        results = check_plans(connection, dialect)
+    finally:
+        cleanup()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"{'FAIL' if result['problems'] else 'ok  '} {name}: {' | '.join(result['plan'])}")
+    failed = [name for name, result in results.items() if result['problems']]
+    if failed:
+        print(f"Запросы без индекса: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Воспроизведение записанного потока апдейтов (см. utils/capture.py) против локального бота.
+
+    # в процессе, через dp.feed_update и фейковые Bot API/Supabase
+    python -m bench.replay updates.jsonl --speed 10 --multiply 5
+
+    # через вебхук уже запущенного экземпляра
+    python -m bench.replay updates.jsonl --webhook http://127.0.0.1:8080/webhook --speed 1
+
+--speed 0 прогоняет поток без пауз, 1 - в реальном времени, k - в k раз быстрее.
+--multiply N размножает каждого пользователя в N копий, стартующих одновременно,
+что воспроизводит пики вроде вечернего массового создания задач.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+
+from bench.harness import BenchEnvironment, summarize
+from utils.logger import setup_logging, shutdown_logging
+
+# Сдвиг id для копий пользователя; псевдонимы из записи занимают 40 бит
+CLONE_ID_STRIDE = 1 << 41
+
+
+def load_updates(path: str) -> list[tuple[int, dict]]:
+    with open(path, encoding='utf-8') as f:
+        return [(record['t'], record['u']) for record in map(json.loads, f) if record]
+
+
+def _shift_ids(value, offset: int, key: str | None = None, parent: str | None = None):
+    """Сдвигает id пользователей и чатов, чтобы копия вела себя как отдельный пользователь."""
+    if isinstance(value, dict):
+        return {k: _shift_ids(v, offset, k, key) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shift_ids(v, offset, key, parent) for v in value]
+    if key == 'id' and parent in ('from', 'chat', 'user') and isinstance(value, int):
+        return value + offset if value > 0 else value - offset
+    return value
+
+
+def _user_of(update: dict) -> int | None:
+    for event in update.values():
+        if isinstance(event, dict) and isinstance(event.get('from'), dict):
+            return event['from']['id']
+    return None
+
+
+def expand(records: list[tuple[int, dict]], multiply: int) -> dict[int, list[tuple[int, dict]]]:
+    """Группирует апдейты по пользователям, размножая каждого `multiply` раз."""
+    per_user = defaultdict(list)
+    for offset_ms, update in records:
+        for clone in range(multiply):
+            shifted = _shift_ids(update, clone * CLONE_ID_STRIDE) if clone else update
+            per_user[_user_of(shifted)].append((offset_ms, shifted))
+    return per_user
+
+
+class FlowTracker:
+    """
+    Меряет время прохождения сценариев по состоянию FSM: сценарий начинается, когда
+    пользователь входит в группу состояний (TaskCreationStates, ExecutorStates, ...),
+    и завершается, когда состояние очищается.
+    """
+
+    def __init__(self):
+        self.active: dict[int, tuple[str, float]] = {}
+        self.durations: dict[str, list[float]] = defaultdict(list)
+
+    def observe(self, user_id: int, state: str | None, started_at: float):
+        group = state.split(':', 1)[0] if state else None
+        current = self.active.get(user_id)
+        if current and current[0] != group:
+            del self.active[user_id]
+            if group is None:
+                self.durations[current[0]].append(time.perf_counter() - current[1])
+        if group and user_id not in self.active:
+            self.active[user_id] = (group, started_at)
+
+    def report(self) -> dict:
+        report = {}
+        for flow, durations in self.durations.items():
+            summary = summarize(durations, 0)
+            report[flow] = {
+                'completed': summary['updates'],
+                'p50_ms': summary['p50_ms'],
+                'p90_ms': summary['p90_ms'],
+                'p99_ms': summary['p99_ms'],
+                'max_ms': summary['max_ms'],
+            }
+        for flow, _ in self.active.values():
+            report.setdefault(flow, {'completed': 0})
+            report[flow]['unfinished'] = report[flow].get('unfinished', 0) + 1
+        return report
+
+
+async def replay(per_user: dict, speed: float, deliver, tracker: FlowTracker | None = None,
+                 get_state=None) -> dict:
+    """
+    Воспроизводит апдейты: у каждого пользователя строго по порядку, между пользователями
+    параллельно, с паузами по отметкам времени записи (с учётом speed).
+    """
+    latencies: list[float] = []
+    errors = 0
+    origin = time.perf_counter()
+
+    async def run_user(user_id, updates):
+        nonlocal errors
+        for offset_ms, update in updates:
+            if speed > 0:
+                delay = origin + offset_ms / 1000 / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            started = time.perf_counter()
+            try:
+                await deliver(update)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+            if tracker and get_state and user_id is not None:
+                tracker.observe(user_id, await get_state(user_id), started)
+
+    await asyncio.gather(*(run_user(user_id, updates) for user_id, updates in per_user.items()))
+    result = summarize(latencies, time.perf_counter() - origin)
+    result['errors'] = errors
+    if tracker:
+        result['flows'] = tracker.report()
+    return result
+
+
+async def replay_in_process(per_user: dict, args) -> dict:
+    env = await BenchEnvironment(api_latency=args.api_latency, db_latency=args.db_latency).start()
+
+    async def get_state(user_id: int):
+        return await env.dp.fsm.get_context(bot=env.bot, chat_id=user_id, user_id=user_id).get_state()
+
+    try:
+        result = await replay(per_user, args.speed, env.feed, FlowTracker(), get_state)
+    finally:
+        await env.stop()
+    # Обработчики ловят свои исключения и логируют их: такие ошибки видны только в логе
+    result['errors'] += env.errors.count
+    return result
+
+
+async def replay_webhook(per_user: dict, args) -> dict:
+    import aiohttp
+    headers = {'X-Telegram-Bot-Api-Secret-Token': args.secret} if args.secret else {}
+    update_ids = iter(range(1, sys.maxsize))
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def deliver(update: dict):
+            async with session.post(args.webhook, json=dict(update, update_id=next(update_ids))) as response:
+                response.raise_for_status()
+
+        return await replay(per_user, args.speed, deliver)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="файл, записанный с UPDATE_CAPTURE_PATH")
+    parser.add_argument('--speed', type=float, default=0.0)
+    parser.add_argument('--multiply', type=int, default=1)
+    parser.add_argument('--webhook', help="URL вебхука запущенного бота; без него - in-process feed_update")
+    parser.add_argument('--secret', help="secret_token вебхука")
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--db-latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    per_user = expand(load_updates(args.path), args.multiply)
+    setup_logging(level=logging.getLevelName(logging.WARNING))
+    try:
+        runner = replay_webhook if args.webhook else replay_in_process
+        result = asyncio.run(runner(per_user, args))
+    finally:
+        shutdown_logging()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
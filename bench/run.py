@@ -0,0 +1,98 @@
+"""
+Оффлайн-бенчмарк бота: настоящий Dispatcher против фейковых Bot API и Supabase.
+
+Запуск из корня репозитория:
+    python -m bench.run --users 100 --concurrency 20 --db-latency 0.005 --api-latency 0.01
+
+С --baseline сравнивает результат с сохранённым прогоном и завершается с кодом 1,
+если пропускная способность упала или p99 вырос больше чем на --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from bench.harness import BenchEnvironment, VirtualUser, run_scripts
+from bench.scenarios import SCENARIOS
+from utils.logger import setup_logging, shutdown_logging
+
+# Пользователи разных сценариев не должны пересекаться по user_id
+USER_ID_STRIDE = 1_000_000
+
+
+async def run(args) -> dict:
+    env = await BenchEnvironment(
+        api_latency=args.api_latency,
+        db_latency=args.db_latency,
+        jitter=args.jitter,
+    ).start()
+    results = {}
+    try:
+        names = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+        for index, name in enumerate(names, start=1):
+            scripts = [
+                SCENARIOS[name](VirtualUser(index * USER_ID_STRIDE + n),
+                                attachments=args.attachments, taps=args.taps)
+                for n in range(args.users)
+            ]
+            results[name] = await run_scripts(env, scripts, args.concurrency)
+        results['_calls'] = {'telegram': env.telegram.stats(), 'supabase': env.supabase.stats()}
+    finally:
+        await env.stop()
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Сравнивает прогон с эталонным и возвращает список деградаций."""
+    problems = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if name.startswith('_') or not previous:
+            continue
+        if current['updates_per_sec'] < previous['updates_per_sec'] * (1 - tolerance):
+            problems.append(f"{name}: updates/sec {current['updates_per_sec']} < {previous['updates_per_sec']}")
+        if current['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+            problems.append(f"{name}: p99 {current['p99_ms']}ms > {previous['p99_ms']}ms")
+        if current['errors'] > previous.get('errors', 0):
+            problems.append(f"{name}: errors {current['errors']} > {previous.get('errors', 0)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='all', choices=['all', *SCENARIOS])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--attachments', type=int, default=2, help="файлов в сценарии task_creation")
+    parser.add_argument('--taps', type=int, default=3, help="проходов по меню в сценарии menu_taps")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="задержка Bot API, сек")
+    parser.add_argument('--db-latency', type=float, default=0.0, help="задержка Supabase, сек")
+    parser.add_argument('--jitter', type=float, default=0.0, help="случайная добавка к задержкам, сек")
+    parser.add_argument('--output', help="куда сохранить результат в JSON")
+    parser.add_argument('--baseline', help="JSON предыдущего прогона для проверки регрессий")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_logging(level=logging.getLevelName(logging.WARNING))
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutdown_logging()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems = find_regressions(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
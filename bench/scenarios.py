@@ -0,0 +1,77 @@
+"""
+Сценарии бенчмарка. Каждый сценарий для пользователя возвращает пару
+(подготовительные апдейты, измеряемые апдейты).
+"""
+from bench.harness import VirtualUser
+from utils.callbacks import Flow, Pick, Role, RegisterCallback, ConsentCallback, SubjectCallback, SectionCallback, \
+    TaskTypeCallback, SolutionFormat, SolutionFormatCallback, TaskCallback, TaskAction
+
+# Предмет/раздел/тип задачи из справочника бенчмарка (bench.fake_supabase.catalog_rows)
+SUBJECT_ID = 1
+SECTION_ID = 1
+TASK_TYPE_ID = 1
+
+
+def customer_registration_steps(user: VirtualUser) -> list[dict]:
+    return [
+        user.text("/start"),
+        user.callback(RegisterCallback().pack()),
+        user.callback(RegisterCallback(role=Role.CUSTOMER).pack()),
+        user.callback(ConsentCallback(role=Role.CUSTOMER, accepted=True).pack()),
+        user.text(f"Заказчик {user.user_id}"),
+    ]
+
+
+def executor_registration(user: VirtualUser, **_) -> tuple[list[dict], list[dict]]:
+    return [], [
+        user.text("/start"),
+        user.callback(RegisterCallback().pack()),
+        user.callback(RegisterCallback(role=Role.EXECUTOR).pack()),
+        user.callback(ConsentCallback(role=Role.EXECUTOR, accepted=True).pack()),
+        user.text(f"Исполнитель {user.user_id}"),
+        user.callback(SubjectCallback(flow=Flow.REGISTRATION, subject_id=SUBJECT_ID).pack()),
+        user.callback(SubjectCallback(flow=Flow.REGISTRATION, pick=Pick.DONE).pack()),
+        user.callback(SectionCallback(flow=Flow.REGISTRATION, section_id=SECTION_ID).pack()),
+        user.callback(SectionCallback(flow=Flow.REGISTRATION, pick=Pick.DONE).pack()),
+        user.callback(TaskTypeCallback(flow=Flow.REGISTRATION, task_type_id=TASK_TYPE_ID).pack()),
+        user.callback(TaskTypeCallback(flow=Flow.REGISTRATION, pick=Pick.DONE).pack()),
+        user.text("Решаю задачи по математике для студентов 1-2 курсов"),
+        user.text("3"),
+        user.text("МГУ, факультет математики, бакалавр"),
+        user.photo(),
+    ]
+
+
+def customer_registration(user: VirtualUser, **_) -> tuple[list[dict], list[dict]]:
+    return [], customer_registration_steps(user)
+
+
+def task_creation(user: VirtualUser, attachments: int = 2, **_) -> tuple[list[dict], list[dict]]:
+    files = [user.photo() if n % 2 == 0 else user.document() for n in range(attachments)]
+    return customer_registration_steps(user), [
+        user.text("Создать заказ"),
+        user.callback(SubjectCallback(flow=Flow.TASK, subject_id=SUBJECT_ID).pack()),
+        user.callback(SectionCallback(flow=Flow.TASK, section_id=SECTION_ID).pack()),
+        user.text("Найти предел последовательности и исследовать ряд на сходимость"),
+        user.callback(TaskTypeCallback(flow=Flow.TASK, task_type_id=TASK_TYPE_ID).pack()),
+        user.callback(SolutionFormatCallback(solution_format=SolutionFormat.FULL_SOLUTION).pack()),
+        user.text("до пятницы 18:00"),
+        *files,
+        user.callback(TaskCallback(action=TaskAction.FILES_DONE).pack()),
+        user.callback(TaskCallback(action=TaskAction.CONFIRM).pack()),
+    ]
+
+
+def menu_taps(user: VirtualUser, taps: int = 3, **_) -> tuple[list[dict], list[dict]]:
+    buttons = ["Мой профиль", "Мои заказы", "Написать в поддержку"]
+    return customer_registration_steps(user), [
+        user.text(buttons[n % len(buttons)]) for n in range(taps * len(buttons))
+    ]
+
+
+SCENARIOS = {
+    'executor_registration': executor_registration,
+    'customer_registration': customer_registration,
+    'task_creation': task_creation,
+    'menu_taps': menu_taps,
+}
@@ -0,0 +1,145 @@
+"""
+Профиль и бюджет холодного старта бота.
+
+Запуск из корня репозитория:
+    python -m bench.startup_budget --import-budget-ms 800 --first-update-budget-ms 2500
+
+1. `import start` в чистом процессе с `-X importtime`: время импорта по модулям и проверка,
+   что при импорте не подтягиваются клиенты БД/хранилища, роутеры и сервисы (и что импорт
+   работает без учётных данных).
+2. Время до первого апдейта: отдельный процесс поднимает оффлайн-окружение (bench.harness),
+   выполняет startup-хуки диспетчера и прогоняет /start; этапы берутся из utils.lifecycle.
+
+Завершается с кодом 1, если бюджет превышен или при импорте загружен запрещённый модуль.
+"""
+# lifecycle импортируется первым, чтобы этапы в дочернем процессе отсчитывались от его старта
+from utils.lifecycle import lifecycle
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+# Пакеты, которых не должно быть в sys.modules после `import start`
+FORBIDDEN_ON_IMPORT = ('supabase', 'postgrest', 'storage3', 'gotrue', 'handler', 'service', 'database', 'storage')
+# Переменные, без которых `import start` обязан работать
+CREDENTIAL_VARS = ('API_TOKEN', 'DATABASE_URL', 'API_DATABASE_KEY', 'S3_ACCESS_KEY', 'S3_SECRET_KEY')
+
+
+def _clean_env() -> dict:
+    env = {key: value for key, value in os.environ.items() if key not in CREDENTIAL_VARS}
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Разбирает вывод `-X importtime`: строки `import time: self | cumulative | module`."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return modules
+
+
+def profile_imports(top: int, timeout: float) -> dict:
+    probe = "import json, sys, start; print(json.dumps(sorted(sys.modules)))"
+    try:
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], cwd=ROOT, env=_clean_env(),
+                                capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f"`import start` did not finish in {timeout}s"}
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed'}
+    modules = parse_importtime(result.stderr)
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    start_entry = next((m for m in modules if m['module'] == 'start'), None)
+    return {
+        'import_start_ms': start_entry['cumulative_ms'] if start_entry else 0.0,
+        'forbidden': sorted({name for name in loaded if name.split('.')[0] in FORBIDDEN_ON_IMPORT}),
+        'slowest': sorted(modules, key=lambda m: m['cumulative_ms'], reverse=True)[:top],
+    }
+
+
+def profile_first_update(timeout: float) -> dict:
+    started = time.perf_counter()
+    try:
+        result = subprocess.run([sys.executable, '-m', 'bench.startup_budget', '--child'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # Зависший старт (например, блокирующий клиент БД) - тоже превышение бюджета
+        return {'error': f"first update was not handled in {timeout}s"}
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'child failed'}
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return {'phases_ms': {name: round(value * 1000, 1) for name, value in phases.items()},
+            'process_wall_ms': round(wall_ms, 1)}
+
+
+async def _child():
+    """Дочерний процесс: старт окружения, один /start, вывод этапов запуска."""
+    from bench.harness import BenchEnvironment, VirtualUser
+
+    env = await BenchEnvironment().start()
+    try:
+        await env.feed(VirtualUser(1).text("/start"))
+    finally:
+        await env.stop()
+    print(json.dumps(lifecycle.phases))
+
+
+def find_violations(report: dict, import_budget_ms: float, first_update_budget_ms: float) -> list[str]:
+    problems = []
+    imports, first_update = report['imports'], report['first_update']
+    for section in (imports, first_update):
+        if 'error' in section:
+            problems.append(section['error'])
+    if imports.get('forbidden'):
+        problems.append(f"modules loaded by `import start`: {', '.join(imports['forbidden'])}")
+    if imports.get('import_start_ms', 0) > import_budget_ms:
+        problems.append(f"import start {imports['import_start_ms']:.1f}ms > {import_budget_ms}ms")
+    reached = first_update.get('phases_ms', {}).get('first_update')
+    if 'phases_ms' in first_update and reached is None:
+        problems.append("first update was not handled")
+    elif reached is not None and reached > first_update_budget_ms:
+        problems.append(f"first update {reached}ms > {first_update_budget_ms}ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--import-budget-ms', type=float, default=1000)
+    parser.add_argument('--first-update-budget-ms', type=float, default=3000)
+    parser.add_argument('--top', type=int, default=15, help="сколько самых медленных модулей показать")
+    parser.add_argument('--timeout', type=float, default=60, help="предел для каждого дочернего процесса, с")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        asyncio.run(_child())
+        return
+
+    report = {'imports': profile_imports(args.top, args.timeout),
+              'first_update': profile_first_update(args.timeout)}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    problems = find_violations(report, args.import_budget_ms, args.first_update_budget_ms)
+    for problem in problems:
+        print(f"BUDGET {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Рассылка объявления всем пользователям роли (новые предметы, технические работы).
+
+Запуск из корня репозитория:
+    python broadcast.py maintenance-1019 --role customer --text "Завтра с 3:00 до 4:00 бот недоступен"
+    python broadcast.py new-subjects --role all --file announcement.html --parse-mode HTML
+
+Прогресс рассылки хранится в файле состояния под её именем: повторный запуск с тем же именем
+продолжает с места остановки (после завершения - досылает только новым пользователям).
+--dry-run показывает число получателей, ничего не отправляя.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from utils.logger import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+
+def _print_progress(progress):
+    print(f"\r{progress.format()}", end="", file=sys.stderr, flush=True)
+
+
+async def run(args) -> int:
+    from aiogram import Bot
+    from service.BroadcastService import ROLES, run_broadcast
+    from service.DataBaseService import repository
+    from utils.config import API_TOKEN
+
+    roles = list(ROLES) if args.role == 'all' else [args.role]
+    text = Path(args.file).read_text(encoding='utf-8') if args.file else args.text
+    if args.dry_run:
+        print(f"{args.name}: получателей {await repository.count_broadcast_recipients(roles, 0)}")
+        return 0
+
+    bot = Bot(token=API_TOKEN)
+    try:
+        progress = await run_broadcast(bot, args.name, roles, text, Path(args.state), parse_mode=args.parse_mode,
+                                       rate=args.rate, workers=args.workers, report=_print_progress)
+    finally:
+        await bot.session.close()
+    print(file=sys.stderr)
+    print(f"{args.name}: {progress.format()}")
+    return 0
+
+
+def main():
+    from service.BroadcastService import ROLES, BROADCAST_RATE, BROADCAST_WORKERS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('name', help="Имя рассылки: ключ прогресса в файле состояния")
+    parser.add_argument('--role', choices=[*ROLES, 'all'], required=True)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--text', help="Текст объявления")
+    source.add_argument('--file', help="Файл с текстом объявления")
+    parser.add_argument('--parse-mode', choices=['HTML', 'MarkdownV2'])
+    parser.add_argument('--state', default='broadcast_state.json', help="Файл состояния рассылок")
+    parser.add_argument('--rate', type=float, default=BROADCAST_RATE, help="Сообщений в секунду на весь бот")
+    parser.add_argument('--workers', type=int, default=BROADCAST_WORKERS)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    setup_logging(level=logging.getLevelName(logging.WARNING))
+    try:
+        raise SystemExit(asyncio.run(run(args)))
+    except KeyboardInterrupt:
+        print("\nПрервано, прогресс сохранён: повторите запуск с тем же именем.", file=sys.stderr)
+        raise SystemExit(130)
+    finally:
+        shutdown_logging()
+
+
+if __name__ == '__main__':
+    main()
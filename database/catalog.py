@@ -0,0 +1,365 @@
+"""
+Импорт справочников (предметы, разделы, типы задач) из CSV или YAML.
+
+Файл описывает каталог целиком. За один проход он сравнивается с текущими строками (plan_import):
+новые записи вставляются, переименованные и перенесённые в другой предмет обновляются, пропавшие
+из файла деактивируются (active = false). Строки, на которые ссылаются анкеты (executor_*) или
+заказы (task), никогда не удаляются; неиспользуемые удаляются только с prune. Все изменения
+пишутся пачками в одной транзакции вместе с повышением версии в catalog_version (import_catalog).
+
+Строки сопоставляются по id, если он указан в файле, иначе по названию (раздел - внутри своего
+предмета). Файл можно вести без id; переименование и перенос раздела требуют id.
+
+YAML:
+    subjects:
+      - name: Математика
+        id: 1                       # необязательно
+        sections: [Алгебра, {id: 7, name: Геометрия}]
+    task_types: [Контрольная, {id: 2, name: Курсовая}]
+
+CSV (строка заголовка kind,id,name,subject; subject - название предмета раздела из этого же файла):
+    subject,,Математика,
+    section,7,Геометрия,Математика
+    task_type,,Контрольная,
+"""
+import csv
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from database.models import PLACEHOLDER, Transaction
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('subject', 'section', 'task_type')
+# Строк в одном INSERT ... VALUES / IN (...): с запасом под лимит параметров старых SQLite (999)
+BATCH_SIZE = 400
+
+
+@dataclass(frozen=True)
+class CatalogTable:
+    table: str
+    key: str
+    name: str
+    # Таблицы и колонки, ссылки из которых запрещают удаление строки
+    references: tuple[tuple[str, str], ...]
+
+
+TABLES = {
+    'subject': CatalogTable('subject', 'subject_id', 'subject_name',
+                            (('executor_subject', 'subject_id'), ('task', 'subject_id'))),
+    'section': CatalogTable('section', 'section_id', 'section_name',
+                            (('executor_section', 'section_id'), ('task', 'section_id'))),
+    'task_type': CatalogTable('task_type', 'task_type_id', 'type_name',
+                              (('executor_task_type', 'task_type_id'), ('task', 'task_type_id'))),
+}
+
+
+@dataclass
+class Entry:
+    name: str
+    id: int | None = None
+    subject: str | None = None  # для раздела - название предмета
+
+
+@dataclass
+class TableChanges:
+    inserts: list[dict] = field(default_factory=list)
+    updates: list[dict] = field(default_factory=list)
+    deactivate: list[int] = field(default_factory=list)
+    delete: list[int] = field(default_factory=list)
+    unchanged: int = 0
+
+    def __bool__(self):
+        return bool(self.inserts or self.updates or self.deactivate or self.delete)
+
+    def format(self) -> str:
+        return (f"+{len(self.inserts)} новых, ~{len(self.updates)} изменено, "
+                f"-{len(self.deactivate)} деактивировано, x{len(self.delete)} удалено, {self.unchanged} без изменений")
+
+
+@dataclass
+class ImportPlan:
+    changes: dict[str, TableChanges]
+    # Название предмета из файла -> subject_id уже существующей строки (новые получают id при вставке)
+    subject_ids: dict[str, int]
+    version: int | None = None
+
+    def __bool__(self):
+        return any(self.changes.values())
+
+
+# --- Чтение файла ---
+
+def _entry(kind: str, raw, subject: str | None = None) -> Entry:
+    if isinstance(raw, str):
+        raw = {'name': raw}
+    if not isinstance(raw, dict):
+        raise ValueError(f"{kind}: ожидается название или {{id, name}}, получено {raw!r}")
+    name = str(raw.get('name') or '').strip()
+    if not name:
+        raise ValueError(f"{kind}: пустое название в {raw!r}")
+    raw_id = raw.get('id')
+    try:
+        entry_id = int(raw_id) if raw_id not in (None, '') else None
+    except ValueError:
+        raise ValueError(f"{kind} «{name}»: id должен быть числом, получено {raw_id!r}") from None
+    return Entry(name, entry_id, subject)
+
+
+def _load_yaml(path: Path) -> dict[str, list[Entry]]:
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("Для YAML-каталога установите пакет PyYAML (pip install pyyaml).") from None
+    document = yaml.safe_load(path.read_text(encoding='utf-8')) or {}
+    entries = {kind: [] for kind in KINDS}
+    for raw in document.get('subjects') or []:
+        subject = _entry('subject', raw)
+        entries['subject'].append(subject)
+        sections = raw.get('sections') if isinstance(raw, dict) else None
+        entries['section'].extend(_entry('section', item, subject.name) for item in sections or [])
+    entries['task_type'] = [_entry('task_type', raw) for raw in document.get('task_types') or []]
+    return entries
+
+
+def _load_csv(path: Path) -> dict[str, list[Entry]]:
+    entries = {kind: [] for kind in KINDS}
+    with path.open(encoding='utf-8-sig', newline='') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            kind = (row.get('kind') or '').strip()
+            if kind not in entries:
+                raise ValueError(f"{path.name}:{line}: kind должен быть одним из {', '.join(KINDS)}, получено {kind!r}")
+            subject = (row.get('subject') or '').strip() or None
+            if kind == 'section' and not subject:
+                raise ValueError(f"{path.name}:{line}: у раздела не указан предмет")
+            entries[kind].append(_entry(kind, {'id': (row.get('id') or '').strip(), 'name': row.get('name')},
+                                        subject if kind == 'section' else None))
+    return entries
+
+
+def load_catalog(path: str | Path) -> dict[str, list[Entry]]:
+    """Записи каталога из .csv или .yaml/.yml: kind -> список Entry."""
+    path = Path(path)
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        entries = _load_yaml(path)
+    elif path.suffix.lower() == '.csv':
+        entries = _load_csv(path)
+    else:
+        raise ValueError(f"Неизвестный формат каталога {path.name}: нужен .csv, .yaml или .yml")
+    _validate(entries)
+    return entries
+
+
+def _validate(entries: dict[str, list[Entry]]):
+    subjects = {entry.name for entry in entries['subject']}
+    for kind, items in entries.items():
+        seen_names, seen_ids = set(), set()
+        for entry in items:
+            scope = (entry.subject, entry.name)
+            if scope in seen_names:
+                where = f" предмета «{entry.subject}»" if entry.subject else ""
+                raise ValueError(f"{kind}: «{entry.name}»{where} встречается в файле дважды")
+            if entry.id is not None and entry.id in seen_ids:
+                raise ValueError(f"{kind}: id {entry.id} встречается в файле дважды")
+            seen_names.add(scope)
+            seen_ids.add(entry.id)
+            if kind == 'section' and entry.subject not in subjects:
+                raise ValueError(f"section «{entry.name}»: предмета «{entry.subject}» нет в файле")
+
+
+# --- Сравнение с базой ---
+
+def _read_rows(connection, kind: str) -> list[dict]:
+    table = TABLES[kind]
+    columns = [table.key, table.name, 'active'] + (['subject_id'] if kind == 'section' else [])
+    rows = connection.execute(f"SELECT {', '.join(columns)} FROM {table.table} ORDER BY {table.key}").fetchall()
+    return [{'id': row[0], 'name': row[1], 'active': bool(row[2]), 'subject_id': row[3] if len(row) > 3 else None}
+            for row in rows]
+
+
+def _referenced_ids(connection, kind: str) -> set[int]:
+    query = ' UNION '.join(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL"
+                           for table, column in TABLES[kind].references)
+    return {row[0] for row in connection.execute(query).fetchall()}
+
+
+def _match(kind: str, entries: list[Entry], rows: list[dict],
+           subject_ids: dict[str, int] | None = None) -> tuple[list[tuple[Entry, dict | None]], list[dict]]:
+    """
+    Пары (запись файла, строка БД или None для новой) и строки БД, которых в файле нет. Разделы
+    (subject_ids задан) ищутся по названию внутри своего предмета; раздел нового предмета - новый.
+    """
+    by_id = {row['id']: row for row in rows}
+    by_name = {}
+    # При одинаковых названиях в БД предпочитается активная строка с меньшим id
+    for row in sorted(rows, key=lambda row: (not row['active'], row['id'])):
+        by_name.setdefault((row['subject_id'], row['name']), row)
+    matched, pairs = set(), []
+    for entry in entries:
+        if entry.id is not None:
+            row = by_id.get(entry.id)
+            if row is None:
+                raise ValueError(f"{kind} «{entry.name}»: строки с id {entry.id} нет в базе")
+            if row['id'] in matched:
+                raise ValueError(f"{kind} «{entry.name}»: строка {row['id']} уже сопоставлена другой записи файла")
+        elif subject_ids is not None and entry.subject not in subject_ids:
+            row = None
+        else:
+            scope = subject_ids[entry.subject] if subject_ids is not None else None
+            row = by_name.get((scope, entry.name))
+            if row is not None and row['id'] in matched:
+                row = None
+        if row is not None:
+            matched.add(row['id'])
+        pairs.append((entry, row))
+    return pairs, [row for row in rows if row['id'] not in matched]
+
+
+def _diff(changes: TableChanges, pairs: list[tuple[Entry, dict | None]], subject_ids: dict[str, int]):
+    for entry, row in pairs:
+        if row is None:
+            changes.inserts.append({'name': entry.name, 'subject': entry.subject})
+            continue
+        # Раздел, перенесённый в новый предмет, получит его subject_id после вставки предмета
+        moved = entry.subject is not None and subject_ids.get(entry.subject) != row['subject_id']
+        if row['name'] != entry.name or not row['active'] or moved:
+            changes.updates.append({'id': row['id'], 'name': entry.name, 'subject': entry.subject,
+                                    'old_name': row['name']})
+        else:
+            changes.unchanged += 1
+
+
+def _remove(changes: TableChanges, rows: list[dict], keep: set[int], prune: bool):
+    """Строки, которых нет в файле: с prune неиспользуемые удаляются, остальные деактивируются."""
+    for row in rows:
+        if prune and row['id'] not in keep:
+            changes.delete.append(row['id'])
+        elif row['active']:
+            changes.deactivate.append(row['id'])
+        else:
+            changes.unchanged += 1
+
+
+def plan_import(connection, entries: dict[str, list[Entry]], prune: bool = False) -> ImportPlan:
+    """Сравнивает каталог из файла с таблицами subject, section и task_type; в базу ничего не пишет."""
+    changes = {kind: TableChanges() for kind in KINDS}
+
+    subject_pairs, missing_subjects = _match('subject', entries['subject'], _read_rows(connection, 'subject'))
+    subject_ids = {entry.name: row['id'] for entry, row in subject_pairs if row is not None}
+    _diff(changes['subject'], subject_pairs, subject_ids)
+
+    section_pairs, missing_sections = _match('section', entries['section'], _read_rows(connection, 'section'),
+                                             subject_ids)
+    _diff(changes['section'], section_pairs, subject_ids)
+    _remove(changes['section'], missing_sections, _referenced_ids(connection, 'section'), prune)
+
+    # Предмет нельзя удалить, пока на него ссылается хотя бы один оставшийся раздел
+    deleted_sections = set(changes['section'].delete)
+    kept_subjects = _referenced_ids(connection, 'subject') | {
+        row['subject_id'] for row in missing_sections if row['id'] not in deleted_sections}
+    _remove(changes['subject'], missing_subjects, kept_subjects, prune)
+
+    task_type_pairs, missing_task_types = _match('task_type', entries['task_type'],
+                                                 _read_rows(connection, 'task_type'))
+    _diff(changes['task_type'], task_type_pairs, subject_ids)
+    _remove(changes['task_type'], missing_task_types, _referenced_ids(connection, 'task_type'), prune)
+    return ImportPlan(changes, subject_ids)
+
+
+# --- Запись ---
+
+def _batches(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _insert_subjects(connection, dialect: str, rows: list[dict]) -> dict[str, int]:
+    """Вставляет предметы многострочными INSERT ... RETURNING: название -> новый subject_id."""
+    ids = {}
+    for batch in _batches(rows):
+        values = ', '.join([f"({PLACEHOLDER[dialect]})"] * len(batch))
+        query = f"INSERT INTO subject (subject_name) VALUES {values} RETURNING subject_id, subject_name"
+        ids.update({row[1]: row[0] for row in connection.execute(query, [row['name'] for row in batch]).fetchall()})
+    return ids
+
+
+def _set_active(connection, dialect: str, kind: str, ids: list[int], active: bool):
+    table = TABLES[kind]
+    for batch in _batches(ids):
+        marks = ', '.join([PLACEHOLDER[dialect]] * len(batch))
+        connection.execute(f"UPDATE {table.table} SET active = {PLACEHOLDER[dialect]} WHERE {table.key} IN ({marks})",
+                           [active, *batch])
+
+
+def _delete(connection, dialect: str, kind: str, ids: list[int]):
+    table = TABLES[kind]
+    for batch in _batches(ids):
+        marks = ', '.join([PLACEHOLDER[dialect]] * len(batch))
+        connection.execute(f"DELETE FROM {table.table} WHERE {table.key} IN ({marks})", batch)
+
+
+def _bump_version(connection, dialect: str) -> int:
+    return connection.execute(
+        "INSERT INTO catalog_version (catalog_id, version) VALUES (1, 1) "
+        "ON CONFLICT (catalog_id) DO UPDATE SET version = catalog_version.version + 1, updated_at = CURRENT_TIMESTAMP "
+        "RETURNING version"
+    ).fetchone()[0]
+
+
+def apply_plan(connection, dialect: str, plan: ImportPlan) -> int:
+    """
+    Записывает план пачками и поднимает версию каталога; вызывается внутри транзакции.
+    Порядок учитывает внешние ключи: предметы до разделов, разделы удаляются раньше предметов.
+    """
+    mark = PLACEHOLDER[dialect]
+    cursor = connection.cursor()
+    subjects, sections, task_types = (plan.changes[kind] for kind in KINDS)
+
+    subject_ids = dict(plan.subject_ids)
+    subject_ids.update(_insert_subjects(connection, dialect, subjects.inserts))
+    if subjects.updates:
+        cursor.executemany(f"UPDATE subject SET subject_name = {mark}, active = {mark} WHERE subject_id = {mark}",
+                           [(row['name'], True, row['id']) for row in subjects.updates])
+
+    if sections.inserts:
+        cursor.executemany(f"INSERT INTO section (subject_id, section_name) VALUES ({mark}, {mark})",
+                           [(subject_ids[row['subject']], row['name']) for row in sections.inserts])
+    if sections.updates:
+        cursor.executemany(
+            f"UPDATE section SET subject_id = {mark}, section_name = {mark}, active = {mark} WHERE section_id = {mark}",
+            [(subject_ids[row['subject']], row['name'], True, row['id']) for row in sections.updates])
+    _set_active(connection, dialect, 'section', sections.deactivate, False)
+    _delete(connection, dialect, 'section', sections.delete)
+
+    _set_active(connection, dialect, 'subject', subjects.deactivate, False)
+    _delete(connection, dialect, 'subject', subjects.delete)
+
+    if task_types.inserts:
+        cursor.executemany(f"INSERT INTO task_type (type_name) VALUES ({mark})",
+                           [(row['name'],) for row in task_types.inserts])
+    if task_types.updates:
+        cursor.executemany(f"UPDATE task_type SET type_name = {mark}, active = {mark} WHERE task_type_id = {mark}",
+                           [(row['name'], True, row['id']) for row in task_types.updates])
+    _set_active(connection, dialect, 'task_type', task_types.deactivate, False)
+    _delete(connection, dialect, 'task_type', task_types.delete)
+
+    return _bump_version(connection, dialect)
+
+
+def import_catalog(connection, dialect: str, entries: dict[str, list[Entry]], prune: bool = False,
+                   dry_run: bool = False) -> ImportPlan:
+    """
+    Сравнение и запись в одной транзакции: ссылки на строки проверяются под той же блокировкой,
+    под которой строки удаляются. Без изменений версия не поднимается. Соединение - в autocommit-режиме.
+    """
+    if dry_run:
+        return plan_import(connection, entries, prune)
+    with Transaction(connection, dialect):
+        plan = plan_import(connection, entries, prune)
+        if plan:
+            plan.version = apply_plan(connection, dialect, plan)
+    if plan:
+        logger.info("Catalog imported, version %s: %s", plan.version,
+                    "; ".join(f"{kind} {changes.format()}" for kind, changes in plan.changes.items()))
+    return plan
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable
+
+from database.models import NOTIFY_CHANNEL, NOTIFY_TABLES
+from utils.config import INVALIDATION_BACKEND, INVALIDATION_DSN, DATABASE_URL, API_DATABASE_KEY
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед переподключением слушателя после обрыва соединения
+_RECONNECT_DELAY = 1.0
+
+ChangeHandler = Callable[[str, dict], Awaitable[None] | None]
+# Доставки из колбэков Realtime: цикл событий держит на задачу только слабую ссылку
+_deliveries: set[asyncio.Task] = set()
+
+
+def _delivery_done(task: asyncio.Task):
+    _deliveries.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error("Invalidation event delivery failed: %s", task.exception())
+
+
+class InvalidationBus:
+    """
+    Шина инвалидации кэшей между воркерами. Источник событий (transport) присылает изменения
+    строк - (таблица, операция, ключевые колонки строки), - шина вызывает подписчиков таблицы,
+    а те вытесняют свои записи кэша. Кэши остаются с длинным TTL: устаревание снимает событие,
+    а не истечение срока.
+    """
+
+    def __init__(self, transport: 'Transport'):
+        self.transport = transport
+        self._handlers: dict[str, list[ChangeHandler]] = {}
+        self._reset_handlers: list[Callable[[], None]] = []
+        self.received = 0
+
+    def subscribe(self, table: str, handler: ChangeHandler):
+        """handler(op, row) вызывается на каждое изменение строки table."""
+        self._handlers.setdefault(table, []).append(handler)
+
+    def on_reset(self, handler: Callable[[], None]):
+        """handler() вызывается, когда события могли быть потеряны (переподключение): кэш сбрасывается целиком."""
+        self._reset_handlers.append(handler)
+
+    def reset(self):
+        for handler in self._reset_handlers:
+            try:
+                handler()
+            except Exception as e:
+                logger.error("Cache reset handler failed: %s", e)
+
+    async def dispatch(self, table: str, op: str, row: dict):
+        self.received += 1
+        for handler in self._handlers.get(table, ()):
+            try:
+                result = handler(op, row)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error("Cache invalidation handler for %s failed: %s", table, e)
+
+    async def start(self):
+        await self.transport.start(self.dispatch, self.reset)
+        logger.info("Invalidation bus started (%s), tables: %s",
+                    type(self.transport).__name__, ", ".join(sorted(self._handlers)))
+
+    async def stop(self):
+        await self.transport.stop()
+
+
+class Transport:
+    async def start(self, deliver: Callable[[str, str, dict], Awaitable[None]], reset: Callable[[], None]):
+        self._deliver = deliver
+        self._reset = reset
+
+    async def stop(self):
+        pass
+
+
+class LocalTransport(Transport):
+    """
+    Pub/sub внутри процесса: замена LISTEN/NOTIFY для одного воркера (SQLite) и тестов.
+    emit() доставляет событие всем запущенным экземплярам с тем же каналом - так, как его
+    прислал бы триггер БД.
+    """
+    _channels: dict[str, list['LocalTransport']] = {}
+
+    def __init__(self, channel: str = NOTIFY_CHANNEL):
+        self.channel = channel
+
+    async def start(self, deliver, reset):
+        await super().start(deliver, reset)
+        self._channels.setdefault(self.channel, []).append(self)
+
+    async def stop(self):
+        subscribers = self._channels.get(self.channel, [])
+        if self in subscribers:
+            subscribers.remove(self)
+
+    async def emit(self, table: str, op: str, row: dict):
+        for subscriber in list(self._channels.get(self.channel, ())):
+            await subscriber._deliver(table, op, row)
+
+
+class PostgresTransport(Transport):
+    """
+    LISTEN на канале cache_invalidation через отдельное соединение psycopg. События шлют
+    триггеры таблиц (pg_notify с JSON {table, op, row}), доставка - в пределах миллисекунд.
+    При обрыве соединения слушатель переподключается; события, пропущенные за это время,
+    восполняются полным сбросом кэшей (reset).
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._task: asyncio.Task | None = None
+
+    async def start(self, deliver, reset):
+        await super().start(deliver, reset)
+        self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        import psycopg
+
+        connected_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as connection:
+                    await connection.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    if connected_before:
+                        self._reset()
+                    connected_before = True
+                    async for notify in connection.notifies():
+                        event = json.loads(notify.payload)
+                        await self._deliver(event['table'], event['op'], event.get('row') or {})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Invalidation listener disconnected: %s", e)
+                await asyncio.sleep(_RECONNECT_DELAY)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class SupabaseRealtimeTransport(Transport):
+    """
+    Изменения таблиц из Supabase Realtime (postgres_changes). Для таблиц нужно включить
+    публикацию supabase_realtime в панели Supabase.
+    """
+
+    def __init__(self, url: str, key: str, tables: tuple[str, ...] = ()):
+        self.url = url
+        self.key = key
+        self.tables = tables
+        self._client = None
+        self._channel = None
+
+    async def start(self, deliver, reset):
+        await super().start(deliver, reset)
+        from supabase import acreate_client
+
+        self._client = await acreate_client(self.url, self.key)
+        self._channel = self._client.channel(NOTIFY_CHANNEL)
+        for table in self.tables:
+            self._channel.on_postgres_changes('*', schema='public', table=table, callback=self._on_change)
+        await self._channel.subscribe()
+
+    def _on_change(self, payload: dict):
+        data = payload.get('data', payload)
+        op = data.get('type') or data.get('eventType')
+        row = data.get('record') or data.get('old_record') or data.get('new') or data.get('old') or {}
+        task = asyncio.get_running_loop().create_task(self._deliver(data.get('table'), str(op).upper(), row))
+        _deliveries.add(task)
+        task.add_done_callback(_delivery_done)
+
+    async def stop(self):
+        if self._channel:
+            await self._channel.unsubscribe()
+
+
+_bus: InvalidationBus | None = None
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    """Шина выбранного в INVALIDATION_BACKEND источника событий (local, postgres или supabase)."""
+    global _bus
+    if _bus is None:
+        if INVALIDATION_BACKEND == 'postgres':
+            transport = PostgresTransport(INVALIDATION_DSN)
+        elif INVALIDATION_BACKEND == 'supabase':
+            transport = SupabaseRealtimeTransport(DATABASE_URL, API_DATABASE_KEY, tuple(NOTIFY_TABLES))
+        else:
+            transport = LocalTransport()
+        _bus = InvalidationBus(transport)
+    return _bus
@@ -0,0 +1,821 @@
+"""
+Декларативная схема БД и версионированные миграции.
+
+Таблицы и индексы описаны один раз и превращаются в DDL для SQLite и PostgreSQL (Supabase).
+Миграции применяются по порядку, применённые версии записываются в schema_migrations.
+Операции идемпотентны (IF NOT EXISTS, колонка добавляется только при её отсутствии), поэтому
+миграции безопасно применять и к базе, созданной раньше вручную в панели Supabase или
+прежней версией SQLiteRepository.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+DIALECTS = ('sqlite', 'postgres')
+# Тип колонки -> тип в диалекте; 'id' - суррогатный первичный ключ с автонумерацией
+TYPES = {
+    'id': {'sqlite': 'INTEGER', 'postgres': 'bigint'},
+    'bigint': {'sqlite': 'INTEGER', 'postgres': 'bigint'},
+    'int': {'sqlite': 'INTEGER', 'postgres': 'integer'},
+    'text': {'sqlite': 'TEXT', 'postgres': 'text'},
+    'bool': {'sqlite': 'INTEGER', 'postgres': 'boolean'},
+    'timestamp': {'sqlite': 'TEXT', 'postgres': 'timestamptz'},
+    'json': {'sqlite': 'TEXT', 'postgres': 'jsonb'},
+}
+NOW = object()
+# Плейсхолдер параметра запроса в диалекте (sqlite3 и psycopg)
+PLACEHOLDER = {'sqlite': '?', 'postgres': '%s'}
+
+
+def _literal(value, dialect: str) -> str:
+    if value is NOW:
+        return 'CURRENT_TIMESTAMP'
+    if isinstance(value, bool):
+        return ('1' if value else '0') if dialect == 'sqlite' else ('true' if value else 'false')
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+class Column:
+    def __init__(self, name: str, type: str, *, nullable: bool = True, default=None, primary_key: bool = False,
+                 references: str | None = None, unique: bool = False):
+        self.name = name
+        self.type = type
+        self.nullable = nullable
+        self.default = default
+        self.primary_key = primary_key
+        self.references = references  # 'table (column)'
+        self.unique = unique
+
+    def ddl(self, dialect: str) -> str:
+        parts = [self.name, TYPES[self.type][dialect]]
+        if self.primary_key:
+            if self.type == 'id' and dialect == 'postgres':
+                parts.append('GENERATED BY DEFAULT AS IDENTITY')
+            parts.append('PRIMARY KEY')
+        elif not self.nullable:
+            parts.append('NOT NULL')
+        if self.unique:
+            parts.append('UNIQUE')
+        if self.default is not None:
+            parts.append(f'DEFAULT {_literal(self.default, dialect)}')
+        if self.references:
+            parts.append(f'REFERENCES {self.references}')
+        return ' '.join(parts)
+
+
+class Table:
+    def __init__(self, name: str, *columns: Column, primary_key: tuple[str, ...] = (),
+                 unique: tuple[tuple[str, ...], ...] = ()):
+        self.name = name
+        self.columns = {column.name: column for column in columns}
+        self.primary_key = primary_key  # составной ключ; одиночный - Column(primary_key=True)
+        self.unique = unique
+
+    def ddl(self, dialect: str) -> str:
+        lines = [column.ddl(dialect) for column in self.columns.values()]
+        if self.primary_key:
+            lines.append(f"PRIMARY KEY ({', '.join(self.primary_key)})")
+        lines.extend(f"UNIQUE ({', '.join(columns)})" for columns in self.unique)
+        body = ',\n    '.join(lines)
+        return f"CREATE TABLE IF NOT EXISTS {self.name} (\n    {body}\n)"
+
+
+class Index:
+    def __init__(self, name: str, table: str, columns: tuple[str, ...], *, unique: bool = False,
+                 where: str | None = None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.where = where  # частичный индекс; условие одинаково понимают SQLite и PostgreSQL
+
+    def ddl(self, dialect: str) -> str:
+        ddl = (f"CREATE {'UNIQUE ' if self.unique else ''}INDEX IF NOT EXISTS {self.name} "
+               f"ON {self.table} ({', '.join(self.columns)})")
+        return f"{ddl} WHERE {self.where}" if self.where else ddl
+
+
+TABLES = {table.name: table for table in (
+    Table(
+        'users',
+        Column('user_id', 'bigint', primary_key=True),
+        Column('username', 'text'),
+        Column('role', 'text'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+        # Когда рассылка получила от Telegram отказ (бот заблокирован); сбрасывается при /start
+        Column('blocked_at', 'timestamp'),
+    ),
+    Table(
+        'user_activity',
+        Column('user_id', 'bigint', primary_key=True),
+        Column('last_seen', 'timestamp', nullable=False),
+    ),
+    Table(
+        'user_event',
+        Column('event_id', 'id', primary_key=True),
+        Column('user_id', 'bigint', nullable=False),
+        Column('event', 'text', nullable=False),
+        Column('payload', 'json'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'subject',
+        Column('subject_id', 'id', primary_key=True),
+        Column('subject_name', 'text', nullable=False),
+        # Убранные из каталога строки не удаляются, если на них ссылаются анкеты или заказы
+        Column('active', 'bool', nullable=False, default=True),
+    ),
+    Table(
+        'section',
+        Column('section_id', 'id', primary_key=True),
+        Column('subject_id', 'bigint', nullable=False, references='subject (subject_id)'),
+        Column('section_name', 'text', nullable=False),
+        Column('active', 'bool', nullable=False, default=True),
+    ),
+    Table(
+        'task_type',
+        Column('task_type_id', 'id', primary_key=True),
+        Column('type_name', 'text', nullable=False),
+        Column('active', 'bool', nullable=False, default=True),
+    ),
+    # Версия справочников (одна строка): её поднимает импорт каталога (import_catalog.py),
+    # по ней кэши и отрисованные клавиатуры понимают, что каталог сменился
+    Table(
+        'catalog_version',
+        Column('catalog_id', 'int', primary_key=True),
+        Column('version', 'int', nullable=False, default=0),
+        Column('updated_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'customer',
+        Column('customer_id', 'id', primary_key=True),
+        Column('user_id', 'bigint', nullable=False, unique=True),
+        Column('customer_name', 'text'),
+        Column('personal_data_access', 'bool', nullable=False, default=False),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'executor',
+        Column('executor_id', 'id', primary_key=True),
+        Column('user_id', 'bigint', nullable=False, unique=True),
+        Column('executor_name', 'text'),
+        Column('description', 'text'),
+        Column('experience', 'int'),
+        Column('education', 'text'),
+        Column('photo_url', 'text'),
+        Column('personal_data_access', 'bool', nullable=False, default=False),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'executor_subject',
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('subject_id', 'bigint', nullable=False, references='subject (subject_id)'),
+        primary_key=('executor_id', 'subject_id'),
+    ),
+    Table(
+        'executor_section',
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('section_id', 'bigint', nullable=False, references='section (section_id)'),
+        primary_key=('executor_id', 'section_id'),
+    ),
+    Table(
+        'executor_task_type',
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('task_type_id', 'bigint', nullable=False, references='task_type (task_type_id)'),
+        primary_key=('executor_id', 'task_type_id'),
+    ),
+    Table(
+        'task',
+        Column('task_id', 'id', primary_key=True),
+        Column('customer_id', 'bigint', nullable=False, references='customer (customer_id)'),
+        Column('subject_id', 'bigint', references='subject (subject_id)'),
+        Column('section_id', 'bigint', references='section (section_id)'),
+        Column('task_type_id', 'bigint', references='task_type (task_type_id)'),
+        Column('description', 'text'),
+        Column('attachments_urls', 'json'),
+        Column('deadline', 'text'),
+        Column('status', 'text', nullable=False, default='open'),
+        Column('executor_id', 'bigint', references='executor (executor_id)'),
+        Column('version', 'int', nullable=False, default=0),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'offer',
+        Column('offer_id', 'id', primary_key=True),
+        Column('task_id', 'bigint', nullable=False, references='task (task_id)'),
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('price', 'int', nullable=False),
+        Column('eta_hours', 'int', nullable=False),
+        Column('status', 'text', nullable=False, default='pending'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+        unique=(('task_id', 'executor_id'),),
+    ),
+    Table(
+        'rating',
+        Column('rating_id', 'id', primary_key=True),
+        Column('task_id', 'bigint', nullable=False, unique=True, references='task (task_id)'),
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('score', 'int', nullable=False),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    # Сводка по исполнителю, которую поддерживают триггеры (_STATS_SQL): читается одной строкой
+    Table(
+        'executor_stats',
+        Column('executor_id', 'bigint', primary_key=True, references='executor (executor_id)'),
+        Column('rating_count', 'int', nullable=False, default=0),
+        Column('rating_sum', 'int', nullable=False, default=0),
+        *(Column(f'score_{score}', 'int', nullable=False, default=0) for score in range(1, 6)),
+        Column('recent_scores', 'json', nullable=False, default='[]'),
+        Column('completed_count', 'int', nullable=False, default=0),
+        Column('response_count', 'int', nullable=False, default=0),
+        Column('response_seconds_sum', 'bigint', nullable=False, default=0),
+        Column('updated_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    # Поддержка: обращение пользователя, его сообщения и ответы операторов, операторы на смене
+    Table(
+        'support_ticket',
+        Column('ticket_id', 'id', primary_key=True),
+        Column('user_id', 'bigint', nullable=False),
+        Column('status', 'text', nullable=False, default='open'),
+        Column('operator_id', 'bigint'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+        Column('closed_at', 'timestamp'),
+    ),
+    Table(
+        'support_message',
+        Column('message_id', 'id', primary_key=True),
+        Column('ticket_id', 'bigint', nullable=False, references='support_ticket (ticket_id)'),
+        Column('direction', 'text', nullable=False),
+        Column('text', 'text', nullable=False),
+        # Сообщение в чате сотрудников, в котором пришла пачка; NULL - ещё не доставлено
+        Column('staff_message_id', 'bigint'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'support_operator',
+        Column('operator_id', 'bigint', primary_key=True),
+        Column('online', 'bool', nullable=False, default=False),
+        Column('updated_at', 'timestamp', nullable=False, default=NOW),
+    ),
+)}
+
+# Индексы под горячие запросы. Поиск по users.user_id и customer.user_id уже покрыт первичным
+# ключом и UNIQUE.
+INDEXES = {index.name: index for index in (
+    Index('section_subject_id_idx', 'section', ('subject_id',)),
+    Index('task_customer_id_created_at_idx', 'task', ('customer_id', 'created_at')),
+    Index('executor_subject_subject_id_idx', 'executor_subject', ('subject_id', 'executor_id')),
+    Index('executor_section_section_id_idx', 'executor_section', ('section_id', 'executor_id')),
+    Index('executor_task_type_task_type_id_idx', 'executor_task_type', ('task_type_id', 'executor_id')),
+    Index('user_activity_last_seen_idx', 'user_activity', ('last_seen',)),
+    Index('offer_task_id_created_at_idx', 'offer', ('task_id', 'created_at')),
+    Index('task_status_task_id_idx', 'task', ('status', 'task_id')),
+    # Получатели рассылки по роли: keyset по user_id, заблокировавшие бота пропускаются
+    Index('users_role_user_id_idx', 'users', ('role', 'user_id'), where="blocked_at IS NULL"),
+    # Рассылка нескольким ролям сразу: обход по user_id без сортировки, роль проверяется по индексу
+    Index('users_unblocked_user_id_idx', 'users', ('user_id', 'role'), where="blocked_at IS NULL"),
+    # Не больше одного незакрытого обращения на пользователя
+    Index('support_ticket_open_user_id_idx', 'support_ticket', ('user_id',), unique=True,
+          where="status <> 'closed'"),
+    Index('support_ticket_status_ticket_id_idx', 'support_ticket', ('status', 'ticket_id')),
+    Index('support_ticket_operator_id_idx', 'support_ticket', ('operator_id', 'status')),
+    Index('support_message_ticket_id_idx', 'support_message', ('ticket_id', 'message_id')),
+    Index('support_message_staff_message_id_idx', 'support_message', ('staff_message_id',)),
+)}
+
+# Таблицы, изменения которых рассылаются воркерам для сброса кэшей (database/invalidation.py):
+# таблица -> колонки строки, попадающие в событие. Частые записи (user_activity, user_event) не рассылаются.
+NOTIFY_CHANNEL = 'cache_invalidation'
+NOTIFY_TABLES = {
+    'users': ('user_id',),
+    'subject': ('subject_id',),
+    'section': ('section_id', 'subject_id'),
+    'task_type': ('task_type_id',),
+    'executor': ('executor_id',),
+    'executor_subject': ('executor_id',),
+    'executor_section': ('executor_id',),
+    'executor_task_type': ('executor_id',),
+    'task': ('task_id',),
+    'offer': ('task_id',),
+    'executor_stats': ('executor_id',),
+    'catalog_version': ('version',),
+}
+_NOTIFY_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+    DECLARE
+        changed jsonb := to_jsonb(COALESCE(NEW, OLD));
+        keys jsonb := '{{}}'::jsonb;
+        key text;
+    BEGIN
+        FOREACH key IN ARRAY TG_ARGV LOOP
+            keys := keys || jsonb_build_object(key, changed -> key);
+        END LOOP;
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'row', keys)::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def _notify_trigger_sql(table: str) -> list[str]:
+    keys = ', '.join(_literal(column, 'postgres') for column in NOTIFY_TABLES[table])
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_cache_invalidation ON {table}",
+        f"CREATE TRIGGER {table}_cache_invalidation AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation({keys})",
+    ]
+
+
+def _fts_text(row: str) -> str:
+    # unicode61 не приравнивает ё к е: индексируется текст с заменой, как и запрос (utils.search_index.tokenize)
+    return f"replace(replace({row}.description, 'ё', 'е'), 'Ё', 'Е')"
+
+
+# Полнотекстовый поиск по описанию заказа: в PostgreSQL - генерируемая колонка tsvector с GIN-индексом,
+# в SQLite - внешняя таблица FTS5 над task, которую поддерживают триггеры
+_FULL_TEXT_SQL = {
+    'postgres': [
+        "ALTER TABLE task ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('russian', coalesce(description, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS task_search_vector_idx ON task USING gin (search_vector)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5("
+        "description, content='task', content_rowid='task_id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN "
+        f"INSERT INTO task_fts (rowid, description) VALUES (new.task_id, {_fts_text('new')}); END",
+        "CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN "
+        f"INSERT INTO task_fts (task_fts, rowid, description) VALUES ('delete', old.task_id, {_fts_text('old')}); END",
+        "CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF description ON task BEGIN "
+        f"INSERT INTO task_fts (task_fts, rowid, description) VALUES ('delete', old.task_id, {_fts_text('old')}); "
+        f"INSERT INTO task_fts (rowid, description) VALUES (new.task_id, {_fts_text('new')}); END",
+        "INSERT INTO task_fts (task_fts) VALUES ('delete-all')",
+        f"INSERT INTO task_fts (rowid, description) SELECT task_id, {_fts_text('task')} FROM task",
+    ],
+}
+
+
+# Сводка по исполнителю обновляется триггерами в той же транзакции, что и событие: оценка (rating),
+# завершение заказа (task.status -> completed) и первый отклик на заказ (offer). Каждое событие -
+# один upsert с приращениями, поэтому сводка согласована при любом числе воркеров.
+RECENT_SCORES = 10
+_NOW_SQL = {'sqlite': 'CURRENT_TIMESTAMP', 'postgres': 'now()'}
+_RECENT_SCORES_SQL = {
+    'sqlite': (
+        "(SELECT json_group_array(score) FROM (SELECT -1 AS n, NEW.score AS score UNION ALL "
+        "SELECT key, value FROM json_each(executor_stats.recent_scores) ORDER BY n LIMIT {limit}))"
+    ),
+    'postgres': (
+        "(SELECT jsonb_agg(score ORDER BY n) FROM (SELECT 0 AS n, NEW.score AS score UNION ALL "
+        "SELECT n, value::int FROM jsonb_array_elements_text(executor_stats.recent_scores) WITH ORDINALITY AS e(value, n) "
+        "ORDER BY n LIMIT {limit}) recent)"
+    ),
+}
+_RESPONSE_SECONDS_SQL = {
+    'sqlite': "MAX(0, CAST(ROUND((julianday({offer}.created_at) - julianday(task.created_at)) * 86400) AS INTEGER))",
+    'postgres': "GREATEST(0, EXTRACT(EPOCH FROM {offer}.created_at - task.created_at))::bigint",
+}
+
+
+def _stats_upsert(dialect: str, increments: dict[str, str], extra: dict[str, tuple[str, str]] | None = None) -> str:
+    """
+    upsert строки executor_stats для NEW.executor_id: increments - колонка -> приращение,
+    extra - колонка -> (значение для новой строки, выражение обновления).
+    """
+    extra = extra or {}
+    columns = ['executor_id', *increments, *extra]
+    values = ['NEW.executor_id', *increments.values(), *(value for value, _ in extra.values())]
+    updates = [f"{column} = executor_stats.{column} + excluded.{column}" for column in increments]
+    updates += [f"{column} = {update}" for column, (_, update) in extra.items()]
+    updates.append(f"updated_at = {_NOW_SQL[dialect]}")
+    return (f"INSERT INTO executor_stats ({', '.join(columns)}) VALUES ({', '.join(values)}) "
+            f"ON CONFLICT (executor_id) DO UPDATE SET {', '.join(updates)}")
+
+
+def _stats_trigger_sql(dialect: str, name: str, event: str, when: str | None, body: str) -> list[str]:
+    table = event.rsplit(' ', 1)[-1]
+    if dialect == 'postgres':
+        return [
+            f"CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$ BEGIN {body}; RETURN NULL; END; "
+            f"$$ LANGUAGE plpgsql",
+            f"DROP TRIGGER IF EXISTS {name} ON {table}",
+            f"CREATE TRIGGER {name} AFTER {event} FOR EACH ROW" + (f" WHEN ({when})" if when else "")
+            + f" EXECUTE FUNCTION {name}()",
+        ]
+    return [f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event}" + (f" WHEN {when}" if when else "")
+            + f" BEGIN {body}; END"]
+
+
+def _stats_sql(dialect: str) -> list[str]:
+    as_int = (lambda condition: f"({condition})") if dialect == 'sqlite' else (lambda condition: f"({condition})::int")
+    first_scores = "json_array(NEW.score)" if dialect == 'sqlite' else "jsonb_build_array(NEW.score)"
+    rating = _stats_upsert(dialect, {
+        'rating_count': '1',
+        'rating_sum': 'NEW.score',
+        **{f'score_{score}': as_int(f"NEW.score = {score}") for score in range(1, 6)},
+    }, {'recent_scores': (first_scores, _RECENT_SCORES_SQL[dialect].format(limit=RECENT_SCORES))})
+    completed = _stats_upsert(dialect, {'completed_count': '1'})
+    response_seconds = _RESPONSE_SECONDS_SQL[dialect].format(offer='NEW')
+    response = _stats_upsert(dialect, {
+        'response_count': '1',
+        'response_seconds_sum': f"(SELECT {response_seconds} FROM task WHERE task.task_id = NEW.task_id)",
+    })
+    backfill_seconds = _RESPONSE_SECONDS_SQL[dialect].format(offer='offer')
+    return [
+        *_stats_trigger_sql(dialect, 'executor_stats_rating', 'INSERT ON rating', None, rating),
+        *_stats_trigger_sql(dialect, 'executor_stats_completed', 'UPDATE OF status ON task',
+                            "NEW.status = 'completed' AND OLD.status <> 'completed' AND NEW.executor_id IS NOT NULL",
+                            completed),
+        *_stats_trigger_sql(dialect, 'executor_stats_response', 'INSERT ON offer', None, response),
+        # Отклики, оставленные до появления сводки
+        f"INSERT INTO executor_stats (executor_id, response_count, response_seconds_sum) "
+        f"SELECT offer.executor_id, COUNT(*), SUM({backfill_seconds}) FROM offer "
+        f"JOIN task ON task.task_id = offer.task_id GROUP BY offer.executor_id",
+    ]
+
+
+_STATS_SQL = {dialect: _stats_sql(dialect) for dialect in DIALECTS}
+
+
+# Функции PostgreSQL для Supabase: PostgREST выполняет каждый запрос в своей транзакции, поэтому
+# операции из нескольких записей вызываются одной функцией через rpc. В SQLite то же самое
+# делает SQLiteRepository внутри _transaction().
+_FUNCTIONS_SQL = {
+    # Назначение исполнителя: условное обновление заказа (status и version) и разбор откликов
+    'assign_task': """
+        CREATE OR REPLACE FUNCTION assign_task(p_task_id bigint, p_offer_id bigint, p_version integer)
+        RETURNS SETOF task AS $$
+        DECLARE
+            assigned task;
+        BEGIN
+            UPDATE task SET
+                status = 'assigned',
+                version = task.version + 1,
+                executor_id = (SELECT offer.executor_id FROM offer WHERE offer.offer_id = p_offer_id)
+            WHERE task.task_id = p_task_id AND task.status = 'open' AND task.version = p_version
+              AND EXISTS (SELECT 1 FROM offer WHERE offer.offer_id = p_offer_id AND offer.task_id = p_task_id
+                          AND offer.status = 'pending')
+            RETURNING * INTO assigned;
+            IF NOT FOUND THEN
+                RETURN;
+            END IF;
+            UPDATE offer SET status = CASE WHEN offer.offer_id = p_offer_id THEN 'accepted' ELSE 'rejected' END
+            WHERE offer.task_id = p_task_id AND offer.status = 'pending';
+            RETURN NEXT assigned;
+        END;
+        $$ LANGUAGE plpgsql
+    """,
+    # Завершение заказа с оценкой: условное обновление срабатывает один раз, и оценка пишется
+    # в той же транзакции - заказ не может остаться завершённым без оценки
+    'complete_task': """
+        CREATE OR REPLACE FUNCTION complete_task(p_task_id bigint, p_user_id bigint, p_score integer)
+        RETURNS SETOF rating AS $$
+        DECLARE
+            completed_executor_id bigint;
+        BEGIN
+            UPDATE task SET status = 'completed', version = task.version + 1
+            WHERE task.task_id = p_task_id AND task.status = 'assigned'
+              AND task.customer_id = (SELECT customer.customer_id FROM customer WHERE customer.user_id = p_user_id)
+            RETURNING task.executor_id INTO completed_executor_id;
+            IF NOT FOUND THEN
+                RETURN;
+            END IF;
+            RETURN QUERY
+                INSERT INTO rating (task_id, executor_id, score) VALUES (p_task_id, completed_executor_id, p_score)
+                RETURNING *;
+        END;
+        $$ LANGUAGE plpgsql
+    """,
+}
+
+
+# --- Операции миграций ---
+
+class CreateTable:
+    """
+    Создаёт таблицу: по имени - в текущем виде из TABLES, либо по замороженному описанию Table.
+    Когда таблица меняется, создавшая её миграция получает замороженное описание (как миграция 1),
+    а само изменение оформляется новой миграцией - иначе на новой базе оно молча попадёт в старую версию.
+    """
+
+    def __init__(self, table: 'Table | str'):
+        self.table = table
+
+    def apply(self, connection, dialect: str):
+        table = TABLES[self.table] if isinstance(self.table, str) else self.table
+        connection.execute(table.ddl(dialect))
+
+
+class CreateIndex:
+    def __init__(self, index: str):
+        self.index = index
+
+    def apply(self, connection, dialect: str):
+        connection.execute(INDEXES[self.index].ddl(dialect))
+
+
+class AddColumn:
+    """Добавляет колонку из описания таблицы, если её ещё нет (на новой базе её уже создала CreateTable)."""
+
+    def __init__(self, table: str, column: str):
+        self.table = table
+        self.column = column
+
+    def apply(self, connection, dialect: str):
+        ddl = TABLES[self.table].columns[self.column].ddl(dialect)
+        if dialect == 'postgres':
+            connection.execute(f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS {ddl}")
+            return
+        existing = {row[1] for row in connection.execute(f"PRAGMA table_info({self.table})")}
+        if self.column not in existing:
+            connection.execute(f"ALTER TABLE {self.table} ADD COLUMN {ddl}")
+
+
+class CreateNotifyTriggers:
+    """Триггеры pg_notify на таблицах из NOTIFY_TABLES. Только PostgreSQL: SQLite работает в одном процессе."""
+
+    def __init__(self, *tables: str):
+        self.tables = tables
+
+    def apply(self, connection, dialect: str):
+        if dialect != 'postgres':
+            return
+        connection.execute(_NOTIFY_FUNCTION)
+        for table in self.tables:
+            for statement in _notify_trigger_sql(table):
+                connection.execute(statement)
+
+
+class CreateFullTextSearch:
+    """Индекс полнотекстового поиска по task.description в своём для диалекта виде."""
+
+    def apply(self, connection, dialect: str):
+        for statement in _FULL_TEXT_SQL[dialect]:
+            connection.execute(statement)
+
+
+class CreateExecutorStats:
+    """Триггеры сводки executor_stats и её заполнение по уже существующим откликам."""
+
+    def apply(self, connection, dialect: str):
+        for statement in _STATS_SQL[dialect]:
+            connection.execute(statement)
+
+
+class CreateFunction:
+    """Функция из _FUNCTIONS_SQL для вызова через rpc. Только PostgreSQL."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def apply(self, connection, dialect: str):
+        if dialect != 'postgres':
+            return
+        connection.execute(_FUNCTIONS_SQL[self.name])
+        # PostgREST видит новые функции только после перезагрузки кэша схемы
+        connection.execute("NOTIFY pgrst, 'reload schema'")
+
+
+class Migration:
+    def __init__(self, version: int, description: str, *operations):
+        self.version = version
+        self.description = description
+        self.operations = operations
+
+
+# Таблицы в том виде, в каком их создаёт миграция 1; всё добавленное позже - в своих миграциях
+_INITIAL_TABLES = (
+    Table(
+        'users',
+        Column('user_id', 'bigint', primary_key=True),
+        Column('username', 'text'),
+        Column('role', 'text'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'user_activity',
+        Column('user_id', 'bigint', primary_key=True),
+        Column('last_seen', 'timestamp', nullable=False),
+    ),
+    Table(
+        'user_event',
+        Column('event_id', 'id', primary_key=True),
+        Column('user_id', 'bigint', nullable=False),
+        Column('event', 'text', nullable=False),
+        Column('payload', 'json'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'subject',
+        Column('subject_id', 'id', primary_key=True),
+        Column('subject_name', 'text', nullable=False),
+    ),
+    Table(
+        'section',
+        Column('section_id', 'id', primary_key=True),
+        Column('subject_id', 'bigint', nullable=False, references='subject (subject_id)'),
+        Column('section_name', 'text', nullable=False),
+    ),
+    Table(
+        'task_type',
+        Column('task_type_id', 'id', primary_key=True),
+        Column('type_name', 'text', nullable=False),
+    ),
+    Table(
+        'customer',
+        Column('customer_id', 'id', primary_key=True),
+        Column('user_id', 'bigint', nullable=False, unique=True),
+        Column('customer_name', 'text'),
+        Column('personal_data_access', 'bool', nullable=False, default=False),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'executor',
+        Column('executor_id', 'id', primary_key=True),
+        Column('user_id', 'bigint', nullable=False, unique=True),
+        Column('executor_name', 'text'),
+        Column('description', 'text'),
+        Column('experience', 'int'),
+        Column('education', 'text'),
+        Column('photo_url', 'text'),
+        Column('personal_data_access', 'bool', nullable=False, default=False),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+    Table(
+        'executor_subject',
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('subject_id', 'bigint', nullable=False, references='subject (subject_id)'),
+        primary_key=('executor_id', 'subject_id'),
+    ),
+    Table(
+        'executor_section',
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('section_id', 'bigint', nullable=False, references='section (section_id)'),
+        primary_key=('executor_id', 'section_id'),
+    ),
+    Table(
+        'executor_task_type',
+        Column('executor_id', 'bigint', nullable=False, references='executor (executor_id)'),
+        Column('task_type_id', 'bigint', nullable=False, references='task_type (task_type_id)'),
+        primary_key=('executor_id', 'task_type_id'),
+    ),
+    Table(
+        'task',
+        Column('task_id', 'id', primary_key=True),
+        Column('customer_id', 'bigint', nullable=False, references='customer (customer_id)'),
+        Column('subject_id', 'bigint', references='subject (subject_id)'),
+        Column('section_id', 'bigint', references='section (section_id)'),
+        Column('task_type_id', 'bigint', references='task_type (task_type_id)'),
+        Column('description', 'text'),
+        Column('attachments_urls', 'json'),
+        Column('deadline', 'text'),
+        Column('created_at', 'timestamp', nullable=False, default=NOW),
+    ),
+)
+
+MIGRATIONS = (
+    Migration(
+        1, "initial schema",
+        *(CreateTable(table) for table in _INITIAL_TABLES),
+        CreateIndex('section_subject_id_idx'),
+        CreateIndex('task_customer_id_created_at_idx'),
+    ),
+    Migration(
+        2, "task assignment and offers",
+        AddColumn('task', 'status'),
+        AddColumn('task', 'executor_id'),
+        AddColumn('task', 'version'),
+        CreateTable('offer'),
+    ),
+    Migration(
+        3, "indexes for executor lookups, recent activity and offer lists",
+        CreateIndex('executor_subject_subject_id_idx'),
+        CreateIndex('executor_section_section_id_idx'),
+        CreateIndex('executor_task_type_task_type_id_idx'),
+        CreateIndex('user_activity_last_seen_idx'),
+        CreateIndex('offer_task_id_created_at_idx'),
+    ),
+    Migration(
+        4, "change notifications for cache invalidation",
+        CreateNotifyTriggers(
+            'users', 'subject', 'section', 'task_type', 'executor', 'executor_subject', 'executor_section',
+            'executor_task_type', 'task', 'offer',
+        ),
+    ),
+    Migration(
+        5, "task feed: open tasks by recency and full-text search",
+        CreateIndex('task_status_task_id_idx'),
+        CreateFullTextSearch(),
+    ),
+    Migration(
+        6, "ratings and incrementally maintained executor statistics",
+        CreateTable('rating'),
+        CreateTable('executor_stats'),
+        CreateExecutorStats(),
+        CreateNotifyTriggers('executor_stats'),
+    ),
+    Migration(
+        7, "support tickets, messages and operators",
+        CreateTable('support_ticket'),
+        CreateTable('support_message'),
+        CreateTable('support_operator'),
+        CreateIndex('support_ticket_open_user_id_idx'),
+        CreateIndex('support_ticket_status_ticket_id_idx'),
+        CreateIndex('support_ticket_operator_id_idx'),
+        CreateIndex('support_message_ticket_id_idx'),
+        CreateIndex('support_message_staff_message_id_idx'),
+    ),
+    Migration(
+        8, "broadcast recipients: blocked users and role index",
+        AddColumn('users', 'blocked_at'),
+        CreateIndex('users_role_user_id_idx'),
+    ),
+    Migration(
+        9, "catalog import: deactivated catalog rows and catalog version",
+        AddColumn('subject', 'active'),
+        AddColumn('section', 'active'),
+        AddColumn('task_type', 'active'),
+        CreateTable('catalog_version'),
+        CreateNotifyTriggers('catalog_version'),
+    ),
+    Migration(
+        10, "broadcast recipients of several roles in user_id order",
+        CreateIndex('users_unblocked_user_id_idx'),
+    ),
+    Migration(
+        11, "atomic task assignment for Supabase (rpc assign_task)",
+        CreateFunction('assign_task'),
+    ),
+    Migration(
+        12, "atomic task completion with rating for Supabase (rpc complete_task)",
+        CreateFunction('complete_task'),
+    ),
+)
+LATEST_VERSION = MIGRATIONS[-1].version
+
+_CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Transaction:
+    """Транзакция на соединении в autocommit-режиме (sqlite3 с isolation_level=None или psycopg)."""
+
+    def __init__(self, connection, dialect: str):
+        self.connection = connection
+        self.dialect = dialect
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE" if self.dialect == 'sqlite' else "BEGIN")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def applied_versions(connection, dialect: str) -> set[int]:
+    connection.execute(_CREATE_MIGRATIONS_TABLE)
+    return {row[0] for row in connection.execute("SELECT version FROM schema_migrations").fetchall()}
+
+
+def migrate(connection, dialect: str, target: int | None = None) -> list[int]:
+    """
+    Применяет недостающие миграции до target (по умолчанию до последней), каждую в своей
+    транзакции. Соединение должно быть в autocommit-режиме. Возвращает применённые версии.
+    """
+    if dialect not in DIALECTS:
+        raise ValueError(f"Неизвестный диалект {dialect!r}, допустимые: {', '.join(DIALECTS)}")
+    done = applied_versions(connection, dialect)
+    applied = []
+    insert = ("INSERT INTO schema_migrations (version, description) VALUES ({0}, {0})"
+              .format(PLACEHOLDER[dialect]))
+    for migration in MIGRATIONS:
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        with Transaction(connection, dialect):
+            for operation in migration.operations:
+                operation.apply(connection, dialect)
+            connection.execute(insert, (migration.version, migration.description))
+        logger.info("Applied migration %s: %s", migration.version, migration.description)
+        applied.append(migration.version)
+    return applied
+
+
+def schema_sql(dialect: str) -> str:
+    """Полный DDL текущей схемы (для ревью и ручного применения в Supabase SQL editor)."""
+    statements = [table.ddl(dialect) for table in TABLES.values()]
+    statements.extend(index.ddl(dialect) for index in INDEXES.values())
+    statements.extend(_FULL_TEXT_SQL[dialect])
+    statements.extend(_STATS_SQL[dialect])
+    if dialect == 'postgres':
+        statements.append(_NOTIFY_FUNCTION)
+        statements.extend(statement for table in NOTIFY_TABLES for statement in _notify_trigger_sql(table))
+        statements.extend(_FUNCTIONS_SQL.values())
+    return ';\n\n'.join(statements) + ';\n'
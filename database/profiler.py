@@ -0,0 +1,218 @@
+"""
+Профилировщик запросов к БД. instrument() оборачивает методы репозитория: каждый вызов
+становится QueryRecord с операцией, таблицами, формой запросов (без значений), временем,
+апдейтом и обработчиком из контекста логов. Включается DB_PROFILE=true (стенд) или
+assert_max_queries (тесты и бенчмарки).
+"""
+import inspect
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from database.repository import Repository
+from utils.logger import update_id_var, handler_var
+
+logger = logging.getLogger(__name__)
+
+# Столько вызовов одной операции с разными параметрами за апдейт считаются веером N+1
+FANOUT_THRESHOLD = 5
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_TABLE_RE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+(?!SET\b)(\w+)", re.IGNORECASE)
+_SQL_SKIPPED = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', '--')
+# Параметры PostgREST, значение которых - часть формы запроса; у фильтров остаётся только оператор
+_POSTGREST_SHAPE_PARAMS = {'select', 'order', 'on_conflict', 'columns'}
+
+
+@dataclass
+class QueryRecord:
+    operation: str
+    params: str
+    update_id: int | None
+    handler: str | None
+    statements: list[str] = field(default_factory=list)
+    tables: list[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def queries(self) -> int:
+        """Число запросов к БД; если бэкенд не сообщает о выражениях, вызов считается одним запросом."""
+        return max(len(self.statements), 1)
+
+    def add_statement(self, shape: str, tables: list[str]):
+        # executemany и триггеры SQLite сообщают одно и то же выражение подряд: это один запрос
+        if self.statements and self.statements[-1] == shape:
+            return
+        self.statements.append(shape)
+        self.tables.extend(table for table in tables if table not in self.tables)
+
+    def describe(self) -> str:
+        statements = "; ".join(self.statements) or "-"
+        return (f"[update {self.update_id} {self.handler or '-'}] {self.operation}({self.params}) "
+                f"{','.join(self.tables) or '-'} {self.duration * 1000:.1f} ms: {statements}")
+
+
+_current_call: ContextVar[QueryRecord | None] = ContextVar("db_profile_call", default=None)
+_update_records: ContextVar[list[QueryRecord] | None] = ContextVar("db_profile_update", default=None)
+
+
+def sql_shape(sql: str) -> tuple[str, list[str]]:
+    """Форма SQL-выражения без значений и таблицы, к которым оно обращается."""
+    shape = _NUMBER_LITERAL_RE.sub('?', _STRING_LITERAL_RE.sub('?', " ".join(sql.split())))
+    return shape, list(dict.fromkeys(table.lower() for table in _SQL_TABLE_RE.findall(shape)))
+
+
+def postgrest_shape(method: str, path: str, params: list[tuple[str, str]]) -> tuple[str, list[str]]:
+    """Форма запроса PostgREST: метод, таблица, select/order и операторы фильтров без значений."""
+    table = path.rsplit('/rest/v1/', 1)[-1]
+    parts = []
+    for key, value in params:
+        if key in _POSTGREST_SHAPE_PARAMS:
+            parts.append(f"{key}={value}")
+        elif key not in ('limit', 'offset'):
+            prefix = 'not.' if value.startswith('not.') else ''
+            parts.append(f"{key}={prefix}{value[len(prefix):].split('.', 1)[0]}")
+    return f"{method} {table}?{'&'.join(parts)}", [table]
+
+
+class QueryProfiler:
+    """Собирает QueryRecord: в активные области collect(), в апдейт track_update() и в сводку по обработчикам."""
+
+    def __init__(self):
+        self._scopes: list[list[QueryRecord]] = []
+        self._totals: dict[tuple[str, str], list] = {}
+
+    def record(self, record: QueryRecord):
+        for scope in self._scopes:
+            scope.append(record)
+        records = _update_records.get()
+        if records is not None:
+            records.append(record)
+        totals = self._totals.setdefault((record.handler or '-', record.operation), [0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += record.queries
+        totals[2] += record.duration
+
+    def statement(self, shape: str, tables: list[str]):
+        call = _current_call.get()
+        if call is not None:
+            call.add_statement(shape, tables)
+
+    def trace_sql(self, sql: str):
+        """Trace callback соединения sqlite3: получает выражения с подставленными значениями."""
+        if not sql.lstrip().upper().startswith(_SQL_SKIPPED):
+            self.statement(*sql_shape(sql))
+
+    def trace_http_request(self, request):
+        """Event hook httpx-сессии PostgREST: по запросу на каждый вызов execute()."""
+        self.statement(*postgrest_shape(request.method, request.url.path, list(request.url.params.multi_items())))
+
+    @contextmanager
+    def collect(self):
+        """Все вызовы репозитория внутри блока, из любых задач."""
+        records: list[QueryRecord] = []
+        self._scopes.append(records)
+        try:
+            yield records
+        finally:
+            self._scopes.remove(records)
+
+    @contextmanager
+    def track_update(self):
+        """Вызовы репозитория текущего апдейта (контекст задачи и порождённых ею задач)."""
+        records: list[QueryRecord] = []
+        token = _update_records.set(records)
+        try:
+            yield records
+        finally:
+            _update_records.reset(token)
+
+    def stats(self) -> dict:
+        """обработчик -> операция -> {calls, queries, total_ms}."""
+        result: dict[str, dict] = {}
+        for (handler, operation), (calls, queries, seconds) in sorted(self._totals.items()):
+            result.setdefault(handler, {})[operation] = {
+                'calls': calls, 'queries': queries, 'total_ms': round(seconds * 1000, 1),
+            }
+        return result
+
+
+profiler = QueryProfiler()
+
+
+def find_repeats(records: list[QueryRecord]) -> list[tuple[QueryRecord, int]]:
+    """Одинаковые вызовы (операция и параметры) внутри одного апдейта: (первый вызов, число повторов)."""
+    counter = Counter((r.update_id, r.operation, r.params) for r in records)
+    first = {}
+    for r in records:
+        first.setdefault((r.update_id, r.operation, r.params), r)
+    return [(first[key], count) for key, count in counter.items() if count > 1]
+
+
+def find_fanout(records: list[QueryRecord], threshold: int = FANOUT_THRESHOLD) -> list[tuple[QueryRecord, int]]:
+    """Операции, вызванные в одном апдейте не меньше threshold раз: типичная картина N+1 по циклу."""
+    counter = Counter((r.update_id, r.operation) for r in records)
+    first = {}
+    for r in records:
+        first.setdefault((r.update_id, r.operation), r)
+    return [(first[key], count) for key, count in counter.items() if count >= threshold]
+
+
+def _params_key(args: tuple, kwargs: dict) -> str:
+    parts = [repr(arg) for arg in args] + [f"{key}={value!r}" for key, value in sorted(kwargs.items())]
+    key = ", ".join(parts)
+    return key if len(key) <= 200 else key[:200] + "…"
+
+
+def _profiled(operation: str, method):
+    async def wrapper(*args, **kwargs):
+        record = QueryRecord(operation, _params_key(args, kwargs), update_id_var.get(), handler_var.get())
+        token = _current_call.set(record)
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            record.duration = time.perf_counter() - started
+            _current_call.reset(token)
+            profiler.record(record)
+    wrapper.__name__ = operation
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def instrument(repository: Repository) -> Repository:
+    """Оборачивает асинхронные методы репозитория и подключает трассировку выражений бэкенда. Идемпотентна."""
+    if getattr(repository, '_profiled', False):
+        return repository
+    for name, _ in inspect.getmembers(Repository, inspect.iscoroutinefunction):
+        setattr(repository, name, _profiled(name, getattr(repository, name)))
+    repository.trace_statements(profiler)
+    repository._profiled = True
+    return repository
+
+
+@contextmanager
+def assert_max_queries(limit: int, allow_repeats: bool = False):
+    """
+    Тестовый помощник: падает AssertionError, если за блок ушло больше limit запросов к БД
+    или (без allow_repeats) внутри одного апдейта повторился одинаковый вызов репозитория.
+    """
+    from database.repository import get_repository
+
+    instrument(get_repository())
+    with profiler.collect() as records:
+        yield records
+    problems = []
+    total = sum(r.queries for r in records)
+    if total > limit:
+        problems.append(f"{total} queries, expected at most {limit}")
+    if not allow_repeats:
+        problems.extend(f"repeated {count}x: {r.describe()}" for r, count in find_repeats(records))
+    if problems:
+        details = "\n".join(r.describe() for r in records)
+        raise AssertionError("\n".join(problems) + "\nQueries:\n" + details)
@@ -0,0 +1,241 @@
+from abc import ABC, abstractmethod
+
+from utils.config import DATABASE_BACKEND, DB_PROFILE
+
+
+class Repository(ABC):
+    """
+    Доступ к данным бота. Методы работают со строками таблиц в виде dict
+    (имена ключей совпадают с колонками), бизнес-логика остаётся в DataBaseService.
+    """
+
+    def trace_statements(self, profiler) -> None:
+        """Подключает к профилировщику (database/profiler.py) трассировку отдельных запросов бэкенда."""
+
+    # --- users ---
+
+    @abstractmethod
+    async def upsert_user(self, user_id: int, username: str | None, role: str) -> None:
+        """Создаёт или обновляет запись пользователя с ролью."""
+
+    @abstractmethod
+    async def get_user_role(self, user_id: int) -> str | None:
+        """Возвращает роль пользователя или None."""
+
+    @abstractmethod
+    async def get_recent_user_roles(self, limit: int) -> list[dict]:
+        """user_id и role недавно активных пользователей (для прогрева кэша ролей)."""
+
+    @abstractmethod
+    async def upsert_users(self, rows: list[dict]) -> None:
+        """Многострочный upsert в users (строки с user_id, username, role)."""
+
+    @abstractmethod
+    async def upsert_user_activity(self, rows: list[dict]) -> None:
+        """Многострочный upsert в user_activity (user_id, last_seen)."""
+
+    @abstractmethod
+    async def insert_user_events(self, rows: list[dict]) -> None:
+        """Многострочная вставка аналитических событий в user_event (user_id, event, payload, created_at)."""
+
+    # --- Справочники ---
+
+    @abstractmethod
+    async def get_all_subjects(self) -> list[dict]:
+        """Строки subject: subject_id, subject_name, active (вместе с деактивированными)."""
+
+    @abstractmethod
+    async def get_all_task_types(self) -> list[dict]:
+        """Строки task_type: task_type_id, type_name, active."""
+
+    @abstractmethod
+    async def get_sections_for_subject(self, subject_id: int) -> list[dict]:
+        """Строки section предмета: section_id, section_name, active."""
+
+    @abstractmethod
+    async def get_catalog_version(self) -> int:
+        """Версия справочников из catalog_version; 0, если каталог ещё не импортировался."""
+
+    # --- Профили ---
+
+    @abstractmethod
+    async def upsert_executor(self, profile: dict) -> dict | None:
+        """Создаёт или обновляет executor по user_id, возвращает строку с executor_id."""
+
+    @abstractmethod
+    async def replace_executor_subjects(self, executor_id: int, subject_ids: list[int]) -> None:
+        """Заменяет набор предметов исполнителя в executor_subject."""
+
+    @abstractmethod
+    async def replace_executor_task_types(self, executor_id: int, task_type_ids: list[int]) -> None:
+        """Заменяет набор типов задач исполнителя в executor_task_type."""
+
+    @abstractmethod
+    async def replace_executor_sections(self, executor_id: int, section_ids: list[int]) -> None:
+        """Заменяет набор разделов исполнителя в executor_section."""
+
+    @abstractmethod
+    async def get_executors_for_search(self) -> list[dict]:
+        """
+        Все исполнители для поискового индекса: колонки executor плюс списки
+        subject_ids, section_ids и task_type_ids и сводка stats (строка executor_stats или None).
+        """
+
+    @abstractmethod
+    async def get_executor_for_search(self, executor_id: int) -> dict | None:
+        """Один исполнитель в формате get_executors_for_search; None, если его уже нет."""
+
+    @abstractmethod
+    async def upsert_customer(self, profile: dict) -> None:
+        """Создаёт или обновляет customer по user_id."""
+
+    @abstractmethod
+    async def get_customer_id(self, user_id: int) -> int | None:
+        """customer_id по ID пользователя Telegram."""
+
+    @abstractmethod
+    async def get_executor_id(self, user_id: int) -> int | None:
+        """executor_id по ID пользователя Telegram."""
+
+    # --- Заказы ---
+
+    @abstractmethod
+    async def insert_task(self, task: dict) -> dict | None:
+        """Создаёт заказ, возвращает строку с task_id."""
+
+    @abstractmethod
+    async def update_task_attachments(self, task_id: int, urls: list[str]) -> bool:
+        """Сохраняет ссылки на вложения заказа, возвращает False, если заказ не найден."""
+
+    @abstractmethod
+    async def get_task(self, task_id: int) -> dict | None:
+        """Строка task с user_id заказчика в customer_user_id или None."""
+
+    @abstractmethod
+    async def assign_task(self, task_id: int, offer_id: int, version: int) -> dict | None:
+        """
+        Условное назначение исполнителя: заказ получает исполнителя отклика, только если он
+        ещё открыт (status='open') и его version не изменилась, отклик становится accepted,
+        остальные - rejected. Возвращает обновлённый заказ или None, если условие не выполнено.
+        """
+
+    @abstractmethod
+    async def complete_task(self, task_id: int, customer_user_id: int, score: int) -> dict | None:
+        """
+        Заказчик завершает назначенный заказ и оценивает исполнителя: условный переход
+        assigned -> completed и строка rating (сводку executor_stats обновляют триггеры).
+        Возвращает {task_id, executor_id, score} или None, если заказ не назначен или чужой.
+        """
+
+    @abstractmethod
+    async def search_open_tasks(self, query: str, subject_ids: list[int], task_type_ids: list[int],
+                                before: int | None, limit: int) -> list[dict]:
+        """
+        Лента открытых заказов, новые первыми: task_id < before (курсор), предмет и тип задачи
+        из списков (пустой список не ограничивает), query - полнотекстовый поиск по описанию.
+        """
+
+    # --- Отклики ---
+
+    @abstractmethod
+    async def upsert_offer(self, offer: dict) -> dict | None:
+        """
+        Создаёт отклик (task_id, executor_id, price, eta_hours) или меняет цену и срок
+        ещё не рассмотренного отклика. None, если заказ уже не принимает отклики.
+        """
+
+    @abstractmethod
+    async def get_offers_for_task(self, task_id: int) -> list[dict]:
+        """Отклики на заказ по времени создания, с executor_user_id, executor_name и experience."""
+
+    # --- Рассылки ---
+
+    @abstractmethod
+    async def get_broadcast_recipients(self, roles: list[str], after: int, limit: int) -> list[int]:
+        """Keyset-страница user_id пользователей ролей roles с user_id > after, кроме заблокировавших бота."""
+
+    @abstractmethod
+    async def count_broadcast_recipients(self, roles: list[str], after: int) -> int:
+        ...
+
+    @abstractmethod
+    async def mark_users_blocked(self, user_ids: list[int]) -> None:
+        """Отмечает пользователей, заблокировавших бота: следующие рассылки их пропускают."""
+
+    # --- Поддержка ---
+
+    @abstractmethod
+    async def open_support_ticket(self, user_id: int) -> tuple[dict, bool]:
+        """Незакрытое обращение пользователя или новое; второй элемент - создано ли оно сейчас."""
+
+    @abstractmethod
+    async def add_support_message(self, ticket_id: int, direction: str, text: str) -> dict:
+        """Сообщение обращения: direction 'user' (от пользователя) или 'operator' (ответ)."""
+
+    @abstractmethod
+    async def get_support_ticket(self, ticket_id: int) -> dict | None:
+        ...
+
+    @abstractmethod
+    async def get_ticket_by_staff_message(self, staff_message_id: int) -> dict | None:
+        """Обращение, сообщения которого пришли в чат сотрудников сообщением staff_message_id."""
+
+    @abstractmethod
+    async def get_undelivered_support_messages(self) -> list[dict]:
+        """Сообщения пользователей незакрытых обращений, ещё не отправленные в чат сотрудников, по порядку."""
+
+    @abstractmethod
+    async def mark_support_messages_delivered(self, message_ids: list[int], staff_message_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def assign_support_ticket(self, ticket_id: int, operator_id: int, only_unassigned: bool) -> dict | None:
+        """
+        Назначает незакрытое обращение оператору одним условным UPDATE; с only_unassigned - только
+        если оно ещё ни на кого не назначено. None - условие не выполнено.
+        """
+
+    @abstractmethod
+    async def close_support_ticket(self, ticket_id: int) -> dict | None:
+        """Закрывает обращение; None - уже закрыто или не найдено."""
+
+    @abstractmethod
+    async def get_support_backlog(self, after: int, limit: int) -> list[dict]:
+        """Keyset-страница незакрытых обращений с ticket_id > after, старые первыми."""
+
+    @abstractmethod
+    async def set_support_operator_online(self, operator_id: int, online: bool) -> None:
+        ...
+
+    @abstractmethod
+    async def get_support_operator_loads(self) -> dict[int, int]:
+        """Операторы на смене -> число назначенных на них открытых обращений."""
+
+    # --- Выгрузка ---
+
+    @abstractmethod
+    async def get_rows_after(self, table: str, key: str, after: int, limit: int, columns: tuple[str, ...]) -> list[dict]:
+        """Keyset-страница: до limit строк table с key > after по возрастанию key."""
+
+    @abstractmethod
+    async def get_executor_links(self, executor_ids: list[int]) -> dict[int, dict]:
+        """executor_id -> {subject_ids, section_ids, task_type_ids} для указанных исполнителей."""
+
+
+_repository: Repository | None = None
+
+
+def get_repository() -> Repository:
+    """Возвращает репозиторий выбранного в DATABASE_BACKEND бэкенда (supabase или sqlite)."""
+    global _repository
+    if _repository is None:
+        if DATABASE_BACKEND == 'sqlite':
+            from database.sqlite_repository import SQLiteRepository
+            _repository = SQLiteRepository()
+        else:
+            from database.supabase_repository import SupabaseRepository
+            _repository = SupabaseRepository()
+        if DB_PROFILE:
+            from database.profiler import instrument
+            instrument(_repository)
+    return _repository
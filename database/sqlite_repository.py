@@ -0,0 +1,454 @@
+import json
+import sqlite3
+
+from database.models import Transaction, migrate
+from database.repository import Repository
+from utils.config import SQLITE_PATH
+from utils.search_index import tokenize
+
+# Тексты запросов - константы: sqlite3 кэширует подготовленные выражения по тексту SQL
+_UPSERT_USER = """
+    INSERT INTO users (user_id, username, role) VALUES (?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET username = excluded.username, role = excluded.role, blocked_at = NULL
+"""
+_SELECT_USER_ROLE = "SELECT role FROM users WHERE user_id = ?"
+_SELECT_RECENT_USER_ROLES = """
+    SELECT users.user_id, users.role FROM user_activity
+    JOIN users ON users.user_id = user_activity.user_id
+    ORDER BY user_activity.last_seen DESC LIMIT ?
+"""
+_UPSERT_USER_ACTIVITY = """
+    INSERT INTO user_activity (user_id, last_seen) VALUES (:user_id, :last_seen)
+    ON CONFLICT (user_id) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)
+"""
+_INSERT_USER_EVENT = """
+    INSERT INTO user_event (user_id, event, payload, created_at) VALUES (:user_id, :event, :payload, :created_at)
+"""
+_SELECT_SUBJECTS = "SELECT subject_id, subject_name, active FROM subject"
+_SELECT_TASK_TYPES = "SELECT task_type_id, type_name, active FROM task_type"
+_SELECT_SECTIONS = "SELECT section_id, section_name, active FROM section WHERE subject_id = ?"
+_SELECT_CATALOG_VERSION = "SELECT version FROM catalog_version WHERE catalog_id = 1"
+_UPSERT_EXECUTOR = """
+    INSERT INTO executor (user_id, executor_name, description, experience, education, photo_url,
+                          personal_data_access)
+    VALUES (:user_id, :executor_name, :description, :experience, :education, :photo_url,
+            :personal_data_access)
+    ON CONFLICT (user_id) DO UPDATE SET
+        executor_name = excluded.executor_name,
+        description = excluded.description,
+        experience = excluded.experience,
+        education = excluded.education,
+        photo_url = excluded.photo_url,
+        personal_data_access = excluded.personal_data_access
+    RETURNING *
+"""
+_DELETE_EXECUTOR_SUBJECTS = "DELETE FROM executor_subject WHERE executor_id = ?"
+_INSERT_EXECUTOR_SUBJECT = "INSERT INTO executor_subject (executor_id, subject_id) VALUES (?, ?)"
+_DELETE_EXECUTOR_SECTIONS = "DELETE FROM executor_section WHERE executor_id = ?"
+_INSERT_EXECUTOR_SECTION = "INSERT INTO executor_section (executor_id, section_id) VALUES (?, ?)"
+_DELETE_EXECUTOR_TASK_TYPES = "DELETE FROM executor_task_type WHERE executor_id = ?"
+_INSERT_EXECUTOR_TASK_TYPE = "INSERT INTO executor_task_type (executor_id, task_type_id) VALUES (?, ?)"
+_SELECT_EXECUTORS = """
+    SELECT executor_id, user_id, executor_name, description, experience, education, photo_url FROM executor
+"""
+_SELECT_EXECUTOR_STATS = "SELECT * FROM executor_stats"
+_SELECT_EXECUTOR_LINKS = {
+    'subject_id': "SELECT executor_id, subject_id FROM executor_subject",
+    'section_id': "SELECT executor_id, section_id FROM executor_section",
+    'task_type_id': "SELECT executor_id, task_type_id FROM executor_task_type",
+}
+_UPSERT_CUSTOMER = """
+    INSERT INTO customer (user_id, customer_name, personal_data_access)
+    VALUES (:user_id, :customer_name, :personal_data_access)
+    ON CONFLICT (user_id) DO UPDATE SET
+        customer_name = excluded.customer_name,
+        personal_data_access = excluded.personal_data_access
+"""
+_SELECT_CUSTOMER_ID = "SELECT customer_id FROM customer WHERE user_id = ?"
+_SELECT_EXECUTOR_ID = "SELECT executor_id FROM executor WHERE user_id = ?"
+_INSERT_TASK = """
+    INSERT INTO task (customer_id, subject_id, section_id, task_type_id, description, attachments_urls, deadline)
+    VALUES (:customer_id, :subject_id, :section_id, :task_type_id, :description, :attachments_urls, :deadline)
+    RETURNING *
+"""
+_UPDATE_TASK_ATTACHMENTS = "UPDATE task SET attachments_urls = ? WHERE task_id = ?"
+_SELECT_TASK = """
+    SELECT task.*, customer.user_id AS customer_user_id FROM task
+    JOIN customer ON customer.customer_id = task.customer_id
+    WHERE task.task_id = ?
+"""
+# Назначение - одно условное UPDATE: из конкурирующих выборов срабатывает только первый
+_ASSIGN_TASK = """
+    UPDATE task SET
+        status = 'assigned',
+        version = version + 1,
+        executor_id = (SELECT executor_id FROM offer WHERE offer_id = :offer_id)
+    WHERE task_id = :task_id AND status = 'open' AND version = :version
+      AND EXISTS (SELECT 1 FROM offer WHERE offer_id = :offer_id AND task_id = :task_id AND status = 'pending')
+    RETURNING *
+"""
+_COMPLETE_TASK = """
+    UPDATE task SET status = 'completed', version = version + 1
+    WHERE task_id = :task_id AND status = 'assigned'
+      AND customer_id = (SELECT customer_id FROM customer WHERE user_id = :user_id)
+    RETURNING task_id, executor_id
+"""
+_INSERT_RATING = "INSERT INTO rating (task_id, executor_id, score) VALUES (:task_id, :executor_id, :score)"
+_MARK_USERS_BLOCKED = "UPDATE users SET blocked_at = CURRENT_TIMESTAMP WHERE user_id = ?"
+_SELECT_OPEN_SUPPORT_TICKET = "SELECT * FROM support_ticket WHERE user_id = ? AND status <> 'closed'"
+_INSERT_SUPPORT_TICKET = "INSERT INTO support_ticket (user_id) VALUES (?) RETURNING *"
+_INSERT_SUPPORT_MESSAGE = """
+    INSERT INTO support_message (ticket_id, direction, text) VALUES (?, ?, ?) RETURNING *
+"""
+_SELECT_SUPPORT_TICKET = "SELECT * FROM support_ticket WHERE ticket_id = ?"
+_SELECT_TICKET_BY_STAFF_MESSAGE = """
+    SELECT support_ticket.* FROM support_message
+    JOIN support_ticket ON support_ticket.ticket_id = support_message.ticket_id
+    WHERE support_message.staff_message_id = ? LIMIT 1
+"""
+_SELECT_UNDELIVERED_SUPPORT_MESSAGES = """
+    SELECT support_message.* FROM support_ticket
+    JOIN support_message ON support_message.ticket_id = support_ticket.ticket_id
+    WHERE support_ticket.status <> 'closed' AND support_message.direction = 'user'
+      AND support_message.staff_message_id IS NULL
+    ORDER BY support_message.message_id
+"""
+_ASSIGN_SUPPORT_TICKET = """
+    UPDATE support_ticket SET status = 'assigned', operator_id = :operator_id
+    WHERE ticket_id = :ticket_id AND status <> 'closed'
+      AND (:only_unassigned = 0 OR operator_id IS NULL)
+    RETURNING *
+"""
+_CLOSE_SUPPORT_TICKET = """
+    UPDATE support_ticket SET status = 'closed', closed_at = CURRENT_TIMESTAMP
+    WHERE ticket_id = ? AND status <> 'closed'
+    RETURNING *
+"""
+_SELECT_SUPPORT_BACKLOG = """
+    SELECT * FROM support_ticket WHERE status <> 'closed' AND ticket_id > ? ORDER BY ticket_id LIMIT ?
+"""
+_UPSERT_SUPPORT_OPERATOR = """
+    INSERT INTO support_operator (operator_id, online, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (operator_id) DO UPDATE SET online = excluded.online, updated_at = excluded.updated_at
+"""
+_SELECT_SUPPORT_OPERATOR_LOADS = """
+    SELECT support_operator.operator_id, COUNT(support_ticket.ticket_id) AS load FROM support_operator
+    LEFT JOIN support_ticket ON support_ticket.operator_id = support_operator.operator_id
+                            AND support_ticket.status = 'assigned'
+    WHERE support_operator.online = 1
+    GROUP BY support_operator.operator_id
+"""
+_RESOLVE_OFFERS = """
+    UPDATE offer SET status = CASE WHEN offer_id = :offer_id THEN 'accepted' ELSE 'rejected' END
+    WHERE task_id = :task_id AND status = 'pending'
+"""
+# Отклик записывается, только пока заказ открыт; рассмотренный отклик не меняется
+_UPSERT_OFFER = """
+    INSERT INTO offer (task_id, executor_id, price, eta_hours)
+    SELECT :task_id, :executor_id, :price, :eta_hours
+    WHERE EXISTS (SELECT 1 FROM task WHERE task_id = :task_id AND status = 'open')
+    ON CONFLICT (task_id, executor_id) DO UPDATE SET price = excluded.price, eta_hours = excluded.eta_hours
+        WHERE offer.status = 'pending'
+    RETURNING *
+"""
+_SELECT_OFFERS = """
+    SELECT offer.*, executor.user_id AS executor_user_id, executor.executor_name, executor.experience
+    FROM offer JOIN executor ON executor.executor_id = offer.executor_id
+    WHERE offer.task_id = ?
+    ORDER BY offer.created_at, offer.offer_id
+"""
+
+_TASK_FEED_COLUMNS = ("task.task_id, task.subject_id, task.section_id, task.task_type_id, task.description, "
+                      "task.deadline, task.created_at")
+
+
+def fts_query(query: str) -> str:
+    """
+    Запрос FTS5 из текста пользователя: все слова обязательны, каждое - основа с поиском по префиксу
+    (`интегралы` -> `"интеграл"*`), чтобы находились и другие формы слова.
+    """
+    return ' '.join(f'"{term}"*' for term in tokenize(query))
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Открывает базу в режиме WAL с настройками для одного процесса бота."""
+    connection = sqlite3.connect(path, check_same_thread=False, cached_statements=256, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA busy_timeout = 5000")
+    return connection
+
+
+def _task_row(row: sqlite3.Row) -> dict:
+    task = dict(row)
+    if task.get('attachments_urls') is not None:
+        task['attachments_urls'] = json.loads(task['attachments_urls'])
+    return task
+
+
+def _stats_row(row: sqlite3.Row) -> dict:
+    stats = dict(row)
+    stats['recent_scores'] = json.loads(stats['recent_scores'])
+    return stats
+
+
+class SQLiteRepository(Repository):
+    """
+    Локальный репозиторий на SQLite для небольших инсталляций, тестов и бенчмарков.
+    Запросы выполняются прямо в event loop: на локальном файле в WAL они укладываются
+    в доли миллисекунды, как и синхронные вызовы клиента Supabase в SupabaseRepository.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or SQLITE_PATH
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Файл БД открывается при первом запросе, а не при импорте сервисов
+        if self._connection is None:
+            self._connection = connect(self.path)
+            migrate(self._connection, 'sqlite')
+        return self._connection
+
+    def _transaction(self):
+        return Transaction(self.connection, 'sqlite')
+
+    def trace_statements(self, profiler) -> None:
+        self.connection.set_trace_callback(profiler.trace_sql)
+
+    async def upsert_user(self, user_id: int, username: str | None, role: str) -> None:
+        self.connection.execute(_UPSERT_USER, (user_id, username, role))
+
+    async def get_user_role(self, user_id: int) -> str | None:
+        row = self.connection.execute(_SELECT_USER_ROLE, (user_id,)).fetchone()
+        return row['role'] if row else None
+
+    async def get_recent_user_roles(self, limit: int) -> list[dict]:
+        return [dict(row) for row in self.connection.execute(_SELECT_RECENT_USER_ROLES, (limit,))]
+
+    async def upsert_users(self, rows: list[dict]) -> None:
+        with self._transaction():
+            self.connection.executemany(_UPSERT_USER, [(r['user_id'], r.get('username'), r['role']) for r in rows])
+
+    async def upsert_user_activity(self, rows: list[dict]) -> None:
+        with self._transaction():
+            self.connection.executemany(_UPSERT_USER_ACTIVITY, rows)
+
+    async def insert_user_events(self, rows: list[dict]) -> None:
+        params = [dict(row, payload=json.dumps(row.get('payload'), ensure_ascii=False)) for row in rows]
+        with self._transaction():
+            self.connection.executemany(_INSERT_USER_EVENT, params)
+
+    async def get_all_subjects(self) -> list[dict]:
+        return [dict(row) for row in self.connection.execute(_SELECT_SUBJECTS)]
+
+    async def get_all_task_types(self) -> list[dict]:
+        return [dict(row) for row in self.connection.execute(_SELECT_TASK_TYPES)]
+
+    async def get_sections_for_subject(self, subject_id: int) -> list[dict]:
+        return [dict(row) for row in self.connection.execute(_SELECT_SECTIONS, (subject_id,))]
+
+    async def get_catalog_version(self) -> int:
+        row = self.connection.execute(_SELECT_CATALOG_VERSION).fetchone()
+        return row['version'] if row else 0
+
+    async def upsert_executor(self, profile: dict) -> dict | None:
+        rows = self.connection.execute(_UPSERT_EXECUTOR, profile).fetchall()
+        return dict(rows[0]) if rows else None
+
+    async def replace_executor_subjects(self, executor_id: int, subject_ids: list[int]) -> None:
+        with self._transaction():
+            self.connection.execute(_DELETE_EXECUTOR_SUBJECTS, (executor_id,))
+            self.connection.executemany(_INSERT_EXECUTOR_SUBJECT, [(executor_id, s) for s in subject_ids])
+
+    async def replace_executor_task_types(self, executor_id: int, task_type_ids: list[int]) -> None:
+        with self._transaction():
+            self.connection.execute(_DELETE_EXECUTOR_TASK_TYPES, (executor_id,))
+            self.connection.executemany(_INSERT_EXECUTOR_TASK_TYPE, [(executor_id, t) for t in task_type_ids])
+
+    async def replace_executor_sections(self, executor_id: int, section_ids: list[int]) -> None:
+        with self._transaction():
+            self.connection.execute(_DELETE_EXECUTOR_SECTIONS, (executor_id,))
+            self.connection.executemany(_INSERT_EXECUTOR_SECTION, [(executor_id, s) for s in section_ids])
+
+    def _collect_executor_links(self, executors: dict, where: str = "", params: tuple = ()):
+        for column, query in _SELECT_EXECUTOR_LINKS.items():
+            for executor_id, value in self.connection.execute(query + where, params):
+                if executor_id in executors:
+                    executors[executor_id][f'{column}s'].append(value)
+
+    def _collect_executor_stats(self, executors: dict, where: str = "", params: tuple = ()):
+        for row in self.connection.execute(_SELECT_EXECUTOR_STATS + where, params):
+            if row['executor_id'] in executors:
+                executors[row['executor_id']]['stats'] = _stats_row(row)
+
+    async def get_executors_for_search(self) -> list[dict]:
+        executors = {row['executor_id']: dict(row, subject_ids=[], section_ids=[], task_type_ids=[], stats=None)
+                     for row in self.connection.execute(_SELECT_EXECUTORS)}
+        self._collect_executor_links(executors)
+        self._collect_executor_stats(executors)
+        return list(executors.values())
+
+    async def get_executor_for_search(self, executor_id: int) -> dict | None:
+        row = self.connection.execute(_SELECT_EXECUTORS + " WHERE executor_id = ?", (executor_id,)).fetchone()
+        if not row:
+            return None
+        executors = {executor_id: dict(row, subject_ids=[], section_ids=[], task_type_ids=[], stats=None)}
+        self._collect_executor_links(executors, " WHERE executor_id = ?", (executor_id,))
+        self._collect_executor_stats(executors, " WHERE executor_id = ?", (executor_id,))
+        return executors[executor_id]
+
+    async def get_executor_links(self, executor_ids: list[int]) -> dict[int, dict]:
+        links = {executor_id: {'subject_ids': [], 'section_ids': [], 'task_type_ids': []}
+                 for executor_id in executor_ids}
+        if executor_ids:
+            placeholders = ", ".join("?" * len(executor_ids))
+            self._collect_executor_links(links, f" WHERE executor_id IN ({placeholders})", tuple(executor_ids))
+        return links
+
+    async def upsert_customer(self, profile: dict) -> None:
+        self.connection.execute(_UPSERT_CUSTOMER, profile)
+
+    async def get_customer_id(self, user_id: int) -> int | None:
+        row = self.connection.execute(_SELECT_CUSTOMER_ID, (user_id,)).fetchone()
+        return row['customer_id'] if row else None
+
+    async def get_executor_id(self, user_id: int) -> int | None:
+        row = self.connection.execute(_SELECT_EXECUTOR_ID, (user_id,)).fetchone()
+        return row['executor_id'] if row else None
+
+    async def insert_task(self, task: dict) -> dict | None:
+        params = dict(task, attachments_urls=json.dumps(task['attachments_urls'])
+                      if task.get('attachments_urls') is not None else None)
+        rows = self.connection.execute(_INSERT_TASK, params).fetchall()
+        return _task_row(rows[0]) if rows else None
+
+    async def update_task_attachments(self, task_id: int, urls: list[str]) -> bool:
+        cursor = self.connection.execute(_UPDATE_TASK_ATTACHMENTS, (json.dumps(urls), task_id))
+        return cursor.rowcount > 0
+
+    async def get_task(self, task_id: int) -> dict | None:
+        row = self.connection.execute(_SELECT_TASK, (task_id,)).fetchone()
+        return _task_row(row) if row else None
+
+    async def assign_task(self, task_id: int, offer_id: int, version: int) -> dict | None:
+        params = {'task_id': task_id, 'offer_id': offer_id, 'version': version}
+        with self._transaction():
+            rows = self.connection.execute(_ASSIGN_TASK, params).fetchall()
+            if not rows:
+                return None
+            self.connection.execute(_RESOLVE_OFFERS, params)
+        return _task_row(rows[0])
+
+    async def complete_task(self, task_id: int, customer_user_id: int, score: int) -> dict | None:
+        with self._transaction():
+            row = self.connection.execute(_COMPLETE_TASK, {'task_id': task_id, 'user_id': customer_user_id}).fetchone()
+            if not row:
+                return None
+            rating = {'task_id': task_id, 'executor_id': row['executor_id'], 'score': score}
+            self.connection.execute(_INSERT_RATING, rating)
+        return rating
+
+    async def search_open_tasks(self, query: str, subject_ids: list[int], task_type_ids: list[int],
+                                before: int | None, limit: int) -> list[dict]:
+        match = fts_query(query)
+        # Курсор и порядок - по task_id; при поиске это rowid таблицы FTS5, без поиска - индекс (status, task_id)
+        key = 'task_fts.rowid' if match else 'task.task_id'
+        conditions, params = ["task.status = 'open'"], []
+        if before:
+            conditions.append(f"{key} < ?")
+            params.append(before)
+        for column, ids in (('subject_id', subject_ids), ('task_type_id', task_type_ids)):
+            if ids:
+                conditions.append(f"task.{column} IN ({', '.join('?' * len(ids))})")
+                params.extend(ids)
+        if match:
+            # CROSS JOIN закрепляет порядок: сначала FTS5 (с выдачей по rowid без сортировки), затем task по ключу
+            source = "task_fts CROSS JOIN task ON task.task_id = task_fts.rowid"
+            conditions.insert(0, "task_fts MATCH ?")
+            params.insert(0, match)
+        else:
+            source = "task"
+        sql = (f"SELECT {_TASK_FEED_COLUMNS} FROM {source} WHERE {' AND '.join(conditions)} "
+               f"ORDER BY {key} DESC LIMIT ?")
+        return [dict(row) for row in self.connection.execute(sql, (*params, limit))]
+
+    async def upsert_offer(self, offer: dict) -> dict | None:
+        rows = self.connection.execute(_UPSERT_OFFER, offer).fetchall()
+        return dict(rows[0]) if rows else None
+
+    async def get_offers_for_task(self, task_id: int) -> list[dict]:
+        return [dict(row) for row in self.connection.execute(_SELECT_OFFERS, (task_id,))]
+
+    @staticmethod
+    def _recipients_query(roles: list[str], select: str) -> str:
+        # Для нескольких ролей индекс (role, user_id) дал бы диапазон на роль и сортировку во временном
+        # B-дереве; унарный плюс убирает role из выбора индекса, и обход идёт по user_id
+        role = 'role' if len(roles) == 1 else '+role'
+        return (f"SELECT {select} FROM users WHERE {role} IN ({', '.join('?' * len(roles))}) "
+                f"AND blocked_at IS NULL AND user_id > ?")
+
+    async def get_broadcast_recipients(self, roles: list[str], after: int, limit: int) -> list[int]:
+        query = self._recipients_query(roles, 'user_id') + " ORDER BY user_id LIMIT ?"
+        return [row['user_id'] for row in self.connection.execute(query, (*roles, after, limit))]
+
+    async def count_broadcast_recipients(self, roles: list[str], after: int) -> int:
+        return self.connection.execute(self._recipients_query(roles, 'COUNT(*)'), (*roles, after)).fetchone()[0]
+
+    async def mark_users_blocked(self, user_ids: list[int]) -> None:
+        with self._transaction():
+            self.connection.executemany(_MARK_USERS_BLOCKED, [(user_id,) for user_id in user_ids])
+
+    async def open_support_ticket(self, user_id: int) -> tuple[dict, bool]:
+        with self._transaction():
+            row = self.connection.execute(_SELECT_OPEN_SUPPORT_TICKET, (user_id,)).fetchone()
+            if row:
+                return dict(row), False
+            return dict(self.connection.execute(_INSERT_SUPPORT_TICKET, (user_id,)).fetchone()), True
+
+    async def add_support_message(self, ticket_id: int, direction: str, text: str) -> dict:
+        return dict(self.connection.execute(_INSERT_SUPPORT_MESSAGE, (ticket_id, direction, text)).fetchone())
+
+    async def get_support_ticket(self, ticket_id: int) -> dict | None:
+        row = self.connection.execute(_SELECT_SUPPORT_TICKET, (ticket_id,)).fetchone()
+        return dict(row) if row else None
+
+    async def get_ticket_by_staff_message(self, staff_message_id: int) -> dict | None:
+        row = self.connection.execute(_SELECT_TICKET_BY_STAFF_MESSAGE, (staff_message_id,)).fetchone()
+        return dict(row) if row else None
+
+    async def get_undelivered_support_messages(self) -> list[dict]:
+        return [dict(row) for row in self.connection.execute(_SELECT_UNDELIVERED_SUPPORT_MESSAGES)]
+
+    async def mark_support_messages_delivered(self, message_ids: list[int], staff_message_id: int) -> None:
+        self.connection.execute(
+            f"UPDATE support_message SET staff_message_id = ? WHERE message_id IN ({', '.join('?' * len(message_ids))})",
+            (staff_message_id, *message_ids),
+        )
+
+    async def assign_support_ticket(self, ticket_id: int, operator_id: int, only_unassigned: bool) -> dict | None:
+        params = {'ticket_id': ticket_id, 'operator_id': operator_id, 'only_unassigned': only_unassigned}
+        row = self.connection.execute(_ASSIGN_SUPPORT_TICKET, params).fetchone()
+        return dict(row) if row else None
+
+    async def close_support_ticket(self, ticket_id: int) -> dict | None:
+        row = self.connection.execute(_CLOSE_SUPPORT_TICKET, (ticket_id,)).fetchone()
+        return dict(row) if row else None
+
+    async def get_support_backlog(self, after: int, limit: int) -> list[dict]:
+        return [dict(row) for row in self.connection.execute(_SELECT_SUPPORT_BACKLOG, (after, limit))]
+
+    async def set_support_operator_online(self, operator_id: int, online: bool) -> None:
+        self.connection.execute(_UPSERT_SUPPORT_OPERATOR, (operator_id, online))
+
+    async def get_support_operator_loads(self) -> dict[int, int]:
+        return {row['operator_id']: row['load'] for row in self.connection.execute(_SELECT_SUPPORT_OPERATOR_LOADS)}
+
+    async def get_rows_after(self, table: str, key: str, after: int, limit: int, columns: tuple[str, ...]) -> list[dict]:
+        # Имена таблиц и колонок приходят из описаний выгрузки (ExportService), а не от пользователя
+        query = f"SELECT {', '.join(columns)} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?"
+        cursor = self.connection.execute(query, (after, limit))
+        return [_task_row(row) if table == 'task' else dict(row) for row in cursor]
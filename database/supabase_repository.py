@@ -0,0 +1,346 @@
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from database.repository import Repository
+from utils.config import DATABASE_URL, API_DATABASE_KEY
+
+# PostgREST отдаёт не больше max-rows строк за запрос, полные выборки читаются страницами
+_PAGE_SIZE = 1000
+# Сколько id передавать в одном фильтре in.(...): список уходит в строку GET-запроса,
+# а длинный URL отклоняет PostgREST или прокси перед ним
+_IN_CHUNK_SIZE = 300
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+_client: 'Client | None' = None
+
+
+def get_supabase_client() -> 'Client':
+    """Общий клиент Supabase, создаётся при первом обращении (пакет supabase тяжёлый, импортируется здесь же)."""
+    global _client
+    if _client is None:
+        from supabase import create_client
+        _client = create_client(DATABASE_URL, API_DATABASE_KEY)
+    return _client
+
+
+class SupabaseRepository(Repository):
+    """Репозиторий поверх таблиц Supabase (PostgREST)."""
+
+    def __init__(self, client: 'Client | None' = None):
+        self._client = client
+
+    @property
+    def client(self) -> 'Client':
+        if self._client is None:
+            self._client = get_supabase_client()
+        return self._client
+
+    def trace_statements(self, profiler) -> None:
+        # Каждый execute() - один HTTP-запрос сессии PostgREST; hook видит метод, таблицу и фильтры
+        self.client.postgrest.session.event_hooks['request'].append(profiler.trace_http_request)
+
+    async def upsert_user(self, user_id: int, username: str | None, role: str) -> None:
+        self.client.table('users').upsert({
+            'user_id': user_id,
+            'username': username,
+            'role': role,
+            'blocked_at': None,
+        }).execute()
+
+    async def get_user_role(self, user_id: int) -> str | None:
+        response = self.client.table('users').select('role').eq('user_id', user_id).execute()
+        return response.data[0].get('role') if response.data else None
+
+    async def get_recent_user_roles(self, limit: int) -> list[dict]:
+        activity = self.client.table('user_activity').select('user_id') \
+            .order('last_seen', desc=True).limit(limit).execute()
+        user_ids = [row['user_id'] for row in activity.data or []]
+        roles = {}
+        for start in range(0, len(user_ids), _IN_CHUNK_SIZE):
+            response = self.client.table('users').select('user_id, role') \
+                .in_('user_id', user_ids[start:start + _IN_CHUNK_SIZE]).execute()
+            roles.update((row['user_id'], row) for row in response.data or [])
+        # Как и в SQLite: недавно активные первыми
+        return [roles[user_id] for user_id in user_ids if user_id in roles]
+
+    async def upsert_users(self, rows: list[dict]) -> None:
+        rows = [dict(row, blocked_at=None) for row in rows]
+        self.client.table('users').upsert(rows, on_conflict='user_id').execute()
+
+    async def upsert_user_activity(self, rows: list[dict]) -> None:
+        self.client.table('user_activity').upsert(rows, on_conflict='user_id').execute()
+
+    async def insert_user_events(self, rows: list[dict]) -> None:
+        self.client.table('user_event').insert(rows).execute()
+
+    async def get_all_subjects(self) -> list[dict]:
+        return self._select_all('subject', 'subject_id, subject_name, active', 'subject_id')
+
+    async def get_all_task_types(self) -> list[dict]:
+        return self._select_all('task_type', 'task_type_id, type_name, active', 'task_type_id')
+
+    async def get_sections_for_subject(self, subject_id: int) -> list[dict]:
+        response = self.client.table('section').select('section_id, section_name, active') \
+            .eq('subject_id', subject_id).execute()
+        return response.data or []
+
+    async def get_catalog_version(self) -> int:
+        response = self.client.table('catalog_version').select('version').eq('catalog_id', 1).execute()
+        return response.data[0]['version'] if response.data else 0
+
+    async def upsert_executor(self, profile: dict) -> dict | None:
+        response = self.client.table('executor').upsert(profile, on_conflict='user_id').execute()
+        return response.data[0] if response.data else None
+
+    async def replace_executor_subjects(self, executor_id: int, subject_ids: list[int]) -> None:
+        rows = [{'executor_id': executor_id, 'subject_id': sub_id} for sub_id in subject_ids]
+        self.client.table('executor_subject').delete().eq('executor_id', executor_id).execute()
+        if rows:
+            self.client.table('executor_subject').insert(rows).execute()
+
+    async def replace_executor_task_types(self, executor_id: int, task_type_ids: list[int]) -> None:
+        rows = [{'executor_id': executor_id, 'task_type_id': tt_id} for tt_id in task_type_ids]
+        self.client.table('executor_task_type').delete().eq('executor_id', executor_id).execute()
+        if rows:
+            self.client.table('executor_task_type').insert(rows).execute()
+
+    async def replace_executor_sections(self, executor_id: int, section_ids: list[int]) -> None:
+        rows = [{'executor_id': executor_id, 'section_id': s_id} for s_id in section_ids]
+        self.client.table('executor_section').delete().eq('executor_id', executor_id).execute()
+        if rows:
+            self.client.table('executor_section').insert(rows).execute()
+
+    def _select_all(self, table: str, columns: str, order: str) -> list[dict]:
+        rows, offset = [], 0
+        while True:
+            page = self.client.table(table).select(columns).order(order) \
+                .limit(_PAGE_SIZE).offset(offset).execute().data or []
+            rows.extend(page)
+            if len(page) < _PAGE_SIZE:
+                return rows
+            offset += _PAGE_SIZE
+
+    async def get_executors_for_search(self) -> list[dict]:
+        executors = {row['executor_id']: dict(row, subject_ids=[], section_ids=[], task_type_ids=[], stats=None)
+                     for row in self._select_all('executor', 'executor_id, user_id, executor_name, description, '
+                                                             'experience, education, photo_url', 'executor_id')}
+        for table, column in (('executor_subject', 'subject_id'), ('executor_section', 'section_id'),
+                              ('executor_task_type', 'task_type_id')):
+            for row in self._select_all(table, f'executor_id, {column}', 'executor_id'):
+                if row['executor_id'] in executors:
+                    executors[row['executor_id']][f'{column}s'].append(row[column])
+        for row in self._select_all('executor_stats', '*', 'executor_id'):
+            if row['executor_id'] in executors:
+                executors[row['executor_id']]['stats'] = row
+        return list(executors.values())
+
+    async def get_executor_for_search(self, executor_id: int) -> dict | None:
+        response = self.client.table('executor').select('executor_id, user_id, executor_name, description, '
+                                                        'experience, education, photo_url') \
+            .eq('executor_id', executor_id).execute()
+        if not response.data:
+            return None
+        links = await self.get_executor_links([executor_id])
+        stats = self.client.table('executor_stats').select('*').eq('executor_id', executor_id).execute().data
+        return dict(response.data[0], **links[executor_id], stats=stats[0] if stats else None)
+
+    async def get_executor_links(self, executor_ids: list[int]) -> dict[int, dict]:
+        links = {executor_id: {'subject_ids': [], 'section_ids': [], 'task_type_ids': []}
+                 for executor_id in executor_ids}
+        if not executor_ids:
+            return links
+        for table, column in (('executor_subject', 'subject_id'), ('executor_section', 'section_id'),
+                              ('executor_task_type', 'task_type_id')):
+            response = self.client.table(table).select(f'executor_id, {column}') \
+                .in_('executor_id', executor_ids).execute()
+            for row in response.data or []:
+                links[row['executor_id']][f'{column}s'].append(row[column])
+        return links
+
+    async def upsert_customer(self, profile: dict) -> None:
+        self.client.table('customer').upsert(profile, on_conflict='user_id').execute()
+
+    async def get_customer_id(self, user_id: int) -> int | None:
+        response = self.client.table('customer').select('customer_id').eq('user_id', user_id).execute()
+        return response.data[0].get('customer_id') if response.data else None
+
+    async def get_executor_id(self, user_id: int) -> int | None:
+        response = self.client.table('executor').select('executor_id').eq('user_id', user_id).execute()
+        return response.data[0].get('executor_id') if response.data else None
+
+    async def insert_task(self, task: dict) -> dict | None:
+        response = self.client.table('task').insert(task).execute()
+        return response.data[0] if response.data else None
+
+    async def update_task_attachments(self, task_id: int, urls: list[str]) -> bool:
+        response = self.client.table('task').update({'attachments_urls': urls}).eq('task_id', task_id).execute()
+        return bool(response.data)
+
+    async def get_task(self, task_id: int) -> dict | None:
+        response = self.client.table('task').select('*, customer(user_id)').eq('task_id', task_id).execute()
+        if not response.data:
+            return None
+        task = response.data[0]
+        task['customer_user_id'] = (task.pop('customer') or {}).get('user_id')
+        return task
+
+    async def assign_task(self, task_id: int, offer_id: int, version: int) -> dict | None:
+        # Функция assign_task (миграция 11) в одной транзакции условно назначает исполнителя
+        # и разбирает отклики: при гонке заказ получит только первый запрос
+        response = self.client.rpc('assign_task', {
+            'p_task_id': task_id,
+            'p_offer_id': offer_id,
+            'p_version': version,
+        }).execute()
+        return response.data[0] if response.data else None
+
+    async def complete_task(self, task_id: int, customer_user_id: int, score: int) -> dict | None:
+        # Функция complete_task (миграция 12) завершает заказ и пишет оценку в одной транзакции;
+        # условное обновление срабатывает один раз, поэтому оценка записывается не больше одного раза
+        response = self.client.rpc('complete_task', {
+            'p_task_id': task_id,
+            'p_user_id': customer_user_id,
+            'p_score': score,
+        }).execute()
+        if not response.data:
+            return None
+        row = response.data[0]
+        return {'task_id': row['task_id'], 'executor_id': row['executor_id'], 'score': row['score']}
+
+    async def search_open_tasks(self, query: str, subject_ids: list[int], task_type_ids: list[int],
+                                before: int | None, limit: int) -> list[dict]:
+        request = self.client.table('task').select(
+            'task_id, subject_id, section_id, task_type_id, description, deadline, created_at'
+        ).eq('status', 'open')
+        if before:
+            request = request.lt('task_id', before)
+        if subject_ids:
+            request = request.in_('subject_id', subject_ids)
+        if task_type_ids:
+            request = request.in_('task_type_id', task_type_ids)
+        if query.strip():
+            # Колонка search_vector и GIN-индекс по ней создаются миграцией 5 (database/models.py)
+            request = request.text_search('search_vector', query, options={'config': 'russian', 'type': 'websearch'})
+        return request.order('task_id', desc=True).limit(limit).execute().data or []
+
+    async def upsert_offer(self, offer: dict) -> dict | None:
+        # PostgREST не умеет вставку с условием по другой таблице: статус заказа проверяется отдельно,
+        # а отклик, записанный после назначения, не примет assign_task (он ищет только открытые заказы)
+        task = self.client.table('task').select('status').eq('task_id', offer['task_id']).execute()
+        if not task.data or task.data[0]['status'] != 'open':
+            return None
+        existing = self.client.table('offer').select('status').eq('task_id', offer['task_id']) \
+            .eq('executor_id', offer['executor_id']).execute()
+        if existing.data and existing.data[0]['status'] != 'pending':
+            return None
+        response = self.client.table('offer').upsert(offer, on_conflict='task_id,executor_id').execute()
+        return response.data[0] if response.data else None
+
+    async def get_offers_for_task(self, task_id: int) -> list[dict]:
+        response = self.client.table('offer').select('*, executor(user_id, executor_name, experience)') \
+            .eq('task_id', task_id).order('created_at').order('offer_id').execute()
+        offers = []
+        for row in response.data or []:
+            executor = row.pop('executor') or {}
+            offers.append(dict(row, executor_user_id=executor.get('user_id'),
+                               executor_name=executor.get('executor_name'), experience=executor.get('experience')))
+        return offers
+
+    def _recipients(self, roles: list[str], after: int, **select):
+        return self.client.table('users').select('user_id', **select).in_('role', roles) \
+            .is_('blocked_at', 'null').gt('user_id', after)
+
+    async def get_broadcast_recipients(self, roles: list[str], after: int, limit: int) -> list[int]:
+        response = self._recipients(roles, after).order('user_id').limit(limit).execute()
+        return [row['user_id'] for row in response.data or []]
+
+    async def count_broadcast_recipients(self, roles: list[str], after: int) -> int:
+        response = self._recipients(roles, after, count='exact').limit(1).execute()
+        return response.count or 0
+
+    async def mark_users_blocked(self, user_ids: list[int]) -> None:
+        self.client.table('users').update({'blocked_at': datetime.now(timezone.utc).isoformat()}) \
+            .in_('user_id', user_ids).execute()
+
+    async def open_support_ticket(self, user_id: int) -> tuple[dict, bool]:
+        def select_open():
+            return self.client.table('support_ticket').select('*').eq('user_id', user_id) \
+                .neq('status', 'closed').execute().data
+
+        existing = select_open()
+        if existing:
+            return existing[0], False
+        try:
+            response = self.client.table('support_ticket').insert({'user_id': user_id}).execute()
+            return response.data[0], True
+        except Exception:
+            # Параллельный запрос уже открыл обращение: частичный уникальный индекс не дал создать второе
+            existing = select_open()
+            if not existing:
+                raise
+            return existing[0], False
+
+    async def add_support_message(self, ticket_id: int, direction: str, text: str) -> dict:
+        response = self.client.table('support_message').insert({
+            'ticket_id': ticket_id, 'direction': direction, 'text': text,
+        }).execute()
+        return response.data[0]
+
+    async def get_support_ticket(self, ticket_id: int) -> dict | None:
+        response = self.client.table('support_ticket').select('*').eq('ticket_id', ticket_id).execute()
+        return response.data[0] if response.data else None
+
+    async def get_ticket_by_staff_message(self, staff_message_id: int) -> dict | None:
+        response = self.client.table('support_message').select('support_ticket(*)') \
+            .eq('staff_message_id', staff_message_id).limit(1).execute()
+        return response.data[0]['support_ticket'] if response.data else None
+
+    async def get_undelivered_support_messages(self) -> list[dict]:
+        response = self.client.table('support_message').select('*, support_ticket!inner(status)') \
+            .neq('support_ticket.status', 'closed').eq('direction', 'user').is_('staff_message_id', 'null') \
+            .order('message_id').execute()
+        return [{key: value for key, value in row.items() if key != 'support_ticket'} for row in response.data or []]
+
+    async def mark_support_messages_delivered(self, message_ids: list[int], staff_message_id: int) -> None:
+        self.client.table('support_message').update({'staff_message_id': staff_message_id}) \
+            .in_('message_id', message_ids).execute()
+
+    async def assign_support_ticket(self, ticket_id: int, operator_id: int, only_unassigned: bool) -> dict | None:
+        request = self.client.table('support_ticket').update({'status': 'assigned', 'operator_id': operator_id}) \
+            .eq('ticket_id', ticket_id).neq('status', 'closed')
+        if only_unassigned:
+            request = request.is_('operator_id', 'null')
+        response = request.execute()
+        return response.data[0] if response.data else None
+
+    async def close_support_ticket(self, ticket_id: int) -> dict | None:
+        response = self.client.table('support_ticket').update({'status': 'closed', 'closed_at': datetime.now(timezone.utc).isoformat()}) \
+            .eq('ticket_id', ticket_id).neq('status', 'closed').execute()
+        return response.data[0] if response.data else None
+
+    async def get_support_backlog(self, after: int, limit: int) -> list[dict]:
+        response = self.client.table('support_ticket').select('*').neq('status', 'closed').gt('ticket_id', after) \
+            .order('ticket_id').limit(limit).execute()
+        return response.data or []
+
+    async def set_support_operator_online(self, operator_id: int, online: bool) -> None:
+        self.client.table('support_operator').upsert({
+            'operator_id': operator_id, 'online': online, 'updated_at': datetime.now(timezone.utc).isoformat(),
+        }, on_conflict='operator_id').execute()
+
+    async def get_support_operator_loads(self) -> dict[int, int]:
+        operators = self.client.table('support_operator').select('operator_id').eq('online', True).execute()
+        loads = {row['operator_id']: 0 for row in operators.data or []}
+        if loads:
+            tickets = self.client.table('support_ticket').select('operator_id').eq('status', 'assigned') \
+                .in_('operator_id', list(loads)).execute()
+            for row in tickets.data or []:
+                loads[row['operator_id']] += 1
+        return loads
+
+    async def get_rows_after(self, table: str, key: str, after: int, limit: int, columns: tuple[str, ...]) -> list[dict]:
+        response = self.client.table(table).select(', '.join(columns)).gt(key, after) \
+            .order(key).limit(limit).execute()
+        return response.data or []
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+
+from database.repository import Repository, get_repository
+from utils.config import WRITE_BEHIND_INTERVAL_MS, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_MAX_PENDING, \
+    WRITE_BEHIND_SPILL_PATH
+
+logger = logging.getLogger(__name__)
+
+# Попытки финального сброса при остановке, прежде чем остаток уйдёт в файл
+_SHUTDOWN_ATTEMPTS = 3
+# Сколько submit ждёт места в заполненном буфере, прежде чем сдаться (например, при недоступной БД)
+_BACKPRESSURE_TIMEOUT = 5.0
+
+
+class WriteBehindBuffer:
+    """
+    Буфер отложенной записи для некритичных данных (повторные upsert роли, last_seen,
+    аналитические события). Upsert-строки схлопываются по ключу (побеждает последняя),
+    вставки копятся списком; всё сбрасывается многострочными запросами раз в `interval`
+    секунд или при накоплении `batch_size` строк. Если буфер заполнен до `max_pending`,
+    submit ждёт сброса (backpressure). При остановке несброшенное пишется в spill-файл
+    и дозаписывается при следующем старте.
+    """
+
+    def __init__(self, repository: Repository, interval: float, batch_size: int, max_pending: int,
+                 spill_path: str | None):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        # таблица -> функция многострочной записи
+        self._upsert_writers = {
+            'users': repository.upsert_users,
+            'user_activity': repository.upsert_user_activity,
+        }
+        self._insert_writers = {
+            'user_event': repository.insert_user_events,
+        }
+        self._upserts: dict[str, dict] = {table: {} for table in self._upsert_writers}
+        self._inserts: dict[str, list] = {table: [] for table in self._insert_writers}
+        # upsert-строки, которые прямо сейчас пишутся в БД
+        self._in_flight: dict[str, dict] = {table: {} for table in self._upsert_writers}
+        self._pending = 0
+        self._flush_requested = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    # --- Запись в буфер ---
+
+    async def _wait_for_space(self):
+        while self._pending >= self.max_pending:
+            self._not_full.clear()
+            self._flush_requested.set()
+            await asyncio.wait_for(self._not_full.wait(), _BACKPRESSURE_TIMEOUT)
+
+    def _added(self, count: int = 1):
+        self._pending += count
+        if self._pending >= self.batch_size:
+            self._flush_requested.set()
+
+    async def upsert(self, table: str, key, row: dict):
+        """
+        Ставит в очередь upsert строки; более поздняя запись с тем же ключом заменяет раннюю.
+        Если буфер не освободился за _BACKPRESSURE_TIMEOUT, бросает asyncio.TimeoutError.
+        """
+        if key not in self._upserts[table]:
+            await self._wait_for_space()
+            # За время ожидания буфер мог смениться при сбросе, поэтому берём его заново
+            if key not in self._upserts[table]:
+                self._added()
+        self._upserts[table][key] = row
+
+    async def insert(self, table: str, row: dict):
+        """Ставит в очередь вставку строки."""
+        await self._wait_for_space()
+        self._inserts[table].append(row)
+        self._added()
+
+    def pending(self, table: str, key) -> dict | None:
+        """Ещё не записанная upsert-строка - чтобы чтение сразу видело свою запись."""
+        return self._upserts[table].get(key) or self._in_flight[table].get(key)
+
+    # --- Сброс ---
+
+    def _take_all(self) -> list[tuple[str, bool, list]]:
+        batches = [(table, True, list(rows.items())) for table, rows in self._upserts.items() if rows]
+        batches += [(table, False, rows) for table, rows in self._inserts.items() if rows]
+        self._upserts = {table: {} for table in self._upsert_writers}
+        self._inserts = {table: [] for table in self._insert_writers}
+        self._pending = 0
+        self._not_full.set()
+        return batches
+
+    def _requeue(self, table: str, is_upsert: bool, items: list):
+        if is_upsert:
+            rows = self._upserts[table]
+            for key, row in items:
+                # Более свежая версия, поставленная во время сброса, важнее
+                if key not in rows:
+                    rows[key] = row
+                    self._pending += 1
+        else:
+            self._inserts[table][:0] = items
+            self._pending += len(items)
+
+    async def flush(self) -> bool:
+        """Записывает всё накопленное. Возвращает False, если часть строк вернулась в буфер."""
+        async with self._flush_lock:
+            ok = True
+            for table, is_upsert, items in self._take_all():
+                for start in range(0, len(items), self.batch_size):
+                    chunk = items[start:start + self.batch_size]
+                    try:
+                        if is_upsert:
+                            self._in_flight[table] = dict(chunk)
+                            await self._upsert_writers[table]([row for _, row in chunk])
+                        else:
+                            await self._insert_writers[table](chunk)
+                    except Exception as e:
+                        logger.error("Write-behind flush of %s rows into %s failed: %s", len(chunk), table, e)
+                        self._requeue(table, is_upsert, chunk)
+                        ok = False
+                    finally:
+                        if is_upsert:
+                            self._in_flight[table] = {}
+            return ok
+
+    async def _run(self):
+        failures = 0
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.interval * (2 ** min(failures, 6)))
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            failures = 0 if await self.flush() else failures + 1
+
+    # --- Жизненный цикл ---
+
+    async def start(self):
+        self._stopping = False
+        await self._restore_spill()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновый сброс и сливает буфер; что не удалось записать - в spill-файл."""
+        self._stopping = True
+        self._flush_requested.set()
+        if self._task:
+            await self._task
+            self._task = None
+        for _ in range(_SHUTDOWN_ATTEMPTS):
+            if await self.flush():
+                return
+            await asyncio.sleep(self.interval)
+        self._spill()
+
+    def _own_spill_path(self) -> Path:
+        # Свой файл у каждого процесса: воркеры из одного каталога не пишут в общий файл
+        base = Path(self.spill_path)
+        return base.with_name(f"{base.stem}.{os.getpid()}{base.suffix}")
+
+    def _spill(self):
+        if not self.spill_path:
+            logger.error("Write-behind buffer lost %s rows on shutdown", self._pending)
+            return
+        path = self._own_spill_path()
+        with open(path, 'a', encoding='utf-8') as f:
+            for table, is_upsert, items in self._take_all():
+                for item in items:
+                    key, row = item if is_upsert else (None, item)
+                    f.write(json.dumps({'table': table, 'key': key, 'row': row}, ensure_ascii=False, default=str) + '\n')
+        logger.warning("Write-behind rows spilled to %s", path)
+
+    def _claim_spill_files(self) -> list[Path]:
+        """
+        Забирает spill-файлы всех процессов (и общий файл прежних версий) переименованием: файл
+        достаётся ровно одному стартующему воркеру, поэтому строки дозаписываются один раз.
+        """
+        base = Path(self.spill_path)
+        candidates = [base, *base.parent.glob(f"{base.stem}.*{base.suffix}")]
+        claimed = []
+        for path in sorted((path for path in candidates if path.exists()), key=lambda path: path.stat().st_mtime):
+            target = path.with_name(f"{path.name}.{os.getpid()}.restoring")
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue  # файл уже забрал другой воркер
+            claimed.append(target)
+        return claimed
+
+    async def _restore_spill(self):
+        if not self.spill_path:
+            return
+        paths = self._claim_spill_files()
+        if not paths:
+            return
+        records = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+            os.remove(path)
+        restored = 0
+        for record in records:
+            if record['table'] in self._upserts:
+                rows = self._upserts[record['table']]
+                # Файлы читаются от старых к новым: более поздняя строка с тем же ключом свежее
+                if record['key'] not in rows:
+                    restored += 1
+                rows[record['key']] = record['row']
+            else:
+                self._inserts[record['table']].append(record['row'])
+                restored += 1
+        self._pending += restored
+        logger.info("Restored %s write-behind rows from %s", restored, ", ".join(path.name for path in paths))
+
+
+_write_behind: WriteBehindBuffer | None = None
+
+
+def get_write_behind() -> WriteBehindBuffer:
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = WriteBehindBuffer(
+            repository=get_repository(),
+            interval=WRITE_BEHIND_INTERVAL_MS / 1000,
+            batch_size=WRITE_BEHIND_BATCH_SIZE,
+            max_pending=WRITE_BEHIND_MAX_PENDING,
+            spill_path=WRITE_BEHIND_SPILL_PATH,
+        )
+    return _write_behind
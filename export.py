@@ -0,0 +1,67 @@
+"""
+Выгрузка заказов, заказчиков и исполнителей для аналитики.
+
+Запуск из корня репозитория (например, ежедневно из cron):
+    python export.py --format csv --out exports
+    python export.py tasks --format parquet --incremental --state exports/export_state.json
+
+Файлы называются <выгрузка>_<дата>.<формат>; с --incremental выгружаются только строки
+с id больше последнего выгруженного, и после успешной выгрузки файл состояния обновляется.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date
+from pathlib import Path
+
+from utils.logger import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+
+async def run(args) -> int:
+    from service.ExportService import DATASETS, export_dataset, load_catalog_names
+    from utils.state import load_state, save_state
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state_path = Path(args.state) if args.state else out_dir / 'export_state.json'
+    state = load_state(state_path) if args.incremental else {}
+    catalog = await load_catalog_names()
+
+    for name in args.datasets or list(DATASETS):
+        after = state.get(name, 0)
+        suffix = f"_after{after}" if after else ""
+        path = out_dir / f"{name}_{date.today():%Y%m%d}{suffix}.{args.format}"
+        count, last_id = await export_dataset(name, path, args.format, after, args.batch_size, catalog)
+        print(f"{name}: {count} строк -> {path}")
+        if args.incremental:
+            state[name] = last_id
+            save_state(state_path, state)
+    return 0
+
+
+def main():
+    from service.ExportService import DATASETS, EXPORT_BATCH_SIZE, FORMATS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('datasets', nargs='*', help=f"Выгрузки: {', '.join(DATASETS)} (по умолчанию все)")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--out', default='exports', help="Каталог для файлов выгрузки")
+    parser.add_argument('--incremental', action='store_true', help="Только строки после последней выгрузки")
+    parser.add_argument('--state', help="Файл состояния инкрементальной выгрузки (по умолчанию в --out)")
+    parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    unknown = set(args.datasets) - set(DATASETS)
+    if unknown:
+        parser.error(f"неизвестные выгрузки: {', '.join(sorted(unknown))}")
+
+    setup_logging()
+    try:
+        raise SystemExit(asyncio.run(run(args)))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == '__main__':
+    main()
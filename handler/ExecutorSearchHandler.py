@@ -0,0 +1,119 @@
+import logging
+
+from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import Message, CallbackQuery
+
+from service.ExecutorSearchService import get_search_subjects_keyboard, get_search_sections_keyboard, \
+    get_search_task_types_keyboard, get_search_query_keyboard, format_search_page
+from service.KeyBoardService import SECTION_PREFIX_MAX, SECTION_SEARCH_HINT
+from utils.callbacks import Flow, Pick, Payload, SubjectCallback, SectionCallback, TaskTypeCallback, SearchCallback, \
+    SearchAction, Catalog, CatalogPageCallback
+
+search_router = Router()
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSearchStates(StatesGroup):
+    SELECTING_SUBJECT = State()
+    SELECTING_SECTION = State()
+    SELECTING_TASK_TYPE = State()
+    ENTERING_QUERY = State()
+    BROWSING = State()
+
+
+async def handle_executor_search(message: Message, state: FSMContext):
+    """Начинает поиск исполнителя: предмет -> раздел -> тип задачи -> ключевые слова."""
+    await state.set_state(ExecutorSearchStates.SELECTING_SUBJECT)
+    await state.set_data({})
+    await message.answer("📚 По какому предмету нужен исполнитель?", reply_markup=await get_search_subjects_keyboard())
+
+
+@search_router.callback_query(Payload(SubjectCallback, flow=Flow.SEARCH), ExecutorSearchStates.SELECTING_SUBJECT)
+async def handle_search_subject(callback: CallbackQuery, state: FSMContext, callback_data: SubjectCallback):
+    subject_id = callback_data.subject_id if callback_data.pick == Pick.ITEM else None
+    await state.update_data(subject_id=subject_id, section_prefix="")
+    if subject_id is None:
+        await state.set_state(ExecutorSearchStates.SELECTING_TASK_TYPE)
+        await callback.message.edit_text("🔧 Какой тип задачи?", reply_markup=await get_search_task_types_keyboard())
+    else:
+        await state.set_state(ExecutorSearchStates.SELECTING_SECTION)
+        await callback.message.edit_text(f"📖 Выберите раздел:\n{SECTION_SEARCH_HINT}",
+                                         reply_markup=await get_search_sections_keyboard(subject_id))
+    await callback.answer()
+
+
+@search_router.callback_query(Payload(CatalogPageCallback, flow=Flow.SEARCH, catalog=Catalog.SUBJECT),
+                              ExecutorSearchStates.SELECTING_SUBJECT)
+async def handle_search_subjects_page(callback: CallbackQuery, callback_data: CatalogPageCallback):
+    await callback.message.edit_reply_markup(reply_markup=await get_search_subjects_keyboard(callback_data.page))
+    await callback.answer()
+
+
+@search_router.callback_query(Payload(CatalogPageCallback, flow=Flow.SEARCH, catalog=Catalog.SECTION),
+                              ExecutorSearchStates.SELECTING_SECTION)
+async def handle_search_sections_page(callback: CallbackQuery, state: FSMContext, callback_data: CatalogPageCallback):
+    data = await state.get_data()
+    prefix = "" if callback_data.reset else data.get("section_prefix", "")
+    await state.update_data(section_prefix=prefix)
+    await callback.message.edit_reply_markup(
+        reply_markup=await get_search_sections_keyboard(data["subject_id"], callback_data.page, prefix)
+    )
+    await callback.answer()
+
+
+@search_router.message(F.text, ExecutorSearchStates.SELECTING_SECTION)
+async def handle_search_sections_prefix(message: Message, state: FSMContext):
+    """Текст в выборе раздела - поиск по началу названия."""
+    prefix = message.text.strip()[:SECTION_PREFIX_MAX]
+    await state.update_data(section_prefix=prefix)
+    subject_id = (await state.get_data())["subject_id"]
+    await message.answer(f"📖 Выберите раздел:\n{SECTION_SEARCH_HINT}",
+                         reply_markup=await get_search_sections_keyboard(subject_id, prefix=prefix))
+
+
+@search_router.callback_query(Payload(SectionCallback, flow=Flow.SEARCH), ExecutorSearchStates.SELECTING_SECTION)
+async def handle_search_section(callback: CallbackQuery, state: FSMContext, callback_data: SectionCallback):
+    await state.update_data(section_id=callback_data.section_id if callback_data.pick == Pick.ITEM else None)
+    await state.set_state(ExecutorSearchStates.SELECTING_TASK_TYPE)
+    await callback.message.edit_text("🔧 Какой тип задачи?", reply_markup=await get_search_task_types_keyboard())
+    await callback.answer()
+
+
+@search_router.callback_query(Payload(TaskTypeCallback, flow=Flow.SEARCH), ExecutorSearchStates.SELECTING_TASK_TYPE)
+async def handle_search_task_type(callback: CallbackQuery, state: FSMContext, callback_data: TaskTypeCallback):
+    await state.update_data(task_type_id=callback_data.task_type_id if callback_data.pick == Pick.ITEM else None)
+    await state.set_state(ExecutorSearchStates.ENTERING_QUERY)
+    await callback.message.edit_text(
+        "✍️ Введите ключевые слова (например, «олимпиадная математика» или «МГУ») или нажмите «Пропустить».",
+        reply_markup=get_search_query_keyboard()
+    )
+    await callback.answer()
+
+
+@search_router.message(F.text, ExecutorSearchStates.ENTERING_QUERY)
+async def handle_search_query(message: Message, state: FSMContext):
+    await state.update_data(query=message.text.strip())
+    await state.set_state(ExecutorSearchStates.BROWSING)
+    text, keyboard = await format_search_page(await state.get_data(), page=0)
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+@search_router.callback_query(Payload(SearchCallback, action=SearchAction.SKIP), ExecutorSearchStates.ENTERING_QUERY)
+async def handle_search_skip_query(callback: CallbackQuery, state: FSMContext):
+    await state.set_state(ExecutorSearchStates.BROWSING)
+    text, keyboard = await format_search_page(await state.get_data(), page=0)
+    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    await callback.answer()
+
+
+@search_router.callback_query(Payload(SearchCallback, action=SearchAction.PAGE), ExecutorSearchStates.BROWSING)
+async def handle_search_page(callback: CallbackQuery, state: FSMContext, callback_data: SearchCallback):
+    try:
+        text, keyboard = await format_search_page(await state.get_data(), page=callback_data.page)
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        await callback.answer()
+    except Exception as e:
+        logger.error("Ошибка в handle_search_page: %s", e)
+        await callback.answer("Произошла ошибка", show_alert=True)
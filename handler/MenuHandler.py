@@ -0,0 +1,38 @@
+from aiogram import Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+
+from handler import RegistrationCustomerHandler as customer, RegistrationExecutorHandler as executor
+from handler.ExecutorSearchHandler import handle_executor_search
+from handler.SupportHandler import handle_support_request
+from handler.TaskFeedHandler import handle_task_feed
+from handler.TaskHandler import handle_create_task
+from service.MenuService import MAIN_MENUS
+from utils.filters import MenuButtonFilter
+
+menu_router = Router()
+
+# Действие каждой кнопки меню по (роль, идентификатор из MenuService.MAIN_MENUS)
+MENU_ACTIONS = {
+    ('customer', 'create_task'): handle_create_task,
+    ('customer', 'find_executor'): handle_executor_search,
+    ('customer', 'profile'): customer.handle_profile_request,
+    ('customer', 'orders'): customer.handle_orders_request,
+    ('customer', 'support'): handle_support_request,
+    ('executor', 'task_feed'): handle_task_feed,
+    ('executor', 'profile'): executor.handle_profile_request,
+    ('executor', 'orders'): executor.handle_orders_request,
+    ('executor', 'support'): handle_support_request,
+}
+# Таблица маршрутов (роль, текст кнопки) -> обработчик; строится один раз из описания меню
+MENU_ROUTES = {
+    (role, text): MENU_ACTIONS[(role, action)]
+    for role, buttons in MAIN_MENUS.items()
+    for action, text in buttons
+}
+
+
+@menu_router.message(MenuButtonFilter(MENU_ROUTES))
+async def handle_menu_button(message: Message, state: FSMContext, menu_action):
+    """Кнопки главного меню работают из любого состояния: действие само решает, что делать с FSM."""
+    await menu_action(message, state)
@@ -0,0 +1,121 @@
+import logging
+
+from aiogram import Router, F, Bot
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import Message, CallbackQuery
+
+from service.DataBaseService import get_task, submit_offer, accept_offer, rate_task
+from service.OfferService import format_offers, notify_customer_about_offer, notify_executor_assigned, \
+    get_rating_keyboard, notify_executor_rated
+from utils.callbacks import Payload, OfferCallback, OfferAction, RatingCallback
+
+offer_router = Router()
+logger = logging.getLogger(__name__)
+
+
+class OfferStates(StatesGroup):
+    ENTERING_PRICE = State()
+    ENTERING_ETA = State()
+
+
+@offer_router.callback_query(Payload(OfferCallback, action=OfferAction.BID))
+async def handle_bid_start(callback: CallbackQuery, state: FSMContext, callback_data: OfferCallback):
+    """Исполнитель откликается на заказ: цена, затем срок."""
+    task = await get_task(callback_data.task_id)
+    if not task or task['status'] != 'open':
+        await callback.answer("Заказ уже не принимает отклики", show_alert=True)
+        return
+    await state.set_state(OfferStates.ENTERING_PRICE)
+    await state.set_data({'offer_task_id': callback_data.task_id})
+    await callback.message.answer(f"💰 Ваша цена за заказ #{callback_data.task_id} (в рублях):")
+    await callback.answer()
+
+
+@offer_router.message(F.text, OfferStates.ENTERING_PRICE)
+async def handle_bid_price(message: Message, state: FSMContext):
+    try:
+        price = int(message.text.strip())
+    except ValueError:
+        await message.answer("⚠️ Пожалуйста, введите число.")
+        return
+    if price <= 0:
+        await message.answer("⚠️ Цена должна быть больше нуля.")
+        return
+    await state.update_data(offer_price=price)
+    await state.set_state(OfferStates.ENTERING_ETA)
+    await message.answer("⏳ За сколько часов вы выполните заказ?")
+
+
+@offer_router.message(F.text, OfferStates.ENTERING_ETA)
+async def handle_bid_eta(message: Message, state: FSMContext, bot: Bot):
+    try:
+        eta_hours = int(message.text.strip())
+    except ValueError:
+        await message.answer("⚠️ Пожалуйста, введите число часов.")
+        return
+    if eta_hours <= 0:
+        await message.answer("⚠️ Срок должен быть больше нуля.")
+        return
+    data = await state.get_data()
+    await state.clear()
+    task_id = data['offer_task_id']
+    offer = await submit_offer(message.from_user.id, task_id, data['offer_price'], eta_hours)
+    if not offer:
+        await message.answer("❌ Не удалось отправить отклик: заказ уже закрыт или у вас нет анкеты исполнителя.")
+        return
+    await message.answer(f"✅ Отклик на заказ #{task_id} отправлен. Мы сообщим, если заказчик выберет вас.")
+    task = await get_task(task_id)
+    if task:
+        await notify_customer_about_offer(bot, task, offer)
+
+
+@offer_router.callback_query(Payload(OfferCallback, action=OfferAction.LIST))
+async def handle_offers_list(callback: CallbackQuery, callback_data: OfferCallback):
+    task = await get_task(callback_data.task_id)
+    if not task or task['customer_user_id'] != callback.from_user.id:
+        await callback.answer("Заказ не найден", show_alert=True)
+        return
+    if task['status'] != 'open':
+        await callback.answer("Исполнитель для этого заказа уже выбран", show_alert=True)
+        return
+    text, keyboard = await format_offers(callback_data.task_id)
+    await callback.message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+    await callback.answer()
+
+
+@offer_router.callback_query(Payload(OfferCallback, action=OfferAction.ACCEPT))
+async def handle_offer_accept(callback: CallbackQuery, callback_data: OfferCallback, bot: Bot):
+    try:
+        offer = await accept_offer(callback.from_user.id, callback_data.task_id, callback_data.offer_id)
+        if not offer:
+            await callback.answer("Исполнитель для этого заказа уже выбран", show_alert=True)
+            return
+        await callback.message.edit_text(
+            f"🤝 Исполнитель для заказа #{callback_data.task_id} выбран: "
+            f"{offer.get('executor_name') or 'без имени'}, {offer['price']} ₽, {offer['eta_hours']} ч.\n\n"
+            f"Когда заказ будет выполнен, оцените исполнителя:",
+            reply_markup=get_rating_keyboard(callback_data.task_id)
+        )
+        await notify_executor_assigned(bot, callback_data.task_id, offer)
+        await callback.answer()
+    except Exception as e:
+        logger.error("Ошибка в handle_offer_accept: %s", e)
+        await callback.answer("Произошла ошибка", show_alert=True)
+
+
+@offer_router.callback_query(Payload(RatingCallback))
+async def handle_task_rating(callback: CallbackQuery, callback_data: RatingCallback, bot: Bot):
+    """Оценка завершает заказ; сводку исполнителя обновляет БД."""
+    if not 1 <= callback_data.score <= 5:
+        await callback.answer()
+        return
+    rating = await rate_task(callback.from_user.id, callback_data.task_id, callback_data.score)
+    if not rating:
+        await callback.answer("Заказ уже завершён или исполнитель ещё не выбран", show_alert=True)
+        return
+    await callback.message.edit_text(
+        f"🏁 Заказ #{callback_data.task_id} завершён, ваша оценка: {callback_data.score}⭐. Спасибо!"
+    )
+    await notify_executor_rated(bot, rating)
+    await callback.answer()
@@ -1,50 +1,49 @@
-from pathlib import Path
+import logging
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import CallbackQuery, Message, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
-from aiogram import Router, F
+from aiogram import Router
 
 from service.RegistrationExecutorService import contains_links
+from service.RegistrationService import get_privacy_text
 from service.MenuService import get_customer_main_menu_keyboard
 from service.DataBaseService import update_user_role, save_customer_profile
-from utils.filters import RoleFilter
+from utils.callbacks import Role, Payload, RegisterCallback, ConsentCallback
 
 customer_router = Router()
+logger = logging.getLogger(__name__)
 
 class CustomerStates(StatesGroup):
     WAITING_CONSENT = State()
     WAITING_NAME = State()
 
-# Загружаем текст соглашения
-BASE_DIR = Path(__file__).parent.parent
-PRIVACY_FILE = BASE_DIR / 'utils' / 'privacy_policy.txt'
-PRIVACY_TEXT = PRIVACY_FILE.read_text(encoding='utf-8')
 
-
-@customer_router.callback_query(F.data == "register_as_customer")
+@customer_router.callback_query(Payload(RegisterCallback, role=Role.CUSTOMER))
 async def handle_customer_registration(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_data({"role": "customer"})  # Важно: role=customer
         await state.set_state(CustomerStates.WAITING_CONSENT)
-        print(f"Выбрана роль заказчика")
+        logger.debug("Выбрана роль заказчика")
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Принимаю", callback_data="customer_accept")],
-            [InlineKeyboardButton(text="❌ Отклонить", callback_data="customer_reject")]
+            [InlineKeyboardButton(text="✅ Принимаю",
+                                  callback_data=ConsentCallback(role=Role.CUSTOMER, accepted=True).pack())],
+            [InlineKeyboardButton(text="❌ Отклонить",
+                                  callback_data=ConsentCallback(role=Role.CUSTOMER, accepted=False).pack())]
         ])
 
         await callback.message.edit_text(  # Изменяем существующее сообщение
-            f"Перед регистрацией необходимо принять соглашение:\n\n{PRIVACY_TEXT}",
+            f"Перед регистрацией необходимо принять соглашение:\n\n{get_privacy_text()}",
             reply_markup=keyboard
         )
         await callback.answer()
     except Exception as e:
-        print(f"Ошибка регистрации заказчика: {e}")
+        logger.error("Ошибка регистрации заказчика: %s", e)
         await callback.answer("Произошла ошибка", show_alert=True)
 
 
-@customer_router.callback_query(F.data.in_(["customer_accept", "customer_reject"]))
-async def handle_privacy_response(callback: CallbackQuery, state: FSMContext):
-    if callback.data == "customer_reject":
+@customer_router.callback_query(Payload(ConsentCallback, role=Role.CUSTOMER))
+async def handle_privacy_response(callback: CallbackQuery, state: FSMContext, callback_data: ConsentCallback):
+    if not callback_data.accepted:
         await callback.message.answer("❌ Регистрация невозможна без принятия соглашения")
         await state.clear()
         return
@@ -82,7 +81,7 @@ async def handle_name_input(message: Message, state: FSMContext):
 
     # Сохраняем пользователя
     await update_user_role(user_id=message.from_user.id, username=  message.from_user.username, role='customer')
-    print(f"DEBUG: Saved role for user {message.from_user.id}. Current roles: customer")
+    logger.debug("Saved role for user %s. Current roles: %s", message.from_user.id, "customer")
     # Сохраняем профиль заказчика
     data = await state.get_data()
     await save_customer_profile(user_id=message.from_user.id, data=data)
@@ -90,19 +89,12 @@ async def handle_name_input(message: Message, state: FSMContext):
     await state.clear()  # Важно очистить состояние
 
 
-# Обработчики меню остаются без изменений
+# Действия кнопок меню заказчика (маршрутизируются через MenuHandler)
 
-@customer_router.message(F.text == "Мой профиль", RoleFilter("customer"))
-async def handle_profile_request(message: Message):
+async def handle_profile_request(message: Message, state: FSMContext):
     # Здесь будет логика показа профиля
     await message.answer("📌 Ваш профиль:")
 
-@customer_router.message(F.text == "Мои заказы", RoleFilter("customer"))
-async def handle_orders_request(message: Message):
+async def handle_orders_request(message: Message, state: FSMContext):
     # Здесь будет логика показа заказов
-    await message.answer("📦 Ваши текущие заказы:")
-
-@customer_router.message(F.text == "Написать в поддержку", RoleFilter("customer"))
-async def handle_support_request(message: Message):
-    # Здесь будет логика обращения в поддержку
-    await message.answer("🛟 Напишите ваш вопрос:")
\ No newline at end of file
+    await message.answer("📦 Ваши текущие заказы:")
\ No newline at end of file
@@ -1,27 +1,26 @@
-import traceback
-from pathlib import Path
+import logging
 from typing import List
 
 from aiogram import Router, F, Bot
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import CallbackQuery, Message, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
-from utils.filters import RoleFilter
 from service.MenuService import get_solver_main_menu_keyboard
+from service.RegistrationService import get_privacy_text
 from service.DataBaseService import update_user_role, save_executor_profile, \
     upload_file_to_storage
+from service.KeyBoardService import get_subjects_keyboard, get_sections_keyboard, SECTION_PREFIX_MAX
 from service.RegistrationExecutorService import ask_for_subjects, ask_for_description, contains_links, \
     ask_for_experience, ask_for_photo, ask_for_education, \
-    format_profile_text, ask_for_sections, update_subjects_keyboard, update_sections_keyboard, \
+    format_profile_text, get_profile_text, ask_for_sections, update_subjects_keyboard, update_sections_keyboard, \
     ask_for_task_type, update_task_type_keyboard
-
-# Загружаем текст соглашения
-BASE_DIR = Path(__file__).parent.parent
-PRIVACY_FILE = BASE_DIR / 'utils' / 'privacy_policy.txt'
-PRIVACY_TEXT = PRIVACY_FILE.read_text(encoding='utf-8')
+from utils.attachments import AVATAR_RULE, attachment_from_message
+from utils.callbacks import Flow, Pick, Role, Payload, RegisterCallback, ConsentCallback, SubjectCallback, \
+    SectionCallback, TaskTypeCallback, Catalog, CatalogPageCallback
 
 # Для исполнителей
 executor_router = Router()
+logger = logging.getLogger(__name__)
 
 
 class ExecutorStates(StatesGroup):
@@ -35,28 +34,30 @@ class ExecutorStates(StatesGroup):
     SELECTING_TASK_TYPE = State()
 
 
-@executor_router.callback_query(F.data == "register_as_executor")
+@executor_router.callback_query(Payload(RegisterCallback, role=Role.EXECUTOR))
 async def handle_executor_registration(callback: CallbackQuery, state: FSMContext):
     try:
         await state.set_data({"role": "executor"})
         await state.set_state(ExecutorStates.WAITING_CONSENT)
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Принимаю", callback_data="executor_accept")],
-            [InlineKeyboardButton(text="❌ Отклонить", callback_data="executor_reject")]
+            [InlineKeyboardButton(text="✅ Принимаю",
+                                  callback_data=ConsentCallback(role=Role.EXECUTOR, accepted=True).pack())],
+            [InlineKeyboardButton(text="❌ Отклонить",
+                                  callback_data=ConsentCallback(role=Role.EXECUTOR, accepted=False).pack())]
         ])
         await callback.message.edit_text(
-            f"Перед регистрацией необходимо принять соглашение:\n\n{PRIVACY_TEXT}",
+            f"Перед регистрацией необходимо принять соглашение:\n\n{get_privacy_text()}",
             reply_markup=keyboard
         )
         await callback.answer()
     except Exception as e:
-        print(f"Ошибка регистрации заказчика: {e}")
+        logger.error("Ошибка регистрации исполнителя: %s", e)
         await callback.answer("Произошла ошибка", show_alert=True)
 
 
-@executor_router.callback_query(F.data.in_(["executor_accept", "executor_reject"]))
-async def handle_privacy_response(callback: CallbackQuery, state: FSMContext):
-    if callback.data == "executor_reject":
+@executor_router.callback_query(Payload(ConsentCallback, role=Role.EXECUTOR))
+async def handle_privacy_response(callback: CallbackQuery, state: FSMContext, callback_data: ConsentCallback):
+    if not callback_data.accepted:
         await callback.message.answer("❌ Регистрация невозможна без принятия соглашения")
         await state.clear()
         return
@@ -66,14 +67,11 @@ async def handle_privacy_response(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@executor_router.callback_query(F.data.startswith("subj_"), ExecutorStates.SELECTING_SUBJECTS)
-async def handle_subject_selection(callback: CallbackQuery, state: FSMContext):
+@executor_router.callback_query(Payload(SubjectCallback, flow=Flow.REGISTRATION, pick=Pick.ITEM),
+                                ExecutorStates.SELECTING_SUBJECTS)
+async def handle_subject_selection(callback: CallbackQuery, state: FSMContext, callback_data: SubjectCallback):
     try:
-        action = callback.data.split("_")[1]
-        if action == "done":
-            await handle_subjects_done(callback, state)
-            return
-        subject_id = int(action)
+        subject_id = callback_data.subject_id
         data = await state.get_data()
         selected_ids = data.get("subjects", [])
         if subject_id in selected_ids:
@@ -81,14 +79,15 @@ async def handle_subject_selection(callback: CallbackQuery, state: FSMContext):
         else:
             selected_ids.append(subject_id)
         await state.update_data(subjects=selected_ids)
-        await update_subjects_keyboard(callback, selected_ids)
+        await update_subjects_keyboard(callback, selected_ids, page=data.get("catalog_page", 0))
         await callback.answer()
     except Exception as e:
-        print(f"Ошибка в handle_subject_selection: {e}")
+        logger.error("Ошибка в handle_subject_selection: %s", e)
         await callback.answer("Произошла ошибка", show_alert=True)
 
 
-@executor_router.callback_query(F.data == "subj_done", ExecutorStates.SELECTING_SUBJECTS)
+@executor_router.callback_query(Payload(SubjectCallback, flow=Flow.REGISTRATION, pick=Pick.DONE),
+                                ExecutorStates.SELECTING_SUBJECTS)
 async def handle_subjects_done(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     if not data.get("subjects"):
@@ -98,16 +97,17 @@ async def handle_subjects_done(callback: CallbackQuery, state: FSMContext):
         await callback.message.delete()
     except:
         pass
-    await state.update_data(current_subject_index=0)
+    await state.update_data(current_subject_index=0, catalog_page=0, section_prefix="")
     await state.set_state(ExecutorStates.SELECTING_SECTIONS)
     first_subject_id = data["subjects"][0]
     await ask_for_sections(callback.message, first_subject_id)
 
 
-@executor_router.callback_query(F.data.regexp(r"^sect_(?!done\b)\d+$"), ExecutorStates.SELECTING_SECTIONS)
-async def handle_section_selection(callback: CallbackQuery, state: FSMContext):
+@executor_router.callback_query(Payload(SectionCallback, flow=Flow.REGISTRATION, pick=Pick.ITEM),
+                                ExecutorStates.SELECTING_SECTIONS)
+async def handle_section_selection(callback: CallbackQuery, state: FSMContext, callback_data: SectionCallback):
     try:
-        section_id = int(callback.data.split("_")[1])
+        section_id = callback_data.section_id
         data = await state.get_data()
         current_subject_id = data["subjects"][data["current_subject_index"]]
 
@@ -122,17 +122,20 @@ async def handle_section_selection(callback: CallbackQuery, state: FSMContext):
             selected_ids.append(section_id)
 
         await state.update_data(subject_details=subject_details)
-        await update_sections_keyboard(callback, current_subject_id, selected_ids)
+        await update_sections_keyboard(callback, current_subject_id, selected_ids,
+                                       page=data.get("catalog_page", 0), prefix=data.get("section_prefix", ""))
         await callback.answer()
     except Exception as e:
-        print(f"Неожиданная ошибка в handle_section_selection: {e}\nTraceback: {traceback.format_exc()}")
+        logger.exception("Неожиданная ошибка в handle_section_selection: %s", e)
         await callback.answer("Произошла непредвиденная ошибка", show_alert=True)
 
 
-@executor_router.callback_query(F.data == "sect_done", ExecutorStates.SELECTING_SECTIONS)
+@executor_router.callback_query(Payload(SectionCallback, flow=Flow.REGISTRATION, pick=Pick.DONE),
+                                ExecutorStates.SELECTING_SECTIONS)
 async def handle_sections_done(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     next_index = data.get("current_subject_index", 0) + 1
+    await state.update_data(catalog_page=0, section_prefix="")
     if next_index < len(data.get("subjects", [])):
         await state.update_data(current_subject_index=next_index)
         next_subject_id = data["subjects"][next_index]
@@ -145,13 +148,46 @@ async def handle_sections_done(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@executor_router.callback_query(F.data.startswith("task_type_"), ExecutorStates.SELECTING_TASK_TYPE)
-async def handle_task_type_selection(callback: CallbackQuery, state: FSMContext):
-    action = callback.data.split("_")[2]
-    if action == "done":
-        await handle_task_type_done(callback, state)
-        return
-    task_type_id = int(action)
+@executor_router.callback_query(Payload(CatalogPageCallback, flow=Flow.REGISTRATION, catalog=Catalog.SUBJECT),
+                                ExecutorStates.SELECTING_SUBJECTS)
+async def handle_subjects_page(callback: CallbackQuery, state: FSMContext, callback_data: CatalogPageCallback):
+    await state.update_data(catalog_page=callback_data.page)
+    data = await state.get_data()
+    await callback.message.edit_reply_markup(
+        reply_markup=await get_subjects_keyboard(data.get("subjects", []), page=callback_data.page)
+    )
+    await callback.answer()
+
+
+@executor_router.callback_query(Payload(CatalogPageCallback, flow=Flow.REGISTRATION, catalog=Catalog.SECTION),
+                                ExecutorStates.SELECTING_SECTIONS)
+async def handle_sections_page(callback: CallbackQuery, state: FSMContext, callback_data: CatalogPageCallback):
+    data = await state.get_data()
+    prefix = "" if callback_data.reset else data.get("section_prefix", "")
+    await state.update_data(catalog_page=callback_data.page, section_prefix=prefix)
+    current_subject_id = data["subjects"][data["current_subject_index"]]
+    await callback.message.edit_reply_markup(reply_markup=await get_sections_keyboard(
+        current_subject_id, data.get("subject_details", {}).get(current_subject_id),
+        page=callback_data.page, prefix=prefix
+    ))
+    await callback.answer()
+
+
+@executor_router.message(F.text, ExecutorStates.SELECTING_SECTIONS)
+async def handle_sections_search(message: Message, state: FSMContext):
+    """Текст в выборе разделов - поиск по началу названия раздела."""
+    prefix = message.text.strip()[:SECTION_PREFIX_MAX]
+    await state.update_data(catalog_page=0, section_prefix=prefix)
+    data = await state.get_data()
+    current_subject_id = data["subjects"][data["current_subject_index"]]
+    await ask_for_sections(message, current_subject_id, data.get("subject_details", {}).get(current_subject_id),
+                           prefix=prefix)
+
+
+@executor_router.callback_query(Payload(TaskTypeCallback, flow=Flow.REGISTRATION, pick=Pick.ITEM),
+                                ExecutorStates.SELECTING_TASK_TYPE)
+async def handle_task_type_selection(callback: CallbackQuery, state: FSMContext, callback_data: TaskTypeCallback):
+    task_type_id = callback_data.task_type_id
     data = await state.get_data()
     selected_ids = data.get("task_types", [])
     if task_type_id in selected_ids:
@@ -163,7 +199,8 @@ async def handle_task_type_selection(callback: CallbackQuery, state: FSMContext)
     await callback.answer()
 
 
-@executor_router.callback_query(F.data == "task_type_done", ExecutorStates.SELECTING_TASK_TYPE)
+@executor_router.callback_query(Payload(TaskTypeCallback, flow=Flow.REGISTRATION, pick=Pick.DONE),
+                                ExecutorStates.SELECTING_TASK_TYPE)
 async def handle_task_type_done(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     if not data.get("task_types"):
@@ -218,15 +255,21 @@ async def handle_education_input(message: Message, state: FSMContext):
 
 @executor_router.message(F.photo, ExecutorStates.WAITING_EDUCATION)
 async def handle_photo_upload(message: Message, state: FSMContext, bot: Bot):
+    # Для аватара хватает уменьшенного варианта фото: оригинал не скачивается.
+    # Отклонённое фото не сбрасывает анкету - пользователь остаётся на шаге загрузки фото
+    attachment, error = attachment_from_message(message, AVATAR_RULE)
+    if error:
+        await message.answer(error)
+        return
     try:
-
-        file_id = message.photo[-1].file_id
+        file_id = attachment['file_id']
         user_id = message.from_user.id
 
         # Upload file and get public URL
         public_photo_url = await upload_file_to_storage(bot=bot, file_id=file_id, user_id=user_id, folder='executor_profile_avatars')
 
         if not public_photo_url:
+            # Анкета сохраняется в FSM, чтобы можно было сразу отправить фото снова
             await message.answer("❌ Не удалось загрузить фото. Попробуйте еще раз.")
             return
 
@@ -244,23 +287,19 @@ async def handle_photo_upload(message: Message, state: FSMContext, bot: Bot):
             caption=profile_caption,
             parse_mode="HTML"
         )
+        await state.clear()
         await message.answer("🎉 Регистрация успешно завершена!", reply_markup=get_solver_main_menu_keyboard())
     except Exception as e:
-        print(f"ОШИБКА в handle_photo_upload: {str(e)}", exc_info=True)
-        await message.answer("❌ Техническая ошибка при сохранении анкеты. Попробуйте позже.")
-    finally:
+        logger.exception("ОШИБКА в handle_photo_upload: %s", e)
         await state.clear()
+        await message.answer("❌ Техническая ошибка при сохранении анкеты. Попробуйте позже.")
 
-@executor_router.message(F.text == "Мой профиль", RoleFilter("executor"))
-async def handle_profile_request(message: Message):
-    await message.answer("📌 Ваш профиль:", reply_markup=get_solver_main_menu_keyboard())
+# Действия кнопок меню исполнителя (маршрутизируются через MenuHandler)
 
+async def handle_profile_request(message: Message, state: FSMContext):
+    profile_text = await get_profile_text(message.from_user.id)
+    await message.answer(profile_text or "❌ Анкета исполнителя не найдена.", reply_markup=get_solver_main_menu_keyboard())
 
-@executor_router.message(F.text == "Мои заказы", RoleFilter("executor"))
-async def handle_orders_request(message: Message):
-    await message.answer("📦 Ваши текущие заказы:", reply_markup=get_solver_main_menu_keyboard())
 
-
-@executor_router.message(F.text == "Написать в поддержку", RoleFilter("executor"))
-async def handle_support_request(message: Message):
-    await message.answer("🛟 Напишите ваш вопрос:", reply_markup=get_solver_main_menu_keyboard())
\ No newline at end of file
+async def handle_orders_request(message: Message, state: FSMContext):
+    await message.answer("📦 Ваши текущие заказы:", reply_markup=get_solver_main_menu_keyboard())
@@ -1,17 +1,21 @@
-from aiogram import Router, F
+import logging
+
+from aiogram import Router
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from service.RegistrationService import ask_for_role
+from utils.callbacks import Payload, RegisterCallback
 
 router = Router()
+logger = logging.getLogger(__name__)
 
-@router.callback_query(F.data == "register")
+@router.callback_query(Payload(RegisterCallback, role=None))
 async def register_handler(callback: CallbackQuery, state: FSMContext):
     """Обработчик кнопки регистрации"""
     try:
-        print(f"Начало регистрации для {callback.from_user.id}")
+        logger.info("Начало регистрации для %s", callback.from_user.id)
         await callback.answer()  # Важно: подтверждаем получение callback
         await ask_for_role(callback)
     except Exception as e:
-        print(f"Ошибка в register_handler: {e}")
+        logger.error("Ошибка в register_handler: %s", e)
         await callback.answer("Произошла ошибка, попробуйте позже")
\ No newline at end of file
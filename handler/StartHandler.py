@@ -3,6 +3,7 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from utils.callbacks import RegisterCallback
 
 router = Router()
 
@@ -13,7 +14,7 @@ async def start_handler(message: Message):
     builder.add(
         InlineKeyboardButton(
             text="Зарегистрироваться",
-            callback_data="register"
+            callback_data=RegisterCallback().pack()
         )
     )
     await message.answer(
@@ -0,0 +1,126 @@
+import logging
+
+from aiogram import Router, F, Bot
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.types import Message, CallbackQuery
+
+from service.DataBaseService import get_ticket_by_staff_message, assign_support_ticket, get_support_ticket, \
+    set_support_operator_online, get_support_operator_loads
+from service.SupportService import SUPPORT_PROMPT, get_support_desk, reply_to_ticket, close_ticket, \
+    format_backlog_page, get_ticket_keyboard, update_card_status
+from utils.callbacks import Payload, SupportCallback, SupportAction
+from utils.config import SUPPORT_CHAT_ID
+
+support_router = Router()
+logger = logging.getLogger(__name__)
+# Чат сотрудников: его участники - операторы поддержки
+staff_chat = F.chat.id == SUPPORT_CHAT_ID
+
+
+class SupportStates(StatesGroup):
+    WRITING = State()
+
+
+async def handle_support_request(message: Message, state: FSMContext):
+    """Кнопка «Написать в поддержку» заказчика и исполнителя: следующие сообщения уходят в обращение."""
+    await state.set_state(SupportStates.WRITING)
+    await message.answer(SUPPORT_PROMPT)
+
+
+async def end_support_state(bot: Bot, fsm_storage: BaseStorage, user_id: int):
+    """После закрытия обращения сообщения пользователя больше не уходят в поддержку."""
+    state = FSMContext(storage=fsm_storage, key=StorageKey(bot_id=bot.id, chat_id=user_id, user_id=user_id))
+    # Пользователь мог уже уйти в другой сценарий - его состояние не трогаем
+    if await state.get_state() == SupportStates.WRITING.state:
+        await state.set_state(None)
+
+
+@support_router.message(SupportStates.WRITING, F.chat.type == 'private')
+async def handle_support_message(message: Message):
+    text = message.text or message.caption
+    if not text:
+        await message.answer("⚠️ В поддержку пока принимаются только текстовые сообщения.")
+        return
+    ticket, created = await get_support_desk().submit(message.from_user.id, text)
+    if ticket is None:
+        await message.answer("❌ Не удалось отправить сообщение, попробуйте позже.")
+    elif created:
+        await message.answer(f"✅ Обращение #{ticket['ticket_id']} создано. Можно дописать подробности - "
+                             f"всё попадёт в это же обращение.")
+
+
+# --- Чат сотрудников ---
+
+@support_router.message(staff_chat, Command("online", "offline"))
+async def handle_operator_shift(message: Message, command: CommandObject):
+    online = command.command == "online"
+    if not await set_support_operator_online(message.from_user.id, online):
+        await message.reply("❌ Не удалось обновить статус, попробуйте позже.")
+        return
+    loads = await get_support_operator_loads()
+    await message.reply(("🟢 Вы на смене: новые обращения распределяются и на вас."
+                         if online else "⚪️ Вы вне смены: новые обращения на вас не назначаются.")
+                        + f"\nОператоров на смене: {len(loads)}.")
+
+
+@support_router.message(staff_chat, Command("tickets"))
+async def handle_backlog(message: Message):
+    text, keyboard = await format_backlog_page()
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+@support_router.message(staff_chat, Command("close"), F.reply_to_message)
+async def handle_close_command(message: Message, bot: Bot, fsm_storage: BaseStorage):
+    ticket = await get_ticket_by_staff_message(message.reply_to_message.message_id)
+    if not ticket:
+        await message.reply("⚠️ Ответьте командой на сообщение обращения.")
+        return
+    closed = await close_ticket(bot, ticket['ticket_id'])
+    if closed:
+        await end_support_state(bot, fsm_storage, closed['user_id'])
+    await message.reply(f"✅ Обращение #{ticket['ticket_id']} закрыто." if closed
+                        else f"Обращение #{ticket['ticket_id']} уже закрыто.")
+
+
+@support_router.message(staff_chat, F.text, F.reply_to_message.from_user.is_bot)
+async def handle_operator_reply(message: Message, bot: Bot):
+    """Ответ оператора на карточку обращения уходит пользователю."""
+    ticket = await get_ticket_by_staff_message(message.reply_to_message.message_id)
+    if not ticket:
+        return
+    error = await reply_to_ticket(bot, ticket, message.from_user.id, message.text)
+    if error:
+        await message.reply(f"⚠️ {error}")
+
+
+@support_router.callback_query(Payload(SupportCallback), F.message.chat.id == SUPPORT_CHAT_ID)
+async def handle_support_action(callback: CallbackQuery, callback_data: SupportCallback, bot: Bot,
+                                fsm_storage: BaseStorage):
+    action = callback_data.action
+    if action == SupportAction.PAGE:
+        text, keyboard = await format_backlog_page(callback_data.after)
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        await callback.answer()
+        return
+
+    if action == SupportAction.CLOSE:
+        ticket = await close_ticket(bot, callback_data.ticket_id)
+        if ticket:
+            await end_support_state(bot, fsm_storage, ticket['user_id'])
+        notice = "Обращение закрыто" if ticket else "Обращение уже закрыто"
+        ticket = ticket or await get_support_ticket(callback_data.ticket_id)
+    else:
+        ticket = await assign_support_ticket(callback_data.ticket_id, callback.from_user.id)
+        notice = "Обращение ваше" if ticket else "Обращение уже взято или закрыто"
+        ticket = ticket or await get_support_ticket(callback_data.ticket_id)
+
+    if action == SupportAction.TAKE_LISTED:
+        text, keyboard = await format_backlog_page(callback_data.after)
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    elif ticket:
+        await callback.message.edit_text(update_card_status(callback.message.html_text, ticket),
+                                         reply_markup=get_ticket_keyboard(ticket), parse_mode="HTML")
+    await callback.answer(notice)
@@ -0,0 +1,39 @@
+import logging
+
+from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import Message, CallbackQuery
+
+from service.TaskFeedService import format_feed_page, normalize_query
+from utils.callbacks import Payload, FeedCallback, FeedAction
+
+feed_router = Router()
+logger = logging.getLogger(__name__)
+
+
+class TaskFeedStates(StatesGroup):
+    BROWSING = State()
+
+
+async def handle_task_feed(message: Message, state: FSMContext):
+    """Лента открытых заказов по предметам и типам задач исполнителя; текст в ленте - поиск по описанию."""
+    await state.set_state(TaskFeedStates.BROWSING)
+    await state.set_data({})
+    text, keyboard = await format_feed_page(message.from_user.id)
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+@feed_router.message(F.text, TaskFeedStates.BROWSING)
+async def handle_feed_query(message: Message):
+    text, keyboard = await format_feed_page(message.from_user.id, normalize_query(message.text))
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+# Без фильтра по состоянию: курсор и запрос в кнопке, листать можно и после отклика на заказ из ленты
+@feed_router.callback_query(Payload(FeedCallback))
+async def handle_feed_page(callback: CallbackQuery, callback_data: FeedCallback):
+    before = callback_data.before if callback_data.action == FeedAction.NEXT else 0
+    text, keyboard = await format_feed_page(callback.from_user.id, callback_data.query, before)
+    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    await callback.answer()
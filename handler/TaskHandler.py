@@ -1,3 +1,5 @@
+import logging
+
 from aiogram import Router, F, Bot
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
@@ -7,9 +9,16 @@ from service.MenuService import get_customer_main_menu_keyboard
 from service.TaskService import ask_for_task_subject, ask_for_task_sections, ask_for_task_type, ask_for_solution_format, \
     ask_for_task_confirmation, ask_for_deadline
 from service.DataBaseService import save_task, update_task_attachments, upload_file_to_storage
+from service.OfferService import notify_executors_about_task
+from service.KeyBoardService import get_subjects_keyboard, get_sections_keyboard, SECTION_PREFIX_MAX
+from utils.attachments import TASK_ATTACHMENT_RULE, attachment_from_message, check_quota
+from utils.callbacks import Flow, Payload, SubjectCallback, SectionCallback, TaskTypeCallback, \
+    SolutionFormatCallback, TaskCallback, TaskAction, Catalog, CatalogPageCallback
 
 task_router = Router()
 
+logger = logging.getLogger(__name__)
+
 
 class TaskCreationStates(StatesGroup):
     SELECTING_SUBJECT = State()
@@ -21,7 +30,6 @@ class TaskCreationStates(StatesGroup):
     CONFIRMING_CREATION = State()
     ENTERING_DEADLINE = State()
 
-@task_router.message(F.text == "Создать задачу")
 async def handle_create_task(message: Message, state: FSMContext):
     """Starts the task creation flow."""
     await state.set_state(TaskCreationStates.SELECTING_SUBJECT)
@@ -29,27 +37,56 @@ async def handle_create_task(message: Message, state: FSMContext):
     await ask_for_task_subject(message)
 
 
-@task_router.callback_query(F.data.startswith("subj_"), TaskCreationStates.SELECTING_SUBJECT)
-async def handle_subject_selection_for_task(callback: CallbackQuery, state: FSMContext):
+@task_router.callback_query(Payload(SubjectCallback, flow=Flow.TASK), TaskCreationStates.SELECTING_SUBJECT)
+async def handle_subject_selection_for_task(callback: CallbackQuery, state: FSMContext, callback_data: SubjectCallback):
     """Handles subject selection and asks for section."""
-    subject_id = int(callback.data.split("_")[1])
-    await state.update_data(subject_id=subject_id)
+    subject_id = callback_data.subject_id
+    await state.update_data(subject_id=subject_id, section_prefix="")
     await state.set_state(TaskCreationStates.SELECTING_SECTION)
     await ask_for_task_sections(callback.message, subject_id)
     await callback.answer()
 
 
-@task_router.callback_query(F.data.startswith("sect_"), TaskCreationStates.SELECTING_SECTION)
-async def handle_section_selection_for_task(callback: CallbackQuery, state: FSMContext):
+@task_router.callback_query(Payload(SectionCallback, flow=Flow.TASK), TaskCreationStates.SELECTING_SECTION)
+async def handle_section_selection_for_task(callback: CallbackQuery, state: FSMContext, callback_data: SectionCallback):
     """Handles single section selection and moves to description."""
-    section_id = int(callback.data.split("_")[1])
-    await state.update_data(section_id=section_id)
+    await state.update_data(section_id=callback_data.section_id)
     await state.set_state(TaskCreationStates.ENTERING_DESCRIPTION)
     await callback.message.delete()
     await callback.message.answer("📝 Теперь введите подробное описание вашей задачи.")
     await callback.answer()
 
 
+@task_router.callback_query(Payload(CatalogPageCallback, flow=Flow.TASK, catalog=Catalog.SUBJECT),
+                            TaskCreationStates.SELECTING_SUBJECT)
+async def handle_subjects_page_for_task(callback: CallbackQuery, callback_data: CatalogPageCallback):
+    await callback.message.edit_reply_markup(
+        reply_markup=await get_subjects_keyboard(flow=Flow.TASK, page=callback_data.page)
+    )
+    await callback.answer()
+
+
+@task_router.callback_query(Payload(CatalogPageCallback, flow=Flow.TASK, catalog=Catalog.SECTION),
+                            TaskCreationStates.SELECTING_SECTION)
+async def handle_sections_page_for_task(callback: CallbackQuery, state: FSMContext,
+                                        callback_data: CatalogPageCallback):
+    data = await state.get_data()
+    prefix = "" if callback_data.reset else data.get("section_prefix", "")
+    await state.update_data(section_prefix=prefix)
+    await callback.message.edit_reply_markup(reply_markup=await get_sections_keyboard(
+        data["subject_id"], flow=Flow.TASK, page=callback_data.page, prefix=prefix
+    ))
+    await callback.answer()
+
+
+@task_router.message(F.text, TaskCreationStates.SELECTING_SECTION)
+async def handle_sections_search_for_task(message: Message, state: FSMContext):
+    """Searches sections by name prefix."""
+    prefix = message.text.strip()[:SECTION_PREFIX_MAX]
+    await state.update_data(section_prefix=prefix)
+    await ask_for_task_sections(message, (await state.get_data())["subject_id"], prefix=prefix, edit=False)
+
+
 @task_router.message(F.text, TaskCreationStates.ENTERING_DESCRIPTION)
 async def handle_description_for_task(message: Message, state: FSMContext):
     """Handles description input and asks for task type."""
@@ -58,22 +95,22 @@ async def handle_description_for_task(message: Message, state: FSMContext):
     await ask_for_task_type(message)
 
 
-@task_router.callback_query(F.data.startswith("task_type_"), TaskCreationStates.SELECTING_TASK_TYPE)
-async def handle_task_type_selection_for_task(callback: CallbackQuery, state: FSMContext):
+@task_router.callback_query(Payload(TaskTypeCallback, flow=Flow.TASK), TaskCreationStates.SELECTING_TASK_TYPE)
+async def handle_task_type_selection_for_task(callback: CallbackQuery, state: FSMContext,
+                                              callback_data: TaskTypeCallback):
     """Handles single task type selection and moves to solution format."""
-    task_type_id = int(callback.data.split("_")[2])
-    await state.update_data(task_type_id=task_type_id)
+    await state.update_data(task_type_id=callback_data.task_type_id)
     await state.set_state(TaskCreationStates.SELECTING_SOLUTION_FORMAT)
     await callback.message.delete()
     await ask_for_solution_format(callback.message)
     await callback.answer()
 
 
-@task_router.callback_query(F.data.startswith("sol_format_"), TaskCreationStates.SELECTING_SOLUTION_FORMAT)
-async def handle_solution_format_selection(callback: CallbackQuery, state: FSMContext):
+@task_router.callback_query(Payload(SolutionFormatCallback), TaskCreationStates.SELECTING_SOLUTION_FORMAT)
+async def handle_solution_format_selection(callback: CallbackQuery, state: FSMContext,
+                                           callback_data: SolutionFormatCallback):
     """Handles solution format selection and asks for files."""
-    solution_format = callback.data.split("sol_format_")[1]
-    await state.update_data(solution_format=solution_format)
+    await state.update_data(solution_format=callback_data.solution_format.value)
     await state.set_state(TaskCreationStates.ENTERING_DEADLINE)
     await callback.message.delete()
     await ask_for_deadline(callback.message)
@@ -84,7 +121,7 @@ async def handle_deadline_input(message: Message, state: FSMContext):
     await state.update_data(deadline=message.text)
     await state.set_state(TaskCreationStates.UPLOADING_FILES)
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="✅ Готово", callback_data="files_done"))
+    builder.add(InlineKeyboardButton(text="✅ Готово", callback_data=TaskCallback(action=TaskAction.FILES_DONE).pack()))
     await message.answer(
         "📎 Теперь прикрепите файлы с заданием (фото или документы). "
         "Отправьте все файлы, а затем нажмите 'Готово'.",
@@ -94,22 +131,27 @@ async def handle_deadline_input(message: Message, state: FSMContext):
 
 @task_router.message(F.content_type.in_({'photo', 'document'}), TaskCreationStates.UPLOADING_FILES)
 async def handle_file_upload(message: Message, state: FSMContext):
-    """Catches photos/documents and saves their file_id."""
-    file_id = message.photo[-1].file_id if message.photo else message.document.file_id
+    """Validates photos/documents by their metadata and saves them to FSM within the task quota."""
+    attachment, error = attachment_from_message(message, TASK_ATTACHMENT_RULE)
     data = await state.get_data()
-    file_ids = data.get("file_ids", [])
-    file_ids.append(file_id)
-    await state.update_data(file_ids=file_ids)
+    attachments = data.get("attachments", [])
+    if not error:
+        error = check_quota(attachments, attachment, TASK_ATTACHMENT_RULE)
+    if error:
+        await message.reply(error)
+        return
+    attachments.append(attachment)
+    await state.update_data(attachments=attachments)
 
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="✅ Готово", callback_data="files_done"))
+    builder.add(InlineKeyboardButton(text="✅ Готово", callback_data=TaskCallback(action=TaskAction.FILES_DONE).pack()))
     await message.reply(
         "✅ Файл добавлен. Можете добавить еще или нажать 'Готово'.",
         reply_markup=builder.as_markup()
     )
 
 
-@task_router.callback_query(F.data == "files_done", TaskCreationStates.UPLOADING_FILES)
+@task_router.callback_query(Payload(TaskCallback, action=TaskAction.FILES_DONE), TaskCreationStates.UPLOADING_FILES)
 async def handle_files_done(callback: CallbackQuery, state: FSMContext):
     """Moves to the confirmation step after files are selected."""
     await state.set_state(TaskCreationStates.CONFIRMING_CREATION)
@@ -118,7 +160,7 @@ async def handle_files_done(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@task_router.callback_query(F.data == "confirm_task_creation", TaskCreationStates.CONFIRMING_CREATION)
+@task_router.callback_query(Payload(TaskCallback, action=TaskAction.CONFIRM), TaskCreationStates.CONFIRMING_CREATION)
 async def handle_task_confirmation_positive(callback: CallbackQuery, state: FSMContext, bot: Bot):
     """Saves task, uploads files with the new task_id, and updates the task with file URLs."""
     try:
@@ -134,7 +176,7 @@ async def handle_task_confirmation_positive(callback: CallbackQuery, state: FSMC
         task_id = new_task['task_id']
 
         # 2. Upload files using the task_id for the path
-        file_ids = data.get("file_ids", [])
+        file_ids = [attachment['file_id'] for attachment in data.get("attachments", [])]
         if file_ids:
             await callback.message.edit_text(f"⏳ Загружаю файлы для задачи #{task_id}...")
             attachment_urls = []
@@ -155,15 +197,16 @@ async def handle_task_confirmation_positive(callback: CallbackQuery, state: FSMC
         await state.clear()
         await callback.message.edit_text(f"✅ Ваша задача #{task_id} успешно создана! Исполнители скоро откликнутся.")
         await callback.message.answer("Главное меню:", reply_markup=get_customer_main_menu_keyboard())
+        await notify_executors_about_task(bot, new_task)
 
     except Exception as e:
         await callback.message.edit_text("❌ Произошла ошибка при сохранении задачи. Попробуйте снова.")
-        print(f"Error on task confirmation: {e}")
+        logger.error("Error on task confirmation: %s", e)
     finally:
         await callback.answer()
 
 
-@task_router.callback_query(F.data == "cancel_task_creation", TaskCreationStates.CONFIRMING_CREATION)
+@task_router.callback_query(Payload(TaskCallback, action=TaskAction.CANCEL), TaskCreationStates.CONFIRMING_CREATION)
 async def handle_task_confirmation_negative(callback: CallbackQuery, state: FSMContext):
     """Cancels task creation."""
     await state.clear()
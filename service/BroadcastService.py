@@ -0,0 +1,208 @@
+"""
+Массовая рассылка объявлений пользователям ролей из таблицы users.
+
+Получатели читаются keyset-страницами по user_id (без OFFSET и без загрузки всех id в
+память) и раздаются пулу воркеров через ограниченную очередь. Все воркеры делят один
+ограничитель скорости под общий лимит Bot API; на flood control (RetryAfter) рассылка
+приостанавливается целиком. Прогресс - наибольший user_id, до которого включительно всё
+обработано, - сохраняется в файл состояния, поэтому перезапуск продолжает с места остановки.
+Заблокировавшие бота отмечаются в users.blocked_at и в следующие рассылки не попадают.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+from service.DataBaseService import repository
+from utils.state import load_state, save_state
+
+logger = logging.getLogger(__name__)
+
+ROLES = ('customer', 'executor')
+# Bot API пропускает около 30 сообщений в секунду разным пользователям; держимся чуть ниже
+BROADCAST_RATE = 25.0
+BROADCAST_WORKERS = 20
+BROADCAST_BATCH_SIZE = 1000
+# Сетевые ошибки и 5xx повторяются с растущей паузой, затем получатель считается неудачным
+SEND_ATTEMPTS = 3
+# RetryAfter не расходует попытки, но и не повторяется бесконечно: иначе один получатель держит воркер
+FLOOD_CONTROL_RETRIES = 10
+CHECKPOINT_INTERVAL = 2.0
+
+
+class RateLimiter:
+    """Равномерный темп rate вызовов в секунду на всех воркеров; pause() останавливает всех разом."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+class Watermark:
+    """
+    Наибольший id, до которого включительно все выданные получатели обработаны. id выдаются
+    по возрастанию, а завершаются в любом порядке, поэтому продвижение идёт по очереди выданных.
+    """
+
+    def __init__(self, value: int = 0):
+        self.value = value
+        self._issued: deque[int] = deque()
+        self._done: set[int] = set()
+
+    def issue(self, user_id: int):
+        self._issued.append(user_id)
+
+    def complete(self, user_id: int):
+        self._done.add(user_id)
+        while self._issued and self._issued[0] in self._done:
+            self.value = self._issued.popleft()
+            self._done.discard(self.value)
+
+
+@dataclass
+class BroadcastProgress:
+    total: int
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        rate = self.rate
+        return (self.total - self.processed) / rate if rate else None
+
+    def format(self) -> str:
+        eta = self.eta
+        eta_text = f"{int(eta // 60)} мин {int(eta % 60)} с" if eta is not None else "-"
+        return (f"{self.processed}/{self.total} · отправлено {self.sent}, заблокировали {self.blocked}, "
+                f"ошибок {self.failed} · {self.rate:.1f} сообщ./с · осталось ≈ {eta_text}")
+
+
+async def iter_recipients(roles: list[str], after: int, batch_size: int = BROADCAST_BATCH_SIZE):
+    """user_id получателей по возрастанию, keyset-страницами."""
+    while True:
+        user_ids = await repository.get_broadcast_recipients(roles, after, batch_size)
+        for user_id in user_ids:
+            yield user_id
+        if len(user_ids) < batch_size:
+            return
+        after = user_ids[-1]
+
+
+async def _send(bot: Bot, limiter: RateLimiter, user_id: int, text: str, parse_mode: str | None) -> str:
+    """Отправляет одно сообщение; 'sent', 'blocked' или 'failed'."""
+    attempt = 1
+    flood_retries = 0
+    while attempt <= SEND_ATTEMPTS:
+        await limiter.acquire()
+        try:
+            await bot.send_message(user_id, text, parse_mode=parse_mode)
+            return 'sent'
+        except TelegramRetryAfter as e:
+            # Flood control касается всего бота: паузу выдерживают все воркеры, попытка не расходуется
+            limiter.pause(e.retry_after)
+            flood_retries += 1
+            if flood_retries > FLOOD_CONTROL_RETRIES:
+                logger.warning("Broadcast to %s gave up after %s flood control pauses", user_id, flood_retries)
+                return 'failed'
+            continue
+        except TelegramForbiddenError:
+            return 'blocked'
+        except TelegramBadRequest as e:
+            logger.warning("Broadcast to %s rejected: %s", user_id, e)
+            return 'failed'
+        except Exception as e:
+            logger.warning("Broadcast to %s failed (attempt %s): %s", user_id, attempt, e)
+            await asyncio.sleep(attempt)
+        attempt += 1
+    return 'failed'
+
+
+async def run_broadcast(bot: Bot, name: str, roles: list[str], text: str, state_path: Path,
+                        parse_mode: str | None = None, rate: float = BROADCAST_RATE,
+                        workers: int = BROADCAST_WORKERS,
+                        report: Callable[[BroadcastProgress], None] | None = None) -> BroadcastProgress:
+    """
+    Рассылка name с продолжением по файлу состояния. report вызывается раз в CHECKPOINT_INTERVAL
+    вместе с сохранением прогресса и в конце. Прерывание (Ctrl+C) сохраняет прогресс.
+    """
+    state = load_state(state_path)
+    saved = state.get(name, {})
+    watermark = Watermark(saved.get('after', 0))
+    progress = BroadcastProgress(total=await repository.count_broadcast_recipients(roles, watermark.value))
+    limiter = RateLimiter(rate)
+    queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=workers * 2)
+    blocked: list[int] = []
+
+    async def checkpoint():
+        if blocked:
+            user_ids = blocked[:]
+            blocked.clear()
+            try:
+                await repository.mark_users_blocked(user_ids)
+            except Exception as e:
+                logger.error("Could not mark %s users as blocked: %s", len(user_ids), e)
+        state[name] = {
+            'after': watermark.value,
+            'sent': saved.get('sent', 0) + progress.sent,
+            'blocked': saved.get('blocked', 0) + progress.blocked,
+            'failed': saved.get('failed', 0) + progress.failed,
+        }
+        save_state(state_path, state)
+        if report:
+            report(progress)
+
+    async def worker():
+        while (user_id := await queue.get()) is not None:
+            result = await _send(bot, limiter, user_id, text, parse_mode)
+            setattr(progress, result, getattr(progress, result) + 1)
+            if result == 'blocked':
+                blocked.append(user_id)
+            watermark.complete(user_id)
+
+    async def checkpoints():
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            await checkpoint()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    checkpointer = asyncio.create_task(checkpoints())
+    try:
+        async for user_id in iter_recipients(roles, watermark.value):
+            watermark.issue(user_id)
+            await queue.put(user_id)
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        checkpointer.cancel()
+        for task in tasks:
+            task.cancel()
+        await checkpoint()
+    return progress
@@ -1,10 +1,45 @@
+import asyncio
+import logging
+import mimetypes
+import weakref
+from datetime import datetime, timezone
+
 from aiogram import Bot
-from aiogram.client.session import aiohttp
-from supabase import create_client, Client
-from utils.config import DATABASE_URL, API_DATABASE_KEY
+from database.repository import get_repository
+from database.write_behind import get_write_behind
+from storage.storage import get_storage, CHUNK_SIZE
+from utils.cache import TTLCache
+from utils.config import CATALOG_CACHE_TTL, ROLE_CACHE_TTL, OFFER_CACHE_TTL, TELEGRAM_FILE_CACHE_TTL
+from utils.http import get_http_session
+from utils.search_index import InvertedIndex
+
+logger = logging.getLogger(__name__)
 
-# Инициализация клиента Supabase
-supabase: Client = create_client(DATABASE_URL, API_DATABASE_KEY)
+# Репозиторий выбранного бэкенда (Supabase или локальный SQLite, см. DATABASE_BACKEND)
+repository = get_repository()
+# Пользователи, чья строка в users уже точно есть: их повторные upsert идут через write-behind
+_persisted_users = TTLCache(maxsize=100_000, name='persisted_users')
+# Справочники меняются редко, роль читается на каждое нажатие меню
+_catalog_cache = TTLCache(maxsize=10_000, ttl=CATALOG_CACHE_TTL, name='catalog')
+_role_cache = TTLCache(maxsize=100_000, ttl=ROLE_CACHE_TTL, name='role')
+_NOT_CACHED = object()
+# Поиск исполнителей: индекс строится при старте и обновляется из save_executor_profile
+executor_index = InvertedIndex(
+    fields={'executor_name': 2.0, 'description': 1.0, 'education': 1.0},
+    facets=('subject_ids', 'section_ids', 'task_type_ids'),
+)
+# Отклики: конкурирующие отклики и выбор исполнителя по одному заказу выстраиваются в очередь
+# на блокировке заказа внутри процесса; двойное назначение между процессами исключает условное
+# обновление в БД (status и version). Статус заказа и список откликов кэшируются коротко.
+_task_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+_task_cache = TTLCache(maxsize=10_000, ttl=OFFER_CACHE_TTL, name='task')
+_offer_cache = TTLCache(maxsize=10_000, ttl=OFFER_CACHE_TTL, name='offer')
+# Вложения: file_path из getFile действителен около часа, поэтому кэшируется чуть меньше;
+# ссылка на объект хранилища постоянна (для подписанных ссылок - половина их срока)
+_file_path_cache = TTLCache(maxsize=10_000, ttl=TELEGRAM_FILE_CACHE_TTL, name='telegram_file_path')
+_storage_url_cache = TTLCache(maxsize=100_000, name='storage_url')
+EXECUTOR_SEARCH_FIELDS = ('executor_id', 'user_id', 'executor_name', 'description', 'experience', 'education',
+                          'photo_url')
 
 # --- Функции для работы с пользователями ---
 # Важно: предполагается, что у вас есть таблица `users`
@@ -13,52 +48,161 @@ supabase: Client = create_client(DATABASE_URL, API_DATABASE_KEY)
 async def update_user_role(user_id: int, username: str, role: str):
     """Добавляет/обновляет роль пользователя."""
     try:
-        supabase.table('users').upsert({
-            'user_id': user_id,
-            'username': username,
-            'role': role
-        }).execute()
+        if user_id in _persisted_users:
+            row = {'user_id': user_id, 'username': username, 'role': role}
+            try:
+                await get_write_behind().upsert('users', user_id, row)
+            except asyncio.TimeoutError:
+                # Буфер не освободился (backpressure) - роль нельзя терять, пишем напрямую
+                logger.warning("Write-behind buffer is full, writing role of %s directly", user_id)
+                await repository.upsert_user(user_id, username, role)
+        else:
+            await repository.upsert_user(user_id, username, role)
+            _persisted_users.set(user_id, True)
+        _role_cache.set(user_id, role)
     except Exception as e:
-        print(f"Error updating user role for {user_id}: {e}")
+        logger.error("Error updating user role for %s: %s", user_id, e)
 
 async def get_user_role(user_id: int) -> str | None:
     """Получает роль пользователя из базы данных."""
     try:
-        response = supabase.table('users').select('role').eq('user_id', user_id).execute()
-        if response.data:
-            return response.data[0].get('role')
-        return None
+        pending = get_write_behind().pending('users', user_id)
+        if pending:
+            return pending['role']
+        cached = _role_cache.get(user_id, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
+        role = await repository.get_user_role(user_id)
+        if role:
+            _persisted_users.set(user_id, True)
+        _role_cache.set(user_id, role)
+        return role
     except Exception as e:
-        print(f"Error getting user role for {user_id}: {e}")
+        logger.error("Error getting user role for %s: %s", user_id, e)
         return None
+
+async def record_user_activity(user_id: int):
+    """Отмечает время последней активности пользователя (отложенная запись)."""
+    try:
+        now = datetime.now(timezone.utc).isoformat()
+        await get_write_behind().upsert('user_activity', user_id, {'user_id': user_id, 'last_seen': now})
+    except Exception as e:
+        logger.error("Error recording activity for %s: %s", user_id, e)
+
+
+async def record_user_event(user_id: int, event: str, payload: dict | None = None):
+    """Сохраняет аналитическое событие пользователя (отложенная запись)."""
+    try:
+        await get_write_behind().insert('user_event', {
+            'user_id': user_id,
+            'event': event,
+            'payload': payload,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        })
+    except Exception as e:
+        logger.error("Error recording event %s for %s: %s", event, user_id, e)
+
 # --- Функции для получения справочных данных ---
 
-async def get_all_subjects():
-    """Получает все предметы из БД."""
+def _with_active(rows: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Справочник кэшируется парой: все строки (для названий в старых анкетах и заказах) и активные (для выбора)."""
+    return rows, [row for row in rows if row.get('active', True)]
+
+
+async def get_all_subjects(include_inactive: bool = False):
+    """Получает предметы из БД; деактивированные импортом каталога - только с include_inactive."""
+    cached = _catalog_cache.get('subjects')
+    if cached is None:
+        try:
+            cached = _with_active(await repository.get_all_subjects())
+        except Exception as e:
+            logger.error("Error getting all subjects: %s", e)
+            return []
+        _catalog_cache.set('subjects', cached)
+    return cached[0] if include_inactive else cached[1]
+
+async def get_all_task_types(include_inactive: bool = False):
+    """Получает типы заказов из БД; деактивированные - только с include_inactive."""
+    cached = _catalog_cache.get('task_types')
+    if cached is None:
+        try:
+            cached = _with_active(await repository.get_all_task_types())
+        except Exception as e:
+            logger.error("Error getting all task types: %s", e)
+            return []
+        _catalog_cache.set('task_types', cached)
+    return cached[0] if include_inactive else cached[1]
+
+async def get_sections_for_subject(subject_id: int, include_inactive: bool = False):
+    """Получает разделы конкретного предмета; деактивированные - только с include_inactive."""
+    cached = _catalog_cache.get(('sections', subject_id))
+    if cached is None:
+        try:
+            cached = _with_active(await repository.get_sections_for_subject(subject_id))
+        except Exception as e:
+            logger.error("Error getting sections for subject %s: %s", subject_id, e)
+            return []
+        _catalog_cache.set(('sections', subject_id), cached)
+    return cached[0] if include_inactive else cached[1]
+
+
+async def get_catalog_version() -> int:
+    """Версия справочников (поднимается импортом каталога); сбрасывается из кэша вместе со справочниками."""
+    cached = _catalog_cache.get('version')
+    if cached is not None:
+        return cached
     try:
-        response = supabase.table('subject').select('subject_id, subject_name').execute()
-        return response.data if response.data else []
+        version = await repository.get_catalog_version()
     except Exception as e:
-        print(f"Error getting all subjects: {e}")
-        return []
+        logger.error("Error getting catalog version: %s", e)
+        return 0
+    _catalog_cache.set('version', version)
+    return version
+
 
-async def get_all_task_types():
-    """Получает все типы заказов из БД."""
+async def warm_catalog():
+    """Загружает в кэш все справочники: версию, предметы, типы задач и разделы каждого предмета."""
+    version, subjects, _ = await asyncio.gather(
+        get_catalog_version(), get_all_subjects(include_inactive=True), get_all_task_types())
+    await asyncio.gather(*(get_sections_for_subject(s['subject_id']) for s in subjects))
+    logger.info("Catalog cache warmed: version %s, %s subjects", version, len(subjects))
+
+
+async def warm_role_cache(limit: int):
+    """Загружает в кэш роли недавно активных пользователей."""
     try:
-        response = supabase.table('task_type').select('task_type_id, type_name').execute()
-        return response.data if response.data else []
+        rows = await repository.get_recent_user_roles(limit)
     except Exception as e:
-        print(f"Error getting all task types: {e}")
-        return []
+        logger.error("Error warming role cache: %s", e)
+        return
+    for row in rows:
+        _role_cache.set(row['user_id'], row['role'])
+        _persisted_users.set(row['user_id'], True)
+    logger.info("Role cache warmed: %s users", len(rows))
 
-async def get_sections_for_subject(subject_id: int):
-    """Получает все разделы для конкретного предмета."""
+
+async def warm_executor_index():
+    """Загружает всех исполнителей в поисковый индекс."""
     try:
-        response = supabase.table('section').select('section_id, section_name').eq('subject_id', subject_id).execute()
-        return response.data if response.data else []
+        rows = await repository.get_executors_for_search()
     except Exception as e:
-        print(f"Error getting sections for subject {subject_id}: {e}")
-        return []
+        logger.error("Error loading executors for search: %s", e)
+        return
+    for row in rows:
+        executor_index.upsert(row['executor_id'], row)
+    logger.info("Executor index built: %s executors", len(rows))
+
+
+def search_executors(query: str = "", subject_id: int | None = None, section_id: int | None = None,
+                     task_type_id: int | None = None, offset: int = 0, limit: int = 5) -> tuple[int, list[dict]]:
+    """Ищет исполнителей в индексе: по релевантности запросу, затем по опыту. Возвращает (всего, страница)."""
+    return executor_index.search(
+        query,
+        filters={'subject_ids': subject_id, 'section_ids': section_id, 'task_type_ids': task_type_id},
+        offset=offset,
+        limit=limit,
+        tiebreak=lambda executor: -(executor.get('experience') or 0),
+    )
 
 
 async def save_executor_profile(user_id: int, data: dict):
@@ -70,27 +214,35 @@ async def save_executor_profile(user_id: int, data: dict):
             'description': data.get('description'),
             'experience': data.get('experience'),
             'education': data.get('education'),
-            'photo_url': data.get('photo_id'),
+            'photo_url': data.get('photo_url'),
             'personal_data_access': True
         }
-        profile_response = supabase.table('executor').upsert(profile_data, on_conflict='user_id').execute()
-        if not profile_response.data:
+        executor = await repository.upsert_executor(profile_data)
+        if not executor:
             raise Exception("Failed to create or update executor profile.")
-        executor_id = profile_response.data[0]['executor_id']
+        executor_id = executor['executor_id']
 
         subject_ids = data.get('subjects', [])
         if subject_ids:
-            subject_rows = [{'executor_id': executor_id, 'subject_id': sub_id} for sub_id in subject_ids]
-            supabase.table('executor_subject').delete().eq('executor_id', executor_id).execute()
-            supabase.table('executor_subject').insert(subject_rows).execute()
+            await repository.replace_executor_subjects(executor_id, subject_ids)
+
+        section_ids = [s_id for s_ids in data.get('subject_details', {}).values() for s_id in s_ids]
+        await repository.replace_executor_sections(executor_id, section_ids)
 
         task_type_ids = data.get('task_types', [])
         if task_type_ids:
-            task_type_rows = [{'executor_id': executor_id, 'task_type_id': tt_id} for tt_id in task_type_ids]
-            supabase.table('executor_task_type').delete().eq('executor_id', executor_id).execute()
-            supabase.table('executor_task_type').insert(task_type_rows).execute()
+            await repository.replace_executor_task_types(executor_id, task_type_ids)
+
+        executor_index.upsert(executor_id, {
+            **{field: executor.get(field) for field in EXECUTOR_SEARCH_FIELDS},
+            'subject_ids': subject_ids,
+            'section_ids': section_ids,
+            'task_type_ids': task_type_ids,
+            # Сводка рейтинга не меняется при редактировании анкеты
+            'stats': (executor_index.get(executor_id) or {}).get('stats'),
+        })
     except Exception as e:
-        print(f"Error saving full executor profile for {user_id}: {e}")
+        logger.error("Error saving full executor profile for %s: %s", user_id, e)
 
 async def save_customer_profile(user_id: int, data: dict):
     """Сохраняет профиль заказчика в базу данных."""
@@ -100,54 +252,64 @@ async def save_customer_profile(user_id: int, data: dict):
             'customer_name': data.get('name'),
             'personal_data_access': True
         }
-        supabase.table('customer').upsert(profile_data, on_conflict='user_id').execute()
+        await repository.upsert_customer(profile_data)
     except Exception as e:
-        print(f"Error saving customer profile for {user_id}: {e}")
+        logger.error("Error saving customer profile for %s: %s", user_id, e)
+
+
+async def _storage_url(storage, path: str) -> str:
+    url = await storage.url(path)
+    _storage_url_cache.set(path, url, ttl=storage.url_ttl / 2 if storage.url_ttl else None)
+    return url
 
 
 async def upload_file_to_storage(bot: Bot, file_id: str, user_id: int, folder: str) -> str | None:
     """
-    Downloads a file from Telegram and uploads it to a specified folder in Supabase Storage.
+    Downloads a file from Telegram and streams it into the configured attachment storage.
     """
+    upload_path = None
     try:
-        file_info = await bot.get_file(file_id)
-        file_path = file_info.file_path
+        file_path = _file_path_cache.get(file_id)
+        if file_path is None:
+            file_info = await bot.get_file(file_id)
+            file_path = file_info.file_path
+            _file_path_cache.set(file_id, file_path)
 
         # Generate a unique file name to avoid collisions
         file_extension = file_path.split('.')[-1]
         unique_filename = f"{file_id}.{file_extension}"
 
         upload_path = f"{folder}/{unique_filename}"
+        # A cached URL means the object was already stored under this path
+        cached_url = _storage_url_cache.get(upload_path)
+        if cached_url is not None:
+            return cached_url
+        storage = get_storage()
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.telegram.org/file/bot{bot.token}/{file_path}") as response:
-                if response.status != 200:
-                    print(f"Error downloading file from Telegram: {response.status}")
-                    return None
-                file_content = await response.read()
-
-        bucket_name = "storage"
-
-        # Use upsert to avoid errors on re-uploading the same file
-        supabase.storage.from_(bucket_name).upload(
-            path=upload_path,
-            file=file_content,
-            file_options={
-                "content-type": "image/jpeg" if file_extension in ['jpg', 'jpeg'] else "application/octet-stream"}
-        )
+        # The same file_id always maps to the same path, so an existing object can be reused
+        if await storage.exists(upload_path):
+            logger.info("File %s already exists. Returning existing URL.", upload_path)
+            return await _storage_url(storage, upload_path)
+
+        content_type = mimetypes.guess_type(unique_filename)[0] or "application/octet-stream"
+        async with get_http_session().get(bot.session.api.file_url(bot.token, file_path)) as response:
+            if response.status != 200:
+                logger.error("Error downloading file from Telegram: %s", response.status)
+                return None
+            await storage.put(
+                upload_path,
+                response.content.iter_chunked(CHUNK_SIZE),
+                content_type=content_type,
+                size=response.content_length,
+            )
 
-        public_url = supabase.storage.from_(bucket_name).get_public_url(upload_path)
+        public_url = await _storage_url(storage, upload_path)
 
-        print(f"Successfully uploaded file to {upload_path}. URL: {public_url}")
+        logger.info("Successfully uploaded file to %s. URL: %s", upload_path, public_url)
         return public_url
 
     except Exception as e:
-        # Check if the error is a duplicate file error, which we can ignore
-        if "Duplicate" in str(e):
-            print(f"File {upload_path} already exists. Returning existing URL.")
-            # Construct the public URL manually if upload is skipped
-            return supabase.storage.from_("storage").get_public_url(upload_path)
-        print(f"Error in upload_file_to_storage for user {user_id}: {e}")
+        logger.error("Error in upload_file_to_storage for user %s (%s): %s", user_id, upload_path, e)
         return None
 
 
@@ -156,21 +318,20 @@ async def update_task_attachments(task_id: int, urls: list):
     Обновляет заказ, добавляя список ссылок на вложения.
     """
     try:
-        response = supabase.table('task').update({'attachments_urls': urls}).eq('task_id', task_id).execute()
-        print(f"Successfully updated attachments for task {task_id}")
-        if not response.data:
-             print(f"Warning: Update attachments for task {task_id} returned no data.")
+        updated = await repository.update_task_attachments(task_id, urls)
+        logger.info("Successfully updated attachments for task %s", task_id)
+        if not updated:
+             logger.warning("Update attachments for task %s returned no data.", task_id)
     except Exception as e:
-        print(f"Error updating task attachments for task {task_id}: {e}")
+        logger.error("Error updating task attachments for task %s: %s", task_id, e)
 
 
 async def get_customer_id(user_id: int) -> int | None:
     """Получает ID профиля заказчика по ID пользователя Telegram."""
     try:
-        response = supabase.table('customer').select('customer_id').eq('user_id', user_id).execute()
-        return response.data[0].get('customer_id') if response.data else None
+        return await repository.get_customer_id(user_id)
     except Exception as e:
-        print(f"Error getting customer_id for user {user_id}: {e}")
+        logger.error("Error getting customer_id for user %s: %s", user_id, e)
         return None
 
 async def save_task(user_id: int, data: dict):
@@ -189,11 +350,351 @@ async def save_task(user_id: int, data: dict):
             'attachments_urls': data.get('attachment_urls'),
             'deadline': data.get('deadline')
         }
-        response = supabase.table('task').insert(task_data).execute()
-        if not response.data:
+        task = await repository.insert_task(task_data)
+        if not task:
             raise Exception("Failed to create task.")
-        print(f"Successfully saved task for customer {customer_id}")
-        return response.data[0]
+        logger.info("Successfully saved task for customer %s", customer_id)
+        return task
+    except Exception as e:
+        logger.error("Error saving task for user %s: %s", user_id, e)
+        return None
+
+
+# --- Оценки и сводка исполнителя ---
+
+async def rate_task(user_id: int, task_id: int, score: int) -> dict | None:
+    """Завершает назначенный заказ пользователя с оценкой исполнителю. None - заказ не назначен, чужой или ошибка."""
+    try:
+        rating = await repository.complete_task(task_id, user_id, score)
+        _task_cache.pop(task_id)
+        if rating:
+            schedule_executor_refresh(rating['executor_id'])
+        return rating
+    except Exception as e:
+        logger.error("Error rating task %s by user %s: %s", task_id, user_id, e)
+        return None
+
+
+def get_indexed_executor(executor_id: int) -> dict | None:
+    """Исполнитель из поискового индекса: профиль, предметы и сводка stats - без запроса к БД."""
+    return executor_index.get(executor_id)
+
+
+async def get_executor_profile(user_id: int) -> dict | None:
+    """Профиль исполнителя пользователя в формате поискового индекса; None - профиля нет."""
+    try:
+        executor_id = await repository.get_executor_id(user_id)
+        if executor_id is None:
+            return None
+        return executor_index.get(executor_id) or await repository.get_executor_for_search(executor_id)
+    except Exception as e:
+        logger.error("Error loading executor profile for user %s: %s", user_id, e)
+        return None
+
+
+# --- Лента заказов для исполнителей ---
+
+async def get_task_feed(user_id: int, query: str = "", before: int | None = None, limit: int = 5) -> list[dict]:
+    """
+    Открытые заказы по предметам и типам задач исполнителя, новые первыми, с полнотекстовым
+    поиском по описанию. before - курсор: task_id последнего заказа предыдущей страницы.
+    """
+    try:
+        executor_id = await repository.get_executor_id(user_id)
+        if executor_id is None:
+            return []
+        # Предметы и типы задач исполнителя берутся из поискового индекса, без запроса к БД
+        executor = executor_index.get(executor_id) or await repository.get_executor_for_search(executor_id)
+        if executor is None:
+            return []
+        return await repository.search_open_tasks(
+            query, executor.get('subject_ids') or [], executor.get('task_type_ids') or [], before, limit
+        )
+    except Exception as e:
+        logger.error("Error loading task feed for user %s: %s", user_id, e)
+        return []
+
+
+# --- Отклики на заказы ---
+
+def _task_lock(task_id: int) -> asyncio.Lock:
+    # Блокировка живёт, пока её кто-то держит или ждёт
+    lock = _task_locks.get(task_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _task_locks[task_id] = lock
+    return lock
+
+
+async def get_executor_id(user_id: int) -> int | None:
+    """Получает ID профиля исполнителя по ID пользователя Telegram."""
+    try:
+        return await repository.get_executor_id(user_id)
+    except Exception as e:
+        logger.error("Error getting executor_id for user %s: %s", user_id, e)
+        return None
+
+
+async def get_task(task_id: int) -> dict | None:
+    """Заказ с customer_user_id; статус может отставать от БД на OFFER_CACHE_TTL."""
+    cached = _task_cache.get(task_id)
+    if cached is not None:
+        return cached
+    try:
+        task = await repository.get_task(task_id)
+        if task:
+            _task_cache.set(task_id, task)
+        return task
+    except Exception as e:
+        logger.error("Error getting task %s: %s", task_id, e)
+        return None
+
+
+async def submit_offer(user_id: int, task_id: int, price: int, eta_hours: int) -> dict | None:
+    """
+    Сохраняет отклик исполнителя (повторный отклик меняет цену и срок).
+    None - заказ уже не принимает отклики, у пользователя нет профиля исполнителя или ошибка.
+    """
+    try:
+        task = await get_task(task_id)
+        # Отклики на уже назначенный заказ отсекаются по кэшу, не доходя до БД
+        if not task or task['status'] != 'open':
+            return None
+        executor_id = await get_executor_id(user_id)
+        if not executor_id:
+            return None
+        async with _task_lock(task_id):
+            offer = await repository.upsert_offer({
+                'task_id': task_id,
+                'executor_id': executor_id,
+                'price': price,
+                'eta_hours': eta_hours,
+            })
+        _offer_cache.pop(task_id)
+        if offer is None:
+            _task_cache.pop(task_id)
+        else:
+            # Время отклика попало в сводку исполнителя
+            schedule_executor_refresh(executor_id)
+        return offer
+    except Exception as e:
+        logger.error("Error submitting offer for task %s by user %s: %s", task_id, user_id, e)
+        return None
+
+
+async def get_task_offers(task_id: int) -> list[dict]:
+    """Отклики на заказ (кэшируются до нового отклика или выбора исполнителя)."""
+    cached = _offer_cache.get(task_id)
+    if cached is not None:
+        return cached
+    try:
+        offers = await repository.get_offers_for_task(task_id)
+        _offer_cache.set(task_id, offers)
+        return offers
+    except Exception as e:
+        logger.error("Error getting offers for task %s: %s", task_id, e)
+        return []
+
+
+async def accept_offer(user_id: int, task_id: int, offer_id: int) -> dict | None:
+    """
+    Назначает заказ исполнителю выбранного отклика. Возвращает принятый отклик или None,
+    если заказ не принадлежит пользователю, уже назначен или отклик не найден.
+    """
+    try:
+        async with _task_lock(task_id):
+            # Версия заказа читается из БД, а не из кэша: по ней делается условное обновление
+            task = await repository.get_task(task_id)
+            if not task or task['customer_user_id'] != user_id or task['status'] != 'open':
+                return None
+            assigned = await repository.assign_task(task_id, offer_id, task['version'])
+            _offer_cache.pop(task_id)
+            if not assigned:
+                _task_cache.pop(task_id)
+                return None
+            _task_cache.set(task_id, dict(task, **assigned))
+        offers = await get_task_offers(task_id)
+        return next((offer for offer in offers if offer['offer_id'] == offer_id), None)
+    except Exception as e:
+        logger.error("Error accepting offer %s for task %s: %s", offer_id, task_id, e)
+        return None
+
+
+# --- Поддержка ---
+
+async def open_support_ticket(user_id: int) -> tuple[dict | None, bool]:
+    """Незакрытое обращение пользователя или новое; второй элемент - создано ли оно сейчас."""
+    try:
+        return await repository.open_support_ticket(user_id)
+    except Exception as e:
+        logger.error("Error opening support ticket for %s: %s", user_id, e)
+        return None, False
+
+
+async def add_support_message(ticket_id: int, direction: str, text: str) -> dict | None:
+    try:
+        return await repository.add_support_message(ticket_id, direction, text)
+    except Exception as e:
+        logger.error("Error saving support message for ticket %s: %s", ticket_id, e)
+        return None
+
+
+async def get_support_ticket(ticket_id: int) -> dict | None:
+    try:
+        return await repository.get_support_ticket(ticket_id)
+    except Exception as e:
+        logger.error("Error loading support ticket %s: %s", ticket_id, e)
+        return None
+
+
+async def get_ticket_by_staff_message(staff_message_id: int) -> dict | None:
+    try:
+        return await repository.get_ticket_by_staff_message(staff_message_id)
+    except Exception as e:
+        logger.error("Error finding support ticket by staff message %s: %s", staff_message_id, e)
+        return None
+
+
+async def get_undelivered_support_messages() -> list[dict]:
+    try:
+        return await repository.get_undelivered_support_messages()
+    except Exception as e:
+        logger.error("Error loading undelivered support messages: %s", e)
+        return []
+
+
+async def mark_support_messages_delivered(message_ids: list[int], staff_message_id: int) -> bool:
+    try:
+        await repository.mark_support_messages_delivered(message_ids, staff_message_id)
+        return True
+    except Exception as e:
+        logger.error("Error marking support messages %s delivered: %s", message_ids, e)
+        return False
+
+
+async def assign_support_ticket(ticket_id: int, operator_id: int, only_unassigned: bool = True) -> dict | None:
+    try:
+        return await repository.assign_support_ticket(ticket_id, operator_id, only_unassigned)
+    except Exception as e:
+        logger.error("Error assigning support ticket %s to %s: %s", ticket_id, operator_id, e)
+        return None
+
+
+async def close_support_ticket(ticket_id: int) -> dict | None:
+    try:
+        return await repository.close_support_ticket(ticket_id)
     except Exception as e:
-        print(f"Error saving task for user {user_id}: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error closing support ticket %s: %s", ticket_id, e)
+        return None
+
+
+async def get_support_backlog(after: int = 0, limit: int = 10) -> list[dict]:
+    try:
+        return await repository.get_support_backlog(after, limit)
+    except Exception as e:
+        logger.error("Error loading support backlog: %s", e)
+        return []
+
+
+async def set_support_operator_online(operator_id: int, online: bool) -> bool:
+    try:
+        await repository.set_support_operator_online(operator_id, online)
+        return True
+    except Exception as e:
+        logger.error("Error setting support operator %s online=%s: %s", operator_id, online, e)
+        return False
+
+
+async def get_support_operator_loads() -> dict[int, int]:
+    try:
+        return await repository.get_support_operator_loads()
+    except Exception as e:
+        logger.error("Error loading support operator loads: %s", e)
+        return {}
+
+
+# --- Сброс кэшей по изменениям в БД (database/invalidation.py) ---
+
+# Сохранение профиля меняет десятки строк executor_*: события по одному исполнителю
+# собираются за эту паузу и перечитываются одним запросом
+_EXECUTOR_REFRESH_DELAY = 0.05
+_executors_to_refresh: set[int] = set()
+# Фоновые задачи инвалидации: цикл событий держит на задачу только слабую ссылку
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _run_in_background(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_task_done)
+
+
+def _background_task_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error("Background cache task failed: %s", task.exception())
+
+
+async def _refresh_executor(executor_id: int):
+    await asyncio.sleep(_EXECUTOR_REFRESH_DELAY)
+    _executors_to_refresh.discard(executor_id)
+    try:
+        executor = await repository.get_executor_for_search(executor_id)
+    except Exception as e:
+        logger.error("Error refreshing executor %s in search index: %s", executor_id, e)
+        return
+    if executor:
+        executor_index.upsert(executor_id, executor)
+    else:
+        executor_index.remove(executor_id)
+
+
+def schedule_executor_refresh(executor_id: int):
+    """Перечитывает исполнителя в поисковый индекс (вместе с сводкой); частые вызовы схлопываются."""
+    if executor_id in _executors_to_refresh:
+        return
+    _executors_to_refresh.add(executor_id)
+    _run_in_background(_refresh_executor(executor_id))
+
+
+def _on_executor_change(op: str, row: dict):
+    if row.get('executor_id') is not None:
+        schedule_executor_refresh(row['executor_id'])
+
+
+def _on_user_change(op: str, row: dict):
+    _role_cache.pop(row.get('user_id'))
+    if op == 'DELETE':
+        _persisted_users.pop(row.get('user_id'))
+
+
+def _on_section_change(op: str, row: dict):
+    # Без subject_id (удаление в Supabase Realtime приходит только с ключом) неизвестно, какой список устарел
+    if row.get('subject_id') is None:
+        _catalog_cache.clear()
+    else:
+        _catalog_cache.pop(('sections', row['subject_id']))
+
+
+def _reset_caches():
+    _catalog_cache.clear()
+    _role_cache.clear()
+    _task_cache.clear()
+    _offer_cache.clear()
+    _run_in_background(warm_executor_index())
+    logger.warning("Caches reset after invalidation events may have been lost")
+
+
+def register_cache_invalidation(bus):
+    """Подписывает кэши модуля на изменения таблиц: запись вытесняется, как только строку поменял любой воркер."""
+    bus.subscribe('users', _on_user_change)
+    bus.subscribe('subject', lambda op, row: _catalog_cache.pop('subjects'))
+    bus.subscribe('section', _on_section_change)
+    bus.subscribe('task_type', lambda op, row: _catalog_cache.pop('task_types'))
+    # Импорт каталога меняет много строк сразу и поднимает версию последней: справочники перечитываются целиком
+    bus.subscribe('catalog_version', lambda op, row: _catalog_cache.clear())
+    for table in ('executor', 'executor_subject', 'executor_section', 'executor_task_type', 'executor_stats'):
+        bus.subscribe(table, _on_executor_change)
+    bus.subscribe('task', lambda op, row: _task_cache.pop(row.get('task_id')))
+    bus.subscribe('offer', lambda op, row: _offer_cache.pop(row.get('task_id')))
+    bus.on_reset(_reset_caches)
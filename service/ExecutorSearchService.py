@@ -0,0 +1,84 @@
+import html
+import math
+
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from service.DataBaseService import get_all_subjects, search_executors
+from service.KeyBoardService import get_subjects_keyboard, get_sections_keyboard, get_task_type_keyboard
+from service.RegistrationExecutorService import get_years_form, format_rating
+from utils.callbacks import Flow, SearchCallback, SearchAction
+
+PAGE_SIZE = 5
+# Сколько символов описания показывать в выдаче
+DESCRIPTION_PREVIEW = 200
+
+
+async def get_search_subjects_keyboard(page: int = 0) -> InlineKeyboardMarkup:
+    """Клавиатура выбора предмета для поиска исполнителя."""
+    return await get_subjects_keyboard(flow=Flow.SEARCH, page=page)
+
+
+async def get_search_sections_keyboard(subject_id: int, page: int = 0, prefix: str = "") -> InlineKeyboardMarkup:
+    """Клавиатура выбора раздела предмета для поиска исполнителя."""
+    return await get_sections_keyboard(subject_id, flow=Flow.SEARCH, page=page, prefix=prefix)
+
+
+async def get_search_task_types_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура выбора типа задачи для поиска исполнителя."""
+    return await get_task_type_keyboard(flow=Flow.SEARCH)
+
+
+def get_search_query_keyboard() -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="Пропустить", callback_data=SearchCallback(action=SearchAction.SKIP))
+    return builder.as_markup()
+
+
+def _format_executor(executor: dict, subjects_map: dict) -> str:
+    experience = executor.get('experience') or 0
+    subjects = ", ".join(subjects_map.get(s_id, f"ID {s_id}") for s_id in executor.get('subject_ids', []))
+    description = executor.get('description') or ""
+    if len(description) > DESCRIPTION_PREVIEW:
+        description = description[:DESCRIPTION_PREVIEW].rstrip() + "…"
+    rating = format_rating(executor.get('stats'))
+    lines = [
+        f"👤 <b>{html.escape(executor.get('executor_name') or 'Без имени')}</b>"
+        f"{f' · {rating}' if rating else ''}"
+        f" · опыт {experience} {get_years_form(experience)}",
+    ]
+    if subjects:
+        lines.append(f"📚 {html.escape(subjects)}")
+    if description:
+        lines.append(f"📝 {html.escape(description)}")
+    if executor.get('education'):
+        lines.append(f"🎓 {html.escape(executor['education'])}")
+    return "\n".join(lines)
+
+
+async def format_search_page(filters: dict, page: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Текст и клавиатура страницы результатов поиска исполнителей (страницы с нуля)."""
+    total, executors = search_executors(
+        query=filters.get('query') or "",
+        subject_id=filters.get('subject_id'),
+        section_id=filters.get('section_id'),
+        task_type_id=filters.get('task_type_id'),
+        offset=page * PAGE_SIZE,
+        limit=PAGE_SIZE,
+    )
+    if not total:
+        return "😔 Исполнители по вашему запросу не найдены.", None
+
+    subjects_map = {s['subject_id']: s['subject_name'] for s in await get_all_subjects(include_inactive=True)}
+    pages = math.ceil(total / PAGE_SIZE)
+    text = "\n\n".join(
+        [f"🔎 Найдено исполнителей: {total} (стр. {page + 1}/{pages})"]
+        + [_format_executor(executor, subjects_map) for executor in executors]
+    )
+
+    builder = InlineKeyboardBuilder()
+    if page > 0:
+        builder.button(text="◀️ Назад", callback_data=SearchCallback(action=SearchAction.PAGE, page=page - 1))
+    if page + 1 < pages:
+        builder.button(text="Вперёд ▶️", callback_data=SearchCallback(action=SearchAction.PAGE, page=page + 1))
+    return text, builder.as_markup() if page > 0 or page + 1 < pages else None
@@ -0,0 +1,172 @@
+"""
+Потоковая выгрузка заказов, заказчиков и исполнителей для аналитики (CSV или Parquet).
+
+Строки читаются keyset-страницами по первичному ключу и сразу пишутся в файл, поэтому
+память не зависит от размера таблиц. id справочников заменяются названиями из кэша
+справочников DataBaseService. В инкрементальном режиме выгружаются только строки с id
+больше последнего выгруженного (хранится в файле состояния).
+"""
+import asyncio
+import csv
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+from service.DataBaseService import repository, get_all_subjects, get_all_task_types, get_sections_for_subject
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 500
+FORMATS = ('csv', 'parquet')
+
+
+class Dataset:
+    """Описание выгрузки: таблица, ключ пагинации, читаемые колонки и поля файла (имя -> int|str)."""
+
+    def __init__(self, table: str, key: str, columns: tuple[str, ...], fields: dict[str, str],
+                 transform: Callable[[list[dict], dict], Awaitable[list[dict]]]):
+        self.table = table
+        self.key = key
+        self.columns = columns
+        self.fields = fields
+        self.transform = transform
+
+
+async def load_catalog_names() -> dict:
+    """Названия предметов, разделов и типов задач по id (через кэш справочников)."""
+    subjects, task_types = await asyncio.gather(get_all_subjects(include_inactive=True),
+                                             get_all_task_types(include_inactive=True))
+    sections = await asyncio.gather(*(get_sections_for_subject(s['subject_id'], include_inactive=True)
+                                      for s in subjects))
+    return {
+        'subject': {s['subject_id']: s['subject_name'] for s in subjects},
+        'task_type': {t['task_type_id']: t['type_name'] for t in task_types},
+        'section': {s['section_id']: s['section_name'] for rows in sections for s in rows},
+    }
+
+
+def _names(ids, names: dict) -> str:
+    return "; ".join(names.get(item_id, f"ID {item_id}") for item_id in ids)
+
+
+async def _transform_tasks(rows: list[dict], catalog: dict) -> list[dict]:
+    return [{
+        'task_id': row['task_id'],
+        'created_at': row.get('created_at'),
+        'customer_id': row.get('customer_id'),
+        'executor_id': row.get('executor_id'),
+        'status': row.get('status'),
+        'subject': catalog['subject'].get(row.get('subject_id')),
+        'section': catalog['section'].get(row.get('section_id')),
+        'task_type': catalog['task_type'].get(row.get('task_type_id')),
+        'deadline': row.get('deadline'),
+        'attachments_count': len(row.get('attachments_urls') or []),
+    } for row in rows]
+
+
+async def _transform_customers(rows: list[dict], catalog: dict) -> list[dict]:
+    return rows
+
+
+async def _transform_executors(rows: list[dict], catalog: dict) -> list[dict]:
+    # Связи с предметами, разделами и типами задач - одним запросом на страницу исполнителей
+    links = await repository.get_executor_links([row['executor_id'] for row in rows])
+    return [{
+        **row,
+        'subjects': _names(links[row['executor_id']]['subject_ids'], catalog['subject']),
+        'sections': _names(links[row['executor_id']]['section_ids'], catalog['section']),
+        'task_types': _names(links[row['executor_id']]['task_type_ids'], catalog['task_type']),
+    } for row in rows]
+
+
+DATASETS = {
+    'tasks': Dataset(
+        table='task', key='task_id',
+        columns=('task_id', 'created_at', 'customer_id', 'executor_id', 'status', 'subject_id', 'section_id',
+                 'task_type_id', 'deadline', 'attachments_urls'),
+        fields={'task_id': 'int', 'created_at': 'str', 'customer_id': 'int', 'executor_id': 'int', 'status': 'str',
+                'subject': 'str', 'section': 'str', 'task_type': 'str', 'deadline': 'str',
+                'attachments_count': 'int'},
+        transform=_transform_tasks,
+    ),
+    'customers': Dataset(
+        table='customer', key='customer_id',
+        columns=('customer_id', 'user_id', 'customer_name', 'created_at'),
+        fields={'customer_id': 'int', 'user_id': 'int', 'customer_name': 'str', 'created_at': 'str'},
+        transform=_transform_customers,
+    ),
+    'executors': Dataset(
+        table='executor', key='executor_id',
+        columns=('executor_id', 'user_id', 'executor_name', 'experience', 'education', 'created_at'),
+        fields={'executor_id': 'int', 'user_id': 'int', 'executor_name': 'str', 'experience': 'int',
+                'education': 'str', 'created_at': 'str', 'subjects': 'str', 'sections': 'str', 'task_types': 'str'},
+        transform=_transform_executors,
+    ),
+}
+
+
+async def iter_batches(dataset: Dataset, after: int = 0, batch_size: int = EXPORT_BATCH_SIZE,
+                       catalog: dict | None = None) -> AsyncIterator[list[dict]]:
+    """Страницы строк выгрузки с ключом больше after (keyset-пагинация, без OFFSET)."""
+    catalog = catalog if catalog is not None else await load_catalog_names()
+    while True:
+        rows = await repository.get_rows_after(dataset.table, dataset.key, after, batch_size, dataset.columns)
+        if not rows:
+            return
+        after = rows[-1][dataset.key]
+        yield await dataset.transform(rows, catalog)
+        if len(rows) < batch_size:
+            return
+
+
+class CsvWriter:
+    def __init__(self, path: Path, fields: dict[str, str]):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=list(fields), extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, rows: list[dict]):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Каждая страница - отдельная row group; нужен пакет pyarrow."""
+
+    def __init__(self, path: Path, fields: dict[str, str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Для выгрузки в Parquet установите пакет pyarrow (pip install pyarrow).")
+        self._pa = pa
+        types = {'int': pa.int64(), 'str': pa.string()}
+        self._schema = pa.schema([(name, types[kind]) for name, kind in fields.items()])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows: list[dict]):
+        columns = {name: [row.get(name) for row in rows] for name in self._schema.names}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+async def export_dataset(name: str, path: Path, file_format: str = 'csv', after: int = 0,
+                         batch_size: int = EXPORT_BATCH_SIZE, catalog: dict | None = None) -> tuple[int, int]:
+    """Пишет выгрузку name в файл path. Возвращает (число строк, последний выгруженный id)."""
+    dataset = DATASETS[name]
+    writer = (ParquetWriter if file_format == 'parquet' else CsvWriter)(path, dataset.fields)
+    count, last_id = 0, after
+    try:
+        async for rows in iter_batches(dataset, after, batch_size, catalog):
+            writer.write(rows)
+            count += len(rows)
+            last_id = rows[-1][dataset.key]
+    finally:
+        writer.close()
+    logger.info("Exported %s rows of %s to %s (last id %s)", count, name, path, last_id)
+    return count, last_id
@@ -1,71 +1,161 @@
-from typing import List
+import math
+from typing import Callable, List
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from service.DataBaseService import get_all_subjects, get_sections_for_subject, get_all_task_types
-
-
-async def get_subjects_keyboard(selected_ids: List[int] = None, is_for_task: bool = False) -> InlineKeyboardMarkup:
+from service.DataBaseService import get_all_subjects, get_sections_for_subject, get_all_task_types, \
+    get_catalog_version
+from utils.callbacks import Flow, Pick, Catalog, CatalogPageCallback, SubjectCallback, SectionCallback, \
+    TaskTypeCallback, SolutionFormat, SolutionFormatCallback, TaskCallback, TaskAction
+from utils.cache import TTLCache
+from utils.config import CATALOG_CACHE_TTL
+from utils.trie import PrefixTrie
+
+# Справочники показываются страницами: размер клавиатуры и каждой её правки не зависит от размера каталога
+CATALOG_PAGE_SIZE = 16
+CATALOG_COLUMNS = 2
+# Ограничение длины запроса поиска по разделам
+SECTION_PREFIX_MAX = 32
+SECTION_SEARCH_HINT = "🔎 Чтобы найти раздел, введите начало его названия."
+
+# subject_id -> (список разделов из кэша справочников, дерево по их названиям)
+_section_tries: dict[int, tuple[list, PrefixTrie]] = {}
+# Страницы справочников без отметок выбора одинаковы для всех пользователей и переиспользуются;
+# ключ начинается с версии каталога, поэтому после импорта каталога они отрисовываются заново,
+# а правки отдельных строк справочников сбрасывают кэш через шину инвалидации
+_keyboard_cache = TTLCache(maxsize=1_000, ttl=CATALOG_CACHE_TTL, name='catalog_keyboard')
+
+
+def register_keyboard_invalidation(bus):
+    """Сбрасывает отрисованные клавиатуры при любом изменении справочников (не только через импорт каталога)."""
+    for table in ('subject', 'section', 'task_type', 'catalog_version'):
+        bus.subscribe(table, lambda op, row: _keyboard_cache.clear())
+    bus.on_reset(_keyboard_cache.clear)
+
+
+def _add_catalog_page(builder: InlineKeyboardBuilder, items: list, page: int, flow: Flow, catalog: Catalog,
+                      make_button: Callable[[dict], InlineKeyboardButton]):
+    """Добавляет в клавиатуру одну страницу справочника в несколько колонок и кнопки листания."""
+    pages = max(1, math.ceil(len(items) / CATALOG_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    buttons = [make_button(item) for item in items[page * CATALOG_PAGE_SIZE:(page + 1) * CATALOG_PAGE_SIZE]]
+    for i in range(0, len(buttons), CATALOG_COLUMNS):
+        builder.row(*buttons[i:i + CATALOG_COLUMNS])
+
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(
+            text=f"◀️ {page}/{pages}",
+            callback_data=CatalogPageCallback(flow=flow, catalog=catalog, page=page - 1).pack()
+        ))
+    if page + 1 < pages:
+        navigation.append(InlineKeyboardButton(
+            text=f"{page + 2}/{pages} ▶️",
+            callback_data=CatalogPageCallback(flow=flow, catalog=catalog, page=page + 1).pack()
+        ))
+    if navigation:
+        builder.row(*navigation)
+
+
+def _get_section_trie(subject_id: int, sections: list) -> PrefixTrie:
+    # Дерево перестраивается, только когда кэш справочников отдал новый список разделов
+    cached = _section_tries.get(subject_id)
+    if cached is None or cached[0] is not sections:
+        cached = (sections, PrefixTrie.build((s['section_name'], s['section_id']) for s in sections))
+        _section_tries[subject_id] = cached
+    return cached[1]
+
+
+def _remember_keyboard(key: tuple | None, markup: InlineKeyboardMarkup) -> InlineKeyboardMarkup:
+    if key is not None:
+        _keyboard_cache.set(key, markup)
+    return markup
+
+
+async def get_subjects_keyboard(selected_ids: List[int] = None, flow: Flow = Flow.REGISTRATION,
+                                page: int = 0) -> InlineKeyboardMarkup:
     """
-    Генерирует клавиатуру с предметами из БД.
+    Генерирует клавиатуру с предметами из БД (страница page). В регистрации выбор множественный
+    (кнопка «Готово»), в поиске можно не выбирать предмет.
     """
-    if selected_ids is None:
-        selected_ids = []
+    selected = set(selected_ids or ())
+    key = None if selected else (await get_catalog_version(), 'subjects', flow, page)
+    cached = _keyboard_cache.get(key) if key else None
+    if cached is not None:
+        return cached
 
     builder = InlineKeyboardBuilder()
     subjects = await get_all_subjects()
 
-    for subject in subjects:
-        subject_id = subject['subject_id']
-        subject_name = subject['subject_name']
-        builder.button(
-            text=f"{'✅ ' if subject_id in selected_ids else ''}{subject_name}",
-            callback_data=f"subj_{subject_id}"
-        )
+    _add_catalog_page(builder, subjects, page, flow, Catalog.SUBJECT, lambda subject: InlineKeyboardButton(
+        text=f"{'✅ ' if subject['subject_id'] in selected else ''}{subject['subject_name']}",
+        callback_data=SubjectCallback(flow=flow, subject_id=subject['subject_id']).pack()
+    ))
 
-    if not is_for_task:
-        builder.button(text="Готово", callback_data="subj_done")
+    if flow == Flow.REGISTRATION:
+        builder.row(InlineKeyboardButton(
+            text="Готово", callback_data=SubjectCallback(flow=flow, pick=Pick.DONE).pack()
+        ))
+    elif flow == Flow.SEARCH:
+        builder.row(InlineKeyboardButton(
+            text="Любой предмет", callback_data=SubjectCallback(flow=flow, pick=Pick.ANY).pack()
+        ))
 
-    builder.adjust(1)
-    return builder.as_markup()
+    return _remember_keyboard(key, builder.as_markup())
 
 
 async def get_sections_keyboard(subject_id: int, selected_ids: List[int] = None,
-                                is_for_task: bool = False) -> InlineKeyboardMarkup:
+                                flow: Flow = Flow.REGISTRATION, page: int = 0,
+                                prefix: str = "") -> InlineKeyboardMarkup:
     """
-    Генерирует клавиатуру с разделами предмета из БД.
+    Генерирует клавиатуру с разделами предмета из БД (страница page). С prefix показываются
+    только разделы, в названии которых есть слово с таким началом.
     """
-    if selected_ids is None:
-        selected_ids = []
+    selected = set(selected_ids or ())
+    key = None if selected or prefix else (await get_catalog_version(), 'sections', subject_id, flow, page)
+    cached = _keyboard_cache.get(key) if key else None
+    if cached is not None:
+        return cached
 
     builder = InlineKeyboardBuilder()
     sections = await get_sections_for_subject(subject_id)
-
-    for section in sections:
-        section_id = section['section_id']
-        section_name = section['section_name']
-        builder.button(
-            text=f"{'✅ ' if section_id in selected_ids else ''}{section_name}",
-            callback_data=f"sect_{section_id}"
-        )
-
-    if not is_for_task:
-        builder.button(
-            text="✅ Завершить выбор",
-            callback_data="sect_done"
-        )
-
-    builder.adjust(1)
-    return builder.as_markup()
-
-
-async def get_task_type_keyboard(selected_ids: List[int] = None, is_for_task: bool = False) -> InlineKeyboardMarkup:
+    if prefix:
+        found = _get_section_trie(subject_id, sections).find(prefix)
+        sections = [section for section in sections if section['section_id'] in found]
+
+    _add_catalog_page(builder, sections, page, flow, Catalog.SECTION, lambda section: InlineKeyboardButton(
+        text=f"{'✅ ' if section['section_id'] in selected else ''}{section['section_name']}",
+        callback_data=SectionCallback(flow=flow, section_id=section['section_id']).pack()
+    ))
+
+    if prefix:
+        builder.row(InlineKeyboardButton(
+            text=f"✖️ Сбросить поиск «{prefix}»",
+            callback_data=CatalogPageCallback(flow=flow, catalog=Catalog.SECTION, reset=True).pack()
+        ))
+    if flow == Flow.REGISTRATION:
+        builder.row(InlineKeyboardButton(
+            text="✅ Завершить выбор", callback_data=SectionCallback(flow=flow, pick=Pick.DONE).pack()
+        ))
+    elif flow == Flow.SEARCH:
+        builder.row(InlineKeyboardButton(
+            text="Любой раздел", callback_data=SectionCallback(flow=flow, pick=Pick.ANY).pack()
+        ))
+
+    return _remember_keyboard(key, builder.as_markup())
+
+
+async def get_task_type_keyboard(selected_ids: List[int] = None, flow: Flow = Flow.REGISTRATION) -> InlineKeyboardMarkup:
     """
     Генерирует клавиатуру с типами задач из БД.
     """
     if selected_ids is None:
         selected_ids = []
+    key = None if selected_ids else (await get_catalog_version(), 'task_types', flow)
+    cached = _keyboard_cache.get(key) if key else None
+    if cached is not None:
+        return cached
 
     builder = InlineKeyboardBuilder()
     task_types = await get_all_task_types()
@@ -75,14 +165,16 @@ async def get_task_type_keyboard(selected_ids: List[int] = None, is_for_task: bo
         task_type_name = task_type['type_name']
         builder.button(
             text=f"{'✅ ' if task_type_id in selected_ids else ''}{task_type_name}",
-            callback_data=f"task_type_{task_type_id}"
+            callback_data=TaskTypeCallback(flow=flow, task_type_id=task_type_id)
         )
 
-    if not is_for_task:
-        builder.button(text="Готово", callback_data="task_type_done")
+    if flow == Flow.REGISTRATION:
+        builder.button(text="Готово", callback_data=TaskTypeCallback(flow=flow, pick=Pick.DONE))
+    elif flow == Flow.SEARCH:
+        builder.button(text="Любой тип", callback_data=TaskTypeCallback(flow=flow, pick=Pick.ANY))
 
     builder.adjust(1)
-    return builder.as_markup()
+    return _remember_keyboard(key, builder.as_markup())
 
 
 def get_solution_format_keyboard() -> InlineKeyboardMarkup:
@@ -91,12 +183,12 @@ def get_solution_format_keyboard() -> InlineKeyboardMarkup:
     """
     builder = InlineKeyboardBuilder()
     formats = {
-        "answer_only": "Только ответ",
-        "full_solution": "Решение с пояснением",
-        "fix_mistakes": "Исправить ошибки"
+        SolutionFormat.ANSWER_ONLY: "Только ответ",
+        SolutionFormat.FULL_SOLUTION: "Решение с пояснением",
+        SolutionFormat.FIX_MISTAKES: "Исправить ошибки"
     }
-    for callback_data, text in formats.items():
-        builder.button(text=text, callback_data=f"sol_format_{callback_data}")
+    for solution_format, text in formats.items():
+        builder.button(text=text, callback_data=SolutionFormatCallback(solution_format=solution_format))
     builder.adjust(1)
     return builder.as_markup()
 
@@ -106,7 +198,7 @@ def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     Генерирует клавиатуру для подтверждения или отмены (синхронная).
     """
     builder = InlineKeyboardBuilder()
-    builder.button(text="✅ Подтвердить и создать", callback_data="confirm_task_creation")
-    builder.button(text="❌ Отменить", callback_data="cancel_task_creation")
+    builder.button(text="✅ Подтвердить и создать", callback_data=TaskCallback(action=TaskAction.CONFIRM))
+    builder.button(text="❌ Отменить", callback_data=TaskCallback(action=TaskAction.CANCEL))
     builder.adjust(1)
     return builder.as_markup()
\ No newline at end of file
@@ -1,26 +1,44 @@
 from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
 
+# Кнопки главного меню по ролям: (идентификатор действия, текст кнопки), по одной в ряд.
+# Единственный источник текстов: по ним строятся и клавиатуры, и таблица маршрутов в MenuHandler.
+MAIN_MENUS = {
+    'customer': (
+        ('create_task', "Создать заказ"),
+        ('find_executor', "Найти исполнителя"),
+        ('profile', "Мой профиль"),
+        ('orders', "Мои заказы"),
+        ('support', "Написать в поддержку"),
+    ),
+    'executor': (
+        ('task_feed', "Лента заказов"),
+        ('profile', "Мой профиль"),
+        ('orders', "Мои заказы"),
+        ('support', "Написать в поддержку"),
+    ),
+}
+# Все тексты кнопок меню - для дешёвой проверки, прежде чем выяснять роль
+MENU_TEXTS = frozenset(text for buttons in MAIN_MENUS.values() for _, text in buttons)
+
+_keyboards: dict[str, ReplyKeyboardMarkup] = {}
+
+
+def get_main_menu_keyboard(role: str) -> ReplyKeyboardMarkup:
+    """Клавиатура главного меню роли; собирается один раз и переиспользуется."""
+    if role not in _keyboards:
+        _keyboards[role] = ReplyKeyboardMarkup(
+            keyboard=[[KeyboardButton(text=text)] for _, text in MAIN_MENUS[role]],
+            resize_keyboard=True,
+            one_time_keyboard=False
+        )
+    return _keyboards[role]
+
+
 def get_customer_main_menu_keyboard():
     """Возвращает клавиатуру основного меню заказчика."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="Создать заказ")],
-            [KeyboardButton(text="Мой профиль")],
-            [KeyboardButton(text="Мои заказы")],
-            [KeyboardButton(text="Написать в поддержку")],
-        ],
-        resize_keyboard=True,
-        one_time_keyboard=False
-    )
+    return get_main_menu_keyboard('customer')
+
 
 def get_solver_main_menu_keyboard():
     """Возвращает клавиатуру основного меню исполнителя."""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="Мой профиль")],
-            [KeyboardButton(text="Мои заказы")],
-            [KeyboardButton(text="Написать в поддержку")]
-        ],
-        resize_keyboard=True,
-        one_time_keyboard=False
-    )
+    return get_main_menu_keyboard('executor')
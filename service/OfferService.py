@@ -0,0 +1,132 @@
+import html
+import logging
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from service.DataBaseService import get_all_subjects, get_task_offers, search_executors, get_indexed_executor
+from service.RegistrationExecutorService import get_years_form, format_rating
+from utils.callbacks import OfferCallback, OfferAction, RatingCallback
+from utils.config import OFFER_NOTIFY_LIMIT
+
+logger = logging.getLogger(__name__)
+# Сколько символов описания заказа показывать исполнителям
+DESCRIPTION_PREVIEW = 300
+# Сколько откликов показывать заказчику (сообщение и клавиатура не растут с популярностью заказа)
+OFFERS_SHOWN = 20
+
+
+def get_bid_keyboard(task_id: int) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="💬 Откликнуться", callback_data=OfferCallback(action=OfferAction.BID, task_id=task_id))
+    return builder.as_markup()
+
+
+def get_offers_link_keyboard(task_id: int) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="📋 Посмотреть отклики", callback_data=OfferCallback(action=OfferAction.LIST, task_id=task_id))
+    return builder.as_markup()
+
+
+def get_rating_keyboard(task_id: int) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    for score in range(1, 6):
+        builder.button(text=f"{score}⭐", callback_data=RatingCallback(task_id=task_id, score=score))
+    builder.adjust(5)
+    return builder.as_markup()
+
+
+async def notify_executors_about_task(bot: Bot, task: dict):
+    """Рассылает новый заказ подходящим по предмету и типу задачи исполнителям (не больше OFFER_NOTIFY_LIMIT)."""
+    _, executors = search_executors(
+        subject_id=task.get('subject_id'),
+        task_type_id=task.get('task_type_id'),
+        limit=OFFER_NOTIFY_LIMIT,
+    )
+    if not executors:
+        return
+    subjects_map = {s['subject_id']: s['subject_name'] for s in await get_all_subjects(include_inactive=True)}
+    description = task.get('description') or ""
+    if len(description) > DESCRIPTION_PREVIEW:
+        description = description[:DESCRIPTION_PREVIEW].rstrip() + "…"
+    text = "\n".join([
+        f"🆕 <b>Новый заказ #{task['task_id']}</b>",
+        f"📚 {html.escape(subjects_map.get(task.get('subject_id'), 'Предмет не указан'))}",
+        f"⏰ {html.escape(task.get('deadline') or 'Срок не указан')}",
+        f"<blockquote>{html.escape(description)}</blockquote>",
+    ])
+    keyboard = get_bid_keyboard(task['task_id'])
+    sent = 0
+    for executor in executors:
+        try:
+            await bot.send_message(executor['user_id'], text, reply_markup=keyboard, parse_mode="HTML")
+            sent += 1
+        except Exception as e:
+            logger.warning("Could not notify executor %s about task %s: %s", executor['user_id'], task['task_id'], e)
+    logger.info("Task %s sent to %s executors", task['task_id'], sent)
+
+
+async def notify_customer_about_offer(bot: Bot, task: dict, offer: dict):
+    """Сообщает заказчику о новом отклике."""
+    try:
+        await bot.send_message(
+            task['customer_user_id'],
+            f"📨 Новый отклик на заказ #{task['task_id']}: {offer['price']} ₽, {offer['eta_hours']} ч.",
+            reply_markup=get_offers_link_keyboard(task['task_id'])
+        )
+    except Exception as e:
+        logger.warning("Could not notify customer about offer on task %s: %s", task['task_id'], e)
+
+
+async def notify_executor_assigned(bot: Bot, task_id: int, offer: dict):
+    """Сообщает исполнителю, что его отклик выбран."""
+    try:
+        await bot.send_message(
+            offer['executor_user_id'],
+            f"🎉 Заказчик выбрал ваш отклик на заказ #{task_id}. Можно приступать к работе!"
+        )
+    except Exception as e:
+        logger.warning("Could not notify executor about assignment of task %s: %s", task_id, e)
+
+
+async def notify_executor_rated(bot: Bot, rating: dict):
+    """Сообщает исполнителю об оценке завершённого заказа."""
+    executor = get_indexed_executor(rating['executor_id'])
+    if not executor:
+        return
+    try:
+        await bot.send_message(
+            executor['user_id'],
+            f"🏁 Заказ #{rating['task_id']} завершён, заказчик поставил оценку {rating['score']}⭐"
+        )
+    except Exception as e:
+        logger.warning("Could not notify executor about rating of task %s: %s", rating['task_id'], e)
+
+
+async def format_offers(task_id: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Текст и клавиатура выбора среди откликов на заказ."""
+    offers = [offer for offer in await get_task_offers(task_id) if offer['status'] == 'pending']
+    if not offers:
+        return f"📭 На заказ #{task_id} пока нет откликов.", None
+
+    lines = [f"📋 Отклики на заказ #{task_id}:"]
+    builder = InlineKeyboardBuilder()
+    for number, offer in enumerate(offers[:OFFERS_SHOWN], start=1):
+        experience = offer.get('experience') or 0
+        # Рейтинг - из сводки в поисковом индексе, без запроса к БД на каждый отклик
+        rating = format_rating((get_indexed_executor(offer['executor_id']) or {}).get('stats'))
+        lines.append(
+            f"{number}. {html.escape(offer.get('executor_name') or 'Без имени')}"
+            f"{f' · {rating}' if rating else ''}"
+            f" · опыт {experience} {get_years_form(experience)}"
+            f" — {offer['price']} ₽, {offer['eta_hours']} ч."
+        )
+        builder.button(
+            text=f"✅ Выбрать №{number}",
+            callback_data=OfferCallback(action=OfferAction.ACCEPT, task_id=task_id, offer_id=offer['offer_id'])
+        )
+    if len(offers) > OFFERS_SHOWN:
+        lines.append(f"…и ещё {len(offers) - OFFERS_SHOWN}")
+    builder.adjust(2)
+    return "\n".join(lines), builder.as_markup()
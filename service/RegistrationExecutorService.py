@@ -1,51 +1,60 @@
+import logging
 from typing import Dict, Union, List
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 
-from service.KeyBoardService import get_subjects_keyboard, get_sections_keyboard, get_task_type_keyboard
+from service.KeyBoardService import get_subjects_keyboard, get_sections_keyboard, get_task_type_keyboard, \
+    SECTION_SEARCH_HINT
 from service.RegistrationService import contains_links
-from service.DataBaseService import get_all_subjects, get_sections_for_subject, get_all_task_types
+from service.DataBaseService import get_all_subjects, get_sections_for_subject, get_all_task_types, \
+    get_executor_profile
+
+logger = logging.getLogger(__name__)
 # --- Функции для FSM регистрации исполнителя ---
 
+SUBJECTS_TEXT = "📚 Выберите предмет(ы), по которым решаете задачи:"
+SECTIONS_TEXT = f"📖 Выберите разделы для предмета:\n{SECTION_SEARCH_HINT}"
+
+
 async def ask_for_subjects(target: Union[Message, CallbackQuery], state: FSMContext):
     """Запрашивает у пользователя предметы, которые он хочет выбрать."""
     message = target.message if isinstance(target, CallbackQuery) else target
-    current_selected = (await state.get_data()).get("subjects", [])
-    keyboard = await get_subjects_keyboard(current_selected)
+    data = await state.get_data()
+    keyboard = await get_subjects_keyboard(data.get("subjects", []), page=data.get("catalog_page", 0))
 
-    text = "📚 Выберите предмет(ы), по которым решаете задачи:"
     try:
         if isinstance(target, CallbackQuery):
-            await message.edit_text(text, reply_markup=keyboard)
+            await message.edit_text(SUBJECTS_TEXT, reply_markup=keyboard)
         else:
-            await message.answer(text, reply_markup=keyboard)
+            await message.answer(SUBJECTS_TEXT, reply_markup=keyboard)
     except Exception as e:
-        print(f"Ошибка в ask_for_subjects: {e}")
-        await message.answer(text, reply_markup=keyboard)
+        logger.error("Ошибка в ask_for_subjects: %s", e)
+        await message.answer(SUBJECTS_TEXT, reply_markup=keyboard)
 
 
-async def ask_for_sections(message: Message, subject_id: int):
+async def ask_for_sections(message: Message, subject_id: int, selected_ids: List[int] = None, prefix: str = ""):
     """Запрашивает разделы для выбранного предмета."""
     # В идеале, здесь можно было бы из БД получить и имя предмета
     await message.answer(
-        f"📖 Выберите разделы для предмета:",
-        reply_markup=await get_sections_keyboard(subject_id)
+        SECTIONS_TEXT,
+        reply_markup=await get_sections_keyboard(subject_id, selected_ids, prefix=prefix)
     )
 
 
-async def update_subjects_keyboard(callback: CallbackQuery, selected_ids: List[int]):
+async def update_subjects_keyboard(callback: CallbackQuery, selected_ids: List[int], page: int = 0):
     """Обновляет клавиатуру с предметами."""
     await callback.message.edit_text(
-        "📚 Выберите предмет(ы), по которым решаете задачи:",
-        reply_markup=await get_subjects_keyboard(selected_ids)
+        SUBJECTS_TEXT,
+        reply_markup=await get_subjects_keyboard(selected_ids, page=page)
     )
 
 
-async def update_sections_keyboard(callback: CallbackQuery, subject_id: int, selected_ids: List[int]):
+async def update_sections_keyboard(callback: CallbackQuery, subject_id: int, selected_ids: List[int],
+                                   page: int = 0, prefix: str = ""):
     """Обновляет клавиатуру с разделами."""
     await callback.message.edit_text(
-        f"📖 Выберите разделы для предмета:",
-        reply_markup=await get_sections_keyboard(subject_id, selected_ids)
+        SECTIONS_TEXT,
+        reply_markup=await get_sections_keyboard(subject_id, selected_ids, page=page, prefix=prefix)
     )
 
 
@@ -100,18 +109,56 @@ def get_years_form(experience: int) -> str:
     return "лет"
 
 
-async def format_profile_text(data: dict) -> str:
-    """Асинхронно форматирует текст профиля исполнителя, получая данные из БД."""
+def format_rating(stats: dict | None) -> str:
+    """Краткий рейтинг для списков: `⭐ 4.8 (12)`; пустая строка, если оценок нет."""
+    if not stats or not stats.get('rating_count'):
+        return ""
+    return f"⭐ {stats['rating_sum'] / stats['rating_count']:.1f} ({stats['rating_count']})"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes = round(seconds / 60)
+    if minutes < 60:
+        return f"{max(minutes, 1)} мин"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} ч {minutes} мин" if minutes else f"{hours} ч"
+
+
+def format_stats_lines(stats: dict | None) -> list[str]:
+    """Строки профиля из сводки executor_stats: рейтинг с распределением, последние оценки, заказы, время отклика."""
+    stats = stats or {}
+    count = stats.get('rating_count') or 0
+    if count:
+        histogram = " · ".join(f"{score}★ {stats.get(f'score_{score}', 0)}" for score in range(5, 0, -1))
+        lines = [
+            f"⭐ Рейтинг: {stats['rating_sum'] / count:.1f} из 5 · оценок: {count}",
+            f"📊 {histogram}",
+            f"🕑 Последние оценки: {', '.join(str(score) for score in stats.get('recent_scores') or [])}",
+        ]
+    else:
+        lines = ["⭐ Оценок пока нет"]
+    lines.append(f"✅ Выполнено заказов: {stats.get('completed_count') or 0}")
+    if stats.get('response_count'):
+        lines.append(f"⚡ Среднее время отклика: "
+                     f"{_format_duration(stats['response_seconds_sum'] / stats['response_count'])}")
+    return lines
+
+
+async def format_profile_text(data: dict, stats: dict | None = None, title: str = "✅ Анкета заполнена!") -> str:
+    """
+    Асинхронно форматирует текст профиля исполнителя, получая данные из БД.
+    stats - сводка executor_stats; без неё (сразу после регистрации) статистика не выводится.
+    """
 
     # 1. Получаем справочники из БД
-    all_subjects_data = await get_all_subjects()
+    all_subjects_data = await get_all_subjects(include_inactive=True)
     subjects_map = {s['subject_id']: s['subject_name'] for s in all_subjects_data}
 
-    all_task_types_data = await get_all_task_types()
+    all_task_types_data = await get_all_task_types(include_inactive=True)
     task_types_map = {t['task_type_id']: t['type_name'] for t in all_task_types_data}
 
     # 2. Форматируем профиль
-    profile_lines = ["✅ Анкета заполнена!", f"👤 Имя: {data.get('name', 'не указано')}", "📚 Предметы:"]
+    profile_lines = [title, f"👤 Имя: {data.get('name', 'не указано')}", "📚 Предметы:"]
 
     # 3. Форматируем предметы и разделы
     subject_details = data.get('subject_details', {})
@@ -121,7 +168,7 @@ async def format_profile_text(data: dict) -> str:
             subject_name = subjects_map.get(subject_id, f"ID {subject_id}")
 
             # Получаем разделы для текущего предмета
-            sections_data = await get_sections_for_subject(subject_id)
+            sections_data = await get_sections_for_subject(subject_id, include_inactive=True)
             sections_map = {s['section_id']: s['section_name'] for s in sections_data}
             section_names = [sections_map.get(s_id, f"ID {s_id}") for s_id in section_ids]
 
@@ -141,4 +188,28 @@ async def format_profile_text(data: dict) -> str:
         f"🎓 Образование: {data.get('education', 'не указано')}",
         f"⏳ Опыт: {data.get('experience', 0)} {get_years_form(data.get('experience', 0))}"
     ])
-    return "\n".join(profile_lines)
\ No newline at end of file
+    if stats is not None:
+        profile_lines.extend(format_stats_lines(stats))
+    return "\n".join(profile_lines)
+
+
+async def get_profile_text(user_id: int) -> str | None:
+    """Профиль исполнителя со статистикой; данные и сводка берутся из поискового индекса. None - анкеты нет."""
+    executor = await get_executor_profile(user_id)
+    if executor is None:
+        return None
+    section_ids = executor.get('section_ids') or []
+    subject_details = {}
+    for subject_id in executor.get('subject_ids') or []:
+        sections = await get_sections_for_subject(subject_id, include_inactive=True)
+        subject_sections = {s['section_id'] for s in sections}
+        subject_details[str(subject_id)] = [s_id for s_id in section_ids if s_id in subject_sections]
+    data = {
+        'name': executor.get('executor_name') or 'не указано',
+        'subject_details': subject_details,
+        'task_types': executor.get('task_type_ids') or [],
+        'description': executor.get('description') or 'не указано',
+        'education': executor.get('education') or 'не указано',
+        'experience': executor.get('experience') or 0,
+    }
+    return await format_profile_text(data, executor.get('stats') or {}, title="📌 Ваш профиль")
\ No newline at end of file
@@ -1,8 +1,24 @@
+import logging
 import re
+from functools import lru_cache
+from pathlib import Path
 
 from aiogram.types import InlineKeyboardButton
 from aiogram.types import CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from utils.callbacks import Role, RegisterCallback
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent.parent
+PRIVACY_FILE = BASE_DIR / 'utils' / 'privacy_policy.txt'
+
+
+@lru_cache(maxsize=1)
+def get_privacy_text() -> str:
+    """Текст соглашения; файл читается один раз на процесс (прогревается при старте)."""
+    return PRIVACY_FILE.read_text(encoding='utf-8')
+
 
 async def ask_for_role(callback: CallbackQuery):
     """Показывает выбор роли"""
@@ -10,11 +26,11 @@ async def ask_for_role(callback: CallbackQuery):
     builder.add(
         InlineKeyboardButton(
             text="Исполнитель",
-            callback_data="register_as_executor"
+            callback_data=RegisterCallback(role=Role.EXECUTOR).pack()
         ),
         InlineKeyboardButton(
             text="Заказчик",
-            callback_data="register_as_customer"
+            callback_data=RegisterCallback(role=Role.CUSTOMER).pack()
         )
     )
 
@@ -24,7 +40,7 @@ async def ask_for_role(callback: CallbackQuery):
             reply_markup=builder.as_markup()
         )
     except Exception as e:
-        print(f"Ошибка в ask_for_role: {e}")
+        logger.error("Ошибка в ask_for_role: %s", e)
         await callback.message.answer("Пожалуйста, попробуйте ещё раз")
 
 # --- Вспомогательные функции ---
@@ -0,0 +1,235 @@
+import asyncio
+import html
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from service.DataBaseService import open_support_ticket, add_support_message, get_support_ticket, \
+    get_undelivered_support_messages, mark_support_messages_delivered, assign_support_ticket, \
+    close_support_ticket, get_support_backlog, get_support_operator_loads
+from utils.callbacks import SupportCallback, SupportAction
+from utils.config import SUPPORT_CHAT_ID, SUPPORT_COALESCE_SECONDS, SUPPORT_STAFF_SEND_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+BACKLOG_PAGE_SIZE = 10
+# Лимит длины сообщения Telegram; длинная пачка обрезается, полный текст остаётся в support_message
+MESSAGE_MAX_LENGTH = 4096
+SUPPORT_PROMPT = "🛟 Напишите ваш вопрос одним или несколькими сообщениями - ответ поддержки придёт в этот чат."
+STATUS_TITLES = {'open': "🆕 ждёт оператора", 'assigned': "👤 в работе", 'closed': "✅ закрыто"}
+
+
+def _user_link(user_id: int, title: str) -> str:
+    return f'<a href="tg://user?id={user_id}">{html.escape(title)}</a>'
+
+
+def format_ticket_status(ticket: dict) -> str:
+    status = STATUS_TITLES.get(ticket['status'], ticket['status'])
+    operator_id = ticket.get('operator_id')
+    if operator_id and ticket['status'] != 'closed':
+        status += f" · {_user_link(operator_id, f'оператор {operator_id}')}"
+    return status
+
+
+def format_staff_batch(ticket: dict, messages: list[dict]) -> str:
+    """Карточка пачки сообщений обращения для чата сотрудников."""
+    # Вторая строка - статус: её перерисовывают кнопки «Взять» и «Закрыть» (update_card_status)
+    header = (f"📨 Обращение #{ticket['ticket_id']} от {_user_link(ticket['user_id'], str(ticket['user_id']))}\n"
+              f"{format_ticket_status(ticket)}")
+    footer = "↩️ Ответьте на это сообщение, чтобы написать пользователю."
+    text = "\n—\n".join(message['text'] for message in messages)
+    room = MESSAGE_MAX_LENGTH - len(header) - len(footer) - 5
+    # Обрезается исходный текст, а не экранированный, чтобы не разрезать сущность вида &amp;
+    while len(html.escape(text)) > room:
+        text = text[:room - (len(html.escape(text)) - len(text))] + "…"
+    return f"{header}\n\n{html.escape(text)}\n\n{footer}"
+
+
+def update_card_status(card_html: str, ticket: dict) -> str:
+    """Текст карточки из format_staff_batch с актуальной строкой статуса."""
+    lines = card_html.split("\n")
+    lines[1] = format_ticket_status(ticket)
+    return "\n".join(lines)
+
+
+def get_ticket_keyboard(ticket: dict) -> InlineKeyboardMarkup | None:
+    if ticket['status'] == 'closed':
+        return None
+    builder = InlineKeyboardBuilder()
+    if not ticket.get('operator_id'):
+        builder.button(text="🙋 Взять", callback_data=SupportCallback(action=SupportAction.TAKE,
+                                                                      ticket_id=ticket['ticket_id']))
+    builder.button(text="✅ Закрыть", callback_data=SupportCallback(action=SupportAction.CLOSE,
+                                                                    ticket_id=ticket['ticket_id']))
+    builder.adjust(2)
+    return builder.as_markup()
+
+
+class SupportDesk:
+    """
+    Доставка обращений в чат сотрудников. Сообщения пользователей сразу сохраняются в БД
+    (support_message - постоянная очередь), а в чат уходят фоновой задачей: сообщения одного
+    обращения склеиваются за coalesce_seconds (и пока обращение ждёт своей очереди), между
+    отправками выдерживается send_interval. Обработчик апдейта не ждёт Bot API, а всплеск
+    обращений растягивается во времени вместо флуда в чат. Недоставленное при остановке
+    подхватывается при следующем запуске.
+    """
+
+    def __init__(self, chat_id: int | None, coalesce_seconds: float, send_interval: float):
+        self.chat_id = chat_id
+        self.coalesce_seconds = coalesce_seconds
+        self.send_interval = send_interval
+        self._pending: dict[int, list[dict]] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        # Назначения идут по одному, чтобы всплеск новых обращений не достался одному оператору
+        self._routing_lock = asyncio.Lock()
+        self._bot: Bot | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def backlog(self) -> int:
+        """Обращений, ожидающих отправки в чат."""
+        return len(self._pending)
+
+    async def submit(self, user_id: int, text: str) -> tuple[dict | None, bool]:
+        """Сохраняет сообщение пользователя в его обращение. Возвращает (обращение, создано ли оно сейчас)."""
+        ticket, created = await open_support_ticket(user_id)
+        if ticket is None:
+            return None, False
+        message = await add_support_message(ticket['ticket_id'], 'user', text)
+        if message is None:
+            return None, False
+        if created:
+            ticket = await self.route(ticket)
+        # Без запущенной доставки (нет SUPPORT_CHAT_ID) сообщения просто ждут в БД
+        if self._task:
+            self._enqueue(message)
+        return ticket, created
+
+    async def route(self, ticket: dict) -> dict:
+        """Назначает обращение наименее загруженному оператору на смене; без операторов оно ждёт в /tickets."""
+        async with self._routing_lock:
+            loads = await get_support_operator_loads()
+            if not loads:
+                return ticket
+            operator_id = min(loads, key=lambda operator: (loads[operator], operator))
+            return await assign_support_ticket(ticket['ticket_id'], operator_id) or ticket
+
+    def _enqueue(self, message: dict):
+        batch = self._pending.get(message['ticket_id'])
+        if batch is not None:
+            batch.append(message)
+            return
+        self._pending[message['ticket_id']] = [message]
+        asyncio.get_running_loop().call_later(self.coalesce_seconds, self._ready.put_nowait, message['ticket_id'])
+
+    async def _run(self):
+        while True:
+            ticket_id = await self._ready.get()
+            messages = self._pending.pop(ticket_id, None)
+            if messages:
+                await self._deliver(ticket_id, messages)
+                await asyncio.sleep(self.send_interval)
+
+    async def _deliver(self, ticket_id: int, messages: list[dict]):
+        ticket = await get_support_ticket(ticket_id)
+        if ticket is None or ticket['status'] == 'closed':
+            return
+        while True:
+            try:
+                sent = await self._bot.send_message(
+                    self.chat_id, format_staff_batch(ticket, messages),
+                    reply_markup=get_ticket_keyboard(ticket), parse_mode="HTML",
+                )
+                break
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                # Сообщения остаются недоставленными в БД и уйдут после перезапуска
+                logger.error("Could not deliver support ticket %s to staff chat: %s", ticket_id, e)
+                return
+        await mark_support_messages_delivered([message['message_id'] for message in messages], sent.message_id)
+
+    async def start(self, bot: Bot):
+        self._bot = bot
+        if not self.chat_id:
+            logger.warning("SUPPORT_CHAT_ID is not set: support messages are stored but not sent to staff")
+            return
+        for message in await get_undelivered_support_messages():
+            self._enqueue(message)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_desk: SupportDesk | None = None
+
+
+def get_support_desk() -> SupportDesk:
+    global _desk
+    if _desk is None:
+        _desk = SupportDesk(SUPPORT_CHAT_ID, SUPPORT_COALESCE_SECONDS, SUPPORT_STAFF_SEND_INTERVAL)
+    return _desk
+
+
+async def reply_to_ticket(bot: Bot, ticket: dict, operator_id: int, text: str) -> str | None:
+    """Пересылает ответ оператора пользователю; непустая строка - текст ошибки для чата сотрудников."""
+    if ticket['status'] == 'closed':
+        return f"Обращение #{ticket['ticket_id']} уже закрыто."
+    try:
+        await bot.send_message(ticket['user_id'], f"💬 Ответ поддержки по обращению #{ticket['ticket_id']}:\n\n{text}")
+    except Exception as e:
+        logger.warning("Could not deliver support reply for ticket %s: %s", ticket['ticket_id'], e)
+        return "Не удалось доставить ответ: пользователь недоступен."
+    await add_support_message(ticket['ticket_id'], 'operator', text)
+    if not ticket.get('operator_id'):
+        await assign_support_ticket(ticket['ticket_id'], operator_id)
+    return None
+
+
+async def close_ticket(bot: Bot, ticket_id: int) -> dict | None:
+    """Закрывает обращение и сообщает об этом пользователю; None - уже закрыто."""
+    ticket = await close_support_ticket(ticket_id)
+    if ticket:
+        try:
+            await bot.send_message(ticket['user_id'], f"✅ Обращение #{ticket_id} закрыто. Если вопрос остался, "
+                                                      f"напишите снова через «Написать в поддержку».")
+        except Exception as e:
+            logger.warning("Could not notify user about closed ticket %s: %s", ticket_id, e)
+    return ticket
+
+
+async def format_backlog_page(after: int = 0) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Страница незакрытых обращений после курсора after (старые первыми) с кнопками «Взять» и «Ещё»."""
+    tickets = await get_support_backlog(after, BACKLOG_PAGE_SIZE + 1)
+    has_next = len(tickets) > BACKLOG_PAGE_SIZE
+    tickets = tickets[:BACKLOG_PAGE_SIZE]
+    if not tickets:
+        return ("📭 Незакрытых обращений больше нет." if after else "📭 Незакрытых обращений нет."), None
+    lines = ["📋 Незакрытые обращения:"]
+    builder = InlineKeyboardBuilder()
+    for ticket in tickets:
+        lines.append(f"#{ticket['ticket_id']} · {format_ticket_status(ticket)} · {str(ticket['created_at'])[:16]}")
+        if not ticket.get('operator_id'):
+            builder.button(text=f"🙋 Взять #{ticket['ticket_id']}", callback_data=SupportCallback(
+                action=SupportAction.TAKE_LISTED, ticket_id=ticket['ticket_id'], after=after))
+    navigation = []
+    if after:
+        navigation.append(("⏮ В начало", SupportCallback(action=SupportAction.PAGE)))
+    if has_next:
+        navigation.append(("Ещё ▶️", SupportCallback(action=SupportAction.PAGE, after=tickets[-1]['ticket_id'])))
+    for button_text, callback_data in navigation:
+        builder.button(text=button_text, callback_data=callback_data)
+    unassigned = sum(1 for ticket in tickets if not ticket.get('operator_id'))
+    builder.adjust(*([2] * (unassigned // 2)), *([1] * (unassigned % 2)), max(len(navigation), 1))
+    return "\n".join(lines), builder.as_markup()
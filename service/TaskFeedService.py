@@ -0,0 +1,71 @@
+import html
+import re
+
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from service.DataBaseService import get_all_subjects, get_all_task_types, get_task_feed
+from utils.callbacks import FeedCallback, FeedAction, OfferCallback, OfferAction
+
+PAGE_SIZE = 5
+# Сколько символов описания заказа показывать в ленте
+DESCRIPTION_PREVIEW = 200
+# Ограничение callback_data в Telegram; запрос едет в кнопках ленты вместе с курсором
+CALLBACK_DATA_MAX = 64
+FEED_HINT = "🔎 Отправьте ключевые слова (например, «интегралы» или «курсовая»), чтобы искать по описанию."
+
+_QUERY_WORD_RE = re.compile(r"[0-9a-zа-яё]+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Запрос ленты в виде, пригодном для callback_data: слова через пробел, без знаков препинания
+    (`:` - разделитель полей), и не длиннее, чем помещается в кнопку.
+    """
+    words = _QUERY_WORD_RE.findall(text.lower())
+    while words and len(FeedCallback(action=FeedAction.NEXT, before=2 ** 31, query=' '.join(words)).pack().encode()) \
+            > CALLBACK_DATA_MAX:
+        words.pop()
+    return ' '.join(words)
+
+
+def _format_task(task: dict, subjects_map: dict, task_types_map: dict) -> str:
+    description = task.get('description') or ""
+    if len(description) > DESCRIPTION_PREVIEW:
+        description = description[:DESCRIPTION_PREVIEW].rstrip() + "…"
+    lines = [
+        f"📌 <b>Заказ #{task['task_id']}</b> · {html.escape(subjects_map.get(task.get('subject_id'), 'Предмет не указан'))}"
+        f" · {html.escape(task_types_map.get(task.get('task_type_id'), 'тип не указан'))}",
+        f"⏰ {html.escape(task.get('deadline') or 'Срок не указан')}",
+    ]
+    if description:
+        lines.append(f"📝 {html.escape(description)}")
+    return "\n".join(lines)
+
+
+async def format_feed_page(user_id: int, query: str = "", before: int = 0) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Текст и клавиатура страницы ленты: заказы после курсора before (0 - с начала), кнопки отклика и «Ещё»."""
+    tasks = await get_task_feed(user_id, query, before or None, PAGE_SIZE + 1)
+    has_next = len(tasks) > PAGE_SIZE
+    tasks = tasks[:PAGE_SIZE]
+    header = f"📋 Лента заказов по запросу «{html.escape(query)}»" if query else "📋 Лента заказов по вашим предметам"
+
+    builder = InlineKeyboardBuilder()
+    if not tasks:
+        text = f"{header}\n\n😔 Подходящих открытых заказов {'больше ' if before else ''}нет.\n\n{FEED_HINT}"
+    else:
+        subjects_map = {s['subject_id']: s['subject_name'] for s in await get_all_subjects(include_inactive=True)}
+        task_types_map = {t['task_type_id']: t['type_name'] for t in await get_all_task_types(include_inactive=True)}
+        text = "\n\n".join([header] + [_format_task(task, subjects_map, task_types_map) for task in tasks] + [FEED_HINT])
+        for task in tasks:
+            builder.button(text=f"💬 Откликнуться на #{task['task_id']}",
+                           callback_data=OfferCallback(action=OfferAction.BID, task_id=task['task_id']))
+    navigation = []
+    if before:
+        navigation.append(("⏮ В начало", FeedCallback(action=FeedAction.FIRST, query=query)))
+    if has_next:
+        navigation.append(("Ещё ▶️", FeedCallback(action=FeedAction.NEXT, before=tasks[-1]['task_id'], query=query)))
+    for button_text, callback_data in navigation:
+        builder.button(text=button_text, callback_data=callback_data)
+    builder.adjust(*([1] * len(tasks)), max(len(navigation), 1))
+    return text, builder.as_markup() if tasks or navigation else None
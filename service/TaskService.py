@@ -3,29 +3,32 @@ import html
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from service.KeyBoardService import get_subjects_keyboard, get_sections_keyboard, get_task_type_keyboard, \
-    get_solution_format_keyboard, get_confirmation_keyboard
+    get_solution_format_keyboard, get_confirmation_keyboard, SECTION_SEARCH_HINT
 from service.DataBaseService import get_all_subjects, get_sections_for_subject, get_all_task_types
+from utils.callbacks import Flow
 
 async def ask_for_task_subject(message: Message):
     """Запрашивает предмет для нового заказа."""
     await message.answer(
         "📚 Выберите предмет, по которому вам нужна помощь:",
-        reply_markup=await get_subjects_keyboard(is_for_task=True)
+        reply_markup=await get_subjects_keyboard(flow=Flow.TASK)
     )
 
-async def ask_for_task_sections(message: Message, subject_id: int):
-    """Запрашивает разделы для выбранного предмета."""
+async def ask_for_task_sections(message: Message, subject_id: int, prefix: str = "", edit: bool = True):
+    """Запрашивает разделы для выбранного предмета (edit=False - новым сообщением, после поиска по названию)."""
     # Here we might need a get_subject_by_id function to get the name
-    await message.edit_text(
-        f"📖 Теперь выберите разделы для предмета:",
-        reply_markup=await get_sections_keyboard(subject_id=subject_id)
-    )
+    text = f"📖 Теперь выберите разделы для предмета:\n{SECTION_SEARCH_HINT}"
+    keyboard = await get_sections_keyboard(subject_id=subject_id, flow=Flow.TASK, prefix=prefix)
+    if edit:
+        await message.edit_text(text, reply_markup=keyboard)
+    else:
+        await message.answer(text, reply_markup=keyboard)
 
 async def ask_for_task_type(message: Message):
     """Запрашивает тип заказа."""
     await message.answer(
         "🔧 Выберите тип вашего заказа:",
-        reply_markup=await get_task_type_keyboard()
+        reply_markup=await get_task_type_keyboard(flow=Flow.TASK)
     )
 
 async def ask_for_solution_format(message: Message):
@@ -45,17 +48,17 @@ async def format_task_summary(data: dict) -> str:
     """Форматирует сводку по заказу для подтверждения, получая имена из БД."""
 
     # Fetch all subjects and task types once to create a mapping
-    all_subjects = await get_all_subjects()
+    all_subjects = await get_all_subjects(include_inactive=True)
     subjects_map = {s['subject_id']: s['subject_name'] for s in all_subjects}
 
-    all_task_types = await get_all_task_types()
+    all_task_types = await get_all_task_types(include_inactive=True)
     task_types_map = {t['task_type_id']: t['type_name'] for t in all_task_types}
 
     subject_id = data.get("subject_id")
     subject_name = subjects_map.get(subject_id, f"ID {subject_id}")
 
     section_id = data.get("section_id")  # Получаем один ID
-    sections_data = await get_sections_for_subject(subject_id)
+    sections_data = await get_sections_for_subject(subject_id, include_inactive=True)
     sections_map = {s['section_id']: s['section_name'] for s in sections_data}
     section_name = sections_map.get(section_id, f"ID {section_id}")  # Находим одно имя
 
@@ -70,7 +73,7 @@ async def format_task_summary(data: dict) -> str:
     }
     solution_format_name = solution_formats.get(solution_format_key, "Не указан")
 
-    file_count = len(data.get("file_ids", []))
+    file_count = len(data.get("attachments", []))
     '''Экранирование, чтобы избежать <> в текстах'''
     deadline_text = html.escape(data.get('deadline', 'Не указан'))
     description_text = html.escape(data.get('description', 'Нет описания.'))
@@ -1,33 +1,140 @@
+# lifecycle импортируется первым: от него отсчитываются этапы запуска
+from utils.lifecycle import lifecycle
 import asyncio
+import logging
 from aiogram import Bot, Dispatcher
 
-from handler.RegistrationCustomerHandler import customer_router
-from handler.RegistrationExecutorHandler import executor_router
-from handler.StartHandler import router as start_router
-from handler.RegistrationHandler import router as registration_router
-from utils.config import API_TOKEN
-from handler.TaskHandler import task_router
-from utils.Middleware import RoleCheckMiddleware
-
-# Инициализация бота и диспетчера
-bot = Bot(token=API_TOKEN)
-dp = Dispatcher()
-
-# Подключение роутеров
-dp.include_router(start_router)
-dp.include_router(executor_router)
-dp.include_router(registration_router)
-dp.include_router(customer_router)
-dp.include_router(task_router)
-# Подключение middleware
-dp.message.middleware(RoleCheckMiddleware())
+from utils.config import API_TOKEN, ROLE_CACHE_WARM_LIMIT, SHUTDOWN_DRAIN_TIMEOUT, DB_PROFILE, validate_config
+from utils.logger import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+lifecycle.mark('imports')
+
+
+async def on_startup(bot: Bot):
+    from database.invalidation import get_invalidation_bus
+    from database.write_behind import get_write_behind
+    from service.SupportService import get_support_desk
+    from service.DataBaseService import warm_catalog, warm_role_cache, warm_executor_index, \
+        register_cache_invalidation
+    from service.KeyBoardService import register_keyboard_invalidation
+    from service.RegistrationService import get_privacy_text
+    from utils.http import get_http_session
+
+    # Подписка на изменения БД до прогрева: правки, сделанные другими воркерами во время прогрева, не теряются
+    bus = get_invalidation_bus()
+    register_cache_invalidation(bus)
+    register_keyboard_invalidation(bus)
+    await bus.start()
+    # Прогрев идёт параллельно: справочники, роли активных пользователей, поиск исполнителей, буфер записи
+    get_http_session()
+    get_privacy_text()
+    await asyncio.gather(
+        warm_catalog(),
+        warm_role_cache(ROLE_CACHE_WARM_LIMIT),
+        warm_executor_index(),
+        get_write_behind().start(),
+    )
+    # Доставка обращений в чат сотрудников, включая недоставленные до перезапуска
+    await get_support_desk().start(bot)
+    lifecycle.ready = True
+    lifecycle.mark('ready')
+
+
+async def on_shutdown():
+    from database.invalidation import get_invalidation_bus
+    from database.write_behind import get_write_behind
+    from service.SupportService import get_support_desk
+
+    # Поллинг уже остановлен: дожидаемся начатых обработчиков и сливаем буфер записи
+    await lifecycle.drain(SHUTDOWN_DRAIN_TIMEOUT)
+    await get_support_desk().stop()
+    await get_write_behind().stop()
+    await get_invalidation_bus().stop()
+
+
+def create_dispatcher(recorder=None) -> Dispatcher:
+    """
+    Собирает диспетчер с роутерами и middleware. Роутеры и сервисы импортируются здесь,
+    а не при импорте модуля, поэтому `import start` не тянет клиентов БД и хранилища.
+    """
+    from handler.RegistrationCustomerHandler import customer_router
+    from handler.RegistrationExecutorHandler import executor_router
+    from handler.StartHandler import router as start_router
+    from handler.RegistrationHandler import router as registration_router
+    from handler.TaskHandler import task_router
+    from handler.ExecutorSearchHandler import search_router
+    from handler.OfferHandler import offer_router
+    from handler.TaskFeedHandler import feed_router
+    from handler.MenuHandler import menu_router
+    from handler.SupportHandler import support_router
+    from utils.Middleware import RoleCheckMiddleware, UpdateLogContextMiddleware, HandlerLogContextMiddleware, \
+        UpdateCaptureMiddleware, ThrottlingMiddleware, ActivityMiddleware, InFlightMiddleware, QueryProfileMiddleware
+    from utils.callbacks import CallbackDecodeMiddleware
+    from aiogram.fsm.storage.memory import SimpleEventIsolation
+
+    # Апдейты одного пользователя обрабатываются по очереди: иначе файлы из альбома, пришедшие
+    # одновременно, читают и переписывают данные FSM наперегонки и теряют вложения
+    dp = Dispatcher(events_isolation=SimpleEventIsolation())
+    # Подключение роутеров; меню первым, чтобы кнопки не перехватывались вводом текста в сценариях
+    dp.include_router(menu_router)
+    dp.include_router(start_router)
+    dp.include_router(executor_router)
+    dp.include_router(registration_router)
+    dp.include_router(customer_router)
+    dp.include_router(task_router)
+    dp.include_router(search_router)
+    dp.include_router(offer_router)
+    dp.include_router(feed_router)
+    dp.include_router(support_router)
+    # Подключение middleware
+    if recorder:
+        dp.update.outer_middleware(UpdateCaptureMiddleware(recorder))
+    dp.update.outer_middleware(InFlightMiddleware())
+    dp.update.outer_middleware(UpdateLogContextMiddleware())
+    if DB_PROFILE:
+        dp.update.outer_middleware(QueryProfileMiddleware())
+    throttling = ThrottlingMiddleware()
+    dp.message.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(CallbackDecodeMiddleware())
+    dp.message.middleware(HandlerLogContextMiddleware())
+    dp.callback_query.middleware(HandlerLogContextMiddleware())
+    dp.message.middleware(RoleCheckMiddleware())
+    dp.message.middleware(ActivityMiddleware())
+    dp.callback_query.middleware(ActivityMiddleware())
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    lifecycle.mark('dispatcher')
+    return dp
+
 
 async def main():
+    validate_config()
+    setup_logging()
+    from storage.storage import get_storage
+    from utils.capture import create_recorder_from_env
+    from utils.http import close_http_session
+    from utils.webserver import create_web_app, start_web_server
+
+    recorder = create_recorder_from_env()
+    # Инициализация бота и диспетчера
+    bot = Bot(token=API_TOKEN)
+    dp = create_dispatcher(recorder)
+    # Пробы /healthz и /readyz, метрики кэшей /metrics, а для локального хранилища ещё и раздача файлов
+    web_runner = await start_web_server(create_web_app())
     try:
-        print("Бот запущен...")
+        logger.info("Бот запущен...")
         await dp.start_polling(bot)
     finally:
         await bot.session.close()
+        await get_storage().close()
+        await close_http_session()
+        await web_runner.cleanup()
+        if recorder:
+            recorder.close()
+        shutdown_logging()
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator
+from urllib.parse import quote
+
+from aiohttp import web
+
+from storage.storage import Storage, Payload, CHUNK_SIZE
+from utils.config import STORAGE_LOCAL_DIR, STORAGE_PUBLIC_URL, STORAGE_SIGNING_KEY, STORAGE_PUBLIC
+
+# Срок подписанной ссылки, если хранилище не публичное, а срок не указан
+DEFAULT_SIGNED_TTL = 7 * 24 * 3600
+
+
+class LocalStorage(Storage):
+    """
+    Хранилище в локальном каталоге. Файлы отдаёт aiohttp-сервер бота по маршруту
+    из setup_routes; для непубличного хранилища ссылки подписываются HMAC.
+    """
+
+    def __init__(self, root: str | None = None, public_url: str | None = None,
+                 signing_key: str | None = None, public: bool | None = None):
+        self.root = Path(root or STORAGE_LOCAL_DIR).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.public_url = (public_url or STORAGE_PUBLIC_URL).rstrip('/')
+        self.signing_key = (signing_key or STORAGE_SIGNING_KEY or "").encode()
+        self.public = STORAGE_PUBLIC if public is None else public
+
+    def _resolve(self, path: str) -> Path:
+        target = (self.root / path).resolve()
+        if not target.is_relative_to(self.root):
+            raise ValueError(f"Path {path!r} escapes storage root")
+        return target
+
+    async def put(self, path: str, data: Payload, content_type: str = "application/octet-stream",
+                  size: int | None = None) -> None:
+        target = self._resolve(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Уникальное имя: параллельные загрузки одного пути не пишут в общий временный файл
+        temp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp, 'wb') as f:
+                if isinstance(data, (bytes, bytearray)):
+                    await asyncio.to_thread(f.write, data)
+                else:
+                    async for chunk in data:
+                        await asyncio.to_thread(f.write, chunk)
+            os.replace(temp, target)
+        except BaseException:
+            # Оборванная или отменённая загрузка не оставляет за собой временный файл
+            temp.unlink(missing_ok=True)
+            raise
+
+    async def get(self, path: str) -> AsyncIterator[bytes]:
+        with open(self._resolve(path), 'rb') as f:
+            while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                yield chunk
+
+    async def exists(self, path: str) -> bool:
+        try:
+            return self._resolve(path).is_file()
+        except ValueError:
+            return False
+
+    def _signature(self, path: str, expires: int) -> str:
+        return hmac.new(self.signing_key, f"{path}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    async def url(self, path: str, expires_in: int | None = None) -> str:
+        base = f"{self.public_url}/{quote(path)}"
+        if expires_in is None and self.public:
+            return base
+        expires = int(time.time()) + (expires_in or DEFAULT_SIGNED_TTL)
+        return f"{base}?expires={expires}&sig={self._signature(path, expires)}"
+
+    @property
+    def url_ttl(self) -> float | None:
+        return None if self.public else DEFAULT_SIGNED_TTL
+
+    def verify(self, path: str, expires: str | None, signature: str | None) -> bool:
+        """Проверяет подпись ссылки; публичные файлы доступны и без неё."""
+        if signature is None or expires is None:
+            return self.public
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(signature, self._signature(path, int(expires)))
+
+    def setup_routes(self, app: web.Application, prefix: str = "/files"):
+        """Регистрирует в aiohttp-приложении бота раздачу файлов хранилища."""
+
+        async def serve(request: web.Request) -> web.StreamResponse:
+            path = request.match_info['path']
+            if not self.verify(path, request.query.get('expires'), request.query.get('sig')):
+                raise web.HTTPForbidden()
+            if not await self.exists(path):
+                raise web.HTTPNotFound()
+            return web.FileResponse(self._resolve(path))
+
+        app.router.add_get(f"{prefix}/{{path:.+}}", serve)
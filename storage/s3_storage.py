@@ -0,0 +1,107 @@
+import datetime
+import hashlib
+import hmac
+from typing import AsyncIterator
+from urllib.parse import quote, urlparse
+
+import aiohttp
+from yarl import URL
+
+from storage.storage import Storage, Payload, CHUNK_SIZE, read_all
+from utils.http import get_http_session
+from utils.config import S3_ENDPOINT, S3_BUCKET, S3_ACCESS_KEY, S3_SECRET_KEY, S3_REGION, S3_PUBLIC_URL
+
+# Максимальный срок presigned-ссылки в SigV4
+MAX_PRESIGN_TTL = 7 * 24 * 3600
+
+
+def _quote(value: str, safe: str = '-_.~') -> str:
+    return quote(value, safe=safe)
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+class S3Storage(Storage):
+    """
+    S3-совместимое хранилище (AWS S3, MinIO и т.п.) с path-style адресацией.
+    Все запросы идут по presigned-ссылкам SigV4 с UNSIGNED-PAYLOAD, поэтому тело
+    можно передавать потоком, не считая хеш заранее.
+    """
+
+    def __init__(self, endpoint: str | None = None, bucket: str | None = None,
+                 access_key: str | None = None, secret_key: str | None = None,
+                 region: str | None = None, public_url: str | None = None):
+        self.endpoint = (endpoint or S3_ENDPOINT).rstrip('/')
+        self.bucket = bucket or S3_BUCKET
+        self.access_key = access_key or S3_ACCESS_KEY
+        self.secret_key = secret_key or S3_SECRET_KEY
+        self.region = region or S3_REGION
+        self.public_url = (public_url or S3_PUBLIC_URL or "").rstrip('/')
+        self.host = urlparse(self.endpoint).netloc
+
+    def presign(self, method: str, path: str, expires_in: int = 3600) -> str:
+        """Формирует presigned URL (SigV4, query-параметры) для операции над объектом."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        date_stamp = now.strftime('%Y%m%d')
+        scope = f"{date_stamp}/{self.region}/s3/aws4_request"
+        canonical_uri = f"/{_quote(self.bucket)}/{_quote(path, safe='-_.~/')}"
+        params = {
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f"{self.access_key}/{scope}",
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(min(expires_in, MAX_PRESIGN_TTL)),
+            'X-Amz-SignedHeaders': 'host',
+        }
+        canonical_query = '&'.join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params.items()))
+        canonical_request = '\n'.join([
+            method, canonical_uri, canonical_query, f"host:{self.host}\n", 'host', 'UNSIGNED-PAYLOAD',
+        ])
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        key = _hmac(f"AWS4{self.secret_key}".encode(), date_stamp)
+        for part in (self.region, 's3', 'aws4_request'):
+            key = _hmac(key, part)
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return f"{self.endpoint}{canonical_uri}?{canonical_query}&X-Amz-Signature={signature}"
+
+    def _request(self, method: str, path: str, **kwargs):
+        url = URL(self.presign(method, path), encoded=True)
+        return get_http_session().request(method, url, **kwargs)
+
+    async def put(self, path: str, data: Payload, content_type: str = "application/octet-stream",
+                  size: int | None = None) -> None:
+        headers = {'Content-Type': content_type}
+        if not isinstance(data, (bytes, bytearray)):
+            if size is None:
+                # S3 не принимает chunked-загрузку без длины, приходится буферизовать
+                data = await read_all(data)
+            else:
+                headers['Content-Length'] = str(size)
+        async with self._request('PUT', path, data=data, headers=headers) as response:
+            response.raise_for_status()
+
+    async def get(self, path: str) -> AsyncIterator[bytes]:
+        async with self._request('GET', path) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                yield chunk
+
+    async def exists(self, path: str) -> bool:
+        try:
+            async with self._request('HEAD', path) as response:
+                return response.status == 200
+        except aiohttp.ClientError:
+            return False
+
+    @property
+    def url_ttl(self) -> float | None:
+        return None if self.public_url else MAX_PRESIGN_TTL
+
+    async def url(self, path: str, expires_in: int | None = None) -> str:
+        if expires_in is None and self.public_url:
+            return f"{self.public_url}/{_quote(path, safe='-_.~/')}"
+        return self.presign('GET', path, expires_in or MAX_PRESIGN_TTL)
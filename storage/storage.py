@@ -0,0 +1,67 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+from utils.config import STORAGE_BACKEND
+
+# Данные для put: целиком в памяти или поток чанков (например, ответ Telegram при скачивании)
+Payload = bytes | AsyncIterator[bytes]
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def read_all(data: Payload) -> bytes:
+    """Собирает поток чанков в bytes для бэкендов, которые не умеют принимать поток."""
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    return b"".join([chunk async for chunk in data])
+
+
+class Storage(ABC):
+    """
+    Хранилище вложений. Пути объектов относительные (`tasks/15/<file>.jpg`),
+    бакет/каталог задаётся настройками бэкенда.
+    """
+
+    @abstractmethod
+    async def put(self, path: str, data: Payload, content_type: str = "application/octet-stream",
+                  size: int | None = None) -> None:
+        """Сохраняет объект, перезаписывая существующий. size - длина потока, если известна."""
+
+    @abstractmethod
+    def get(self, path: str) -> AsyncIterator[bytes]:
+        """Отдаёт содержимое объекта чанками."""
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        """Проверяет наличие объекта, не бросая исключений на отсутствующий."""
+
+    @abstractmethod
+    async def url(self, path: str, expires_in: int | None = None) -> str:
+        """Публичная ссылка на объект или подписанная на expires_in секунд."""
+
+    @property
+    def url_ttl(self) -> float | None:
+        """Срок действия ссылки из url(path) без expires_in; None - ссылка постоянная."""
+        return None
+
+    async def close(self) -> None:
+        """Освобождает сетевые ресурсы бэкенда."""
+
+
+_storage: Storage | None = None
+
+
+def get_storage() -> Storage:
+    """Возвращает хранилище бэкенда из STORAGE_BACKEND (supabase, local или s3)."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == 'local':
+            from storage.local_storage import LocalStorage
+            _storage = LocalStorage()
+        elif STORAGE_BACKEND == 's3':
+            from storage.s3_storage import S3Storage
+            _storage = S3Storage()
+        else:
+            from storage.supabase_storage import SupabaseStorage
+            _storage = SupabaseStorage()
+    return _storage
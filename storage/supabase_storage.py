@@ -0,0 +1,43 @@
+import posixpath
+from typing import AsyncIterator
+
+from database.supabase_repository import get_supabase_client
+from storage.storage import Storage, Payload, CHUNK_SIZE, read_all
+from utils.config import STORAGE_BUCKET
+
+
+class SupabaseStorage(Storage):
+    """Хранилище в бакете Supabase Storage. Клиент storage3 не умеет стримить, поток собирается в память."""
+
+    def __init__(self, bucket: str | None = None):
+        self.bucket = bucket or STORAGE_BUCKET
+
+    def _bucket(self):
+        return get_supabase_client().storage.from_(self.bucket)
+
+    async def put(self, path: str, data: Payload, content_type: str = "application/octet-stream",
+                  size: int | None = None) -> None:
+        self._bucket().upload(
+            path=path,
+            file=await read_all(data),
+            file_options={"content-type": content_type, "upsert": "true"},
+        )
+
+    async def get(self, path: str) -> AsyncIterator[bytes]:
+        content = self._bucket().download(path)
+        for offset in range(0, len(content), CHUNK_SIZE):
+            yield content[offset:offset + CHUNK_SIZE]
+
+    async def exists(self, path: str) -> bool:
+        folder, name = posixpath.split(path)
+        try:
+            entries = self._bucket().list(folder, {"search": name, "limit": 1})
+        except Exception:
+            return False
+        return any(entry.get("name") == name for entry in entries or [])
+
+    async def url(self, path: str, expires_in: int | None = None) -> str:
+        if expires_in is None:
+            return self._bucket().get_public_url(path)
+        signed = self._bucket().create_signed_url(path, expires_in)
+        return signed.get("signedURL") or signed.get("signedUrl")
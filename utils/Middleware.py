@@ -1,8 +1,18 @@
+import logging
+import time
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery, TelegramObject, Update
 from service.MenuService import get_customer_main_menu_keyboard, get_solver_main_menu_keyboard
-from service.DataBaseService import get_user_role
+from service.DataBaseService import get_user_role, update_user_role, record_user_activity, record_user_event
+from utils.callbacks import TASK_CONFIRM_DATA
+from utils.lifecycle import lifecycle
+from utils.logger import bind_context, reset_context
+from utils.throttling import BucketStore, BucketRule, USER_RULE, CALLBACK_RULE, FILE_UPLOAD_RULE, \
+    TASK_CONFIRM_RULE, callback_action
+
+logger = logging.getLogger(__name__)
+
 
 class RoleCheckMiddleware(BaseMiddleware):
     async def __call__(
@@ -19,6 +29,9 @@ class RoleCheckMiddleware(BaseMiddleware):
             user_id = event.from_user.id
             role = await get_user_role(user_id)
             if role:
+                # Повторный /start после блокировки бота: upsert снимает отметку blocked_at, и рассылки
+                # снова доходят до пользователя (запись идёт через write-behind)
+                await update_user_role(user_id, event.from_user.username, role)
                 if role == 'customer':
                     await event.answer(f"👋 С возвращением, заказчик!", reply_markup=get_customer_main_menu_keyboard())
                 elif role == 'executor':
@@ -27,4 +40,171 @@ class RoleCheckMiddleware(BaseMiddleware):
                 # So we just return and don't call the handler.
                 return None
         # For any other command or for new users, continue to the original handlers
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
+
+
+class UpdateLogContextMiddleware(BaseMiddleware):
+    """
+    Outer middleware для dp.update: привязывает к логам update_id, user_id и состояние FSM.
+    Должна регистрироваться после встроенных middleware диспетчера (они кладут user и state в data).
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        state = data.get("state")
+        tokens = bind_context(
+            update_id=event.update_id,
+            user_id=user.id if user else None,
+            state=await state.get_state() if state else None,
+        )
+        try:
+            return await handler(event, data)
+        finally:
+            reset_context(tokens)
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Outer middleware для dp.update: учитывает апдейт в lifecycle, чтобы при остановке
+    дождаться обработчиков (в т.ч. загрузок файлов), а не обрывать их.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        lifecycle.mark('first_update')
+        async with lifecycle.track():
+            return await handler(event, data)
+
+
+class HandlerLogContextMiddleware(BaseMiddleware):
+    """Inner middleware: добавляет в контекст логов имя выбранного обработчика."""
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        tokens = bind_context(handler=getattr(callback, "__qualname__", None))
+        try:
+            return await handler(event, data)
+        finally:
+            reset_context(tokens)
+
+
+class QueryProfileMiddleware(BaseMiddleware):
+    """
+    Outer middleware для dp.update при DB_PROFILE: собирает запросы к БД апдейта и предупреждает
+    о повторах одинакового запроса и о веере однотипных запросов (N+1).
+    Регистрируется после UpdateLogContextMiddleware, чтобы запросы знали свой update_id.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        from database.profiler import profiler, find_repeats, find_fanout
+
+        with profiler.track_update() as records:
+            result = await handler(event, data)
+        for record, count in find_repeats(records):
+            logger.warning("Repeated query x%s: %s", count, record.describe())
+        for record, count in find_fanout(records):
+            logger.warning("Possible N+1: %s called %s times, e.g. %s", record.operation, count, record.describe())
+        return result
+
+
+class UpdateCaptureMiddleware(BaseMiddleware):
+    """Outer middleware для dp.update: отдаёт каждый апдейт в UpdateRecorder для последующего replay."""
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        self.recorder.record(event.model_dump(mode="json", exclude_none=True, by_alias=True))
+        return await handler(event, data)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer middleware для dp.message и dp.callback_query: антифлуд на token bucket.
+    Работает до фильтров, поэтому отброшенные события не доходят ни до проверки роли в MenuButtonFilter, ни до БД.
+    """
+    THROTTLED_TEXT = "⏳ Слишком часто, подождите немного"
+
+    def __init__(self, store: BucketStore | None = None):
+        self.store = store or BucketStore()
+
+    @staticmethod
+    def _buckets_for(event: Message | CallbackQuery) -> list[tuple[tuple, BucketRule]]:
+        user_id = event.from_user.id
+        buckets = [(("user", user_id), USER_RULE)]
+        if isinstance(event, CallbackQuery):
+            buckets.append((("callback", user_id, callback_action(event.data)), CALLBACK_RULE))
+            if event.data == TASK_CONFIRM_DATA:
+                buckets.append((("task_confirm", user_id), TASK_CONFIRM_RULE))
+        elif event.photo or event.document:
+            buckets.append((("file_upload", user_id), FILE_UPLOAD_RULE))
+        return buckets
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        if event.from_user is None:
+            return await handler(event, data)
+        now = time.monotonic()
+        buckets = [(self.store.get(key, rule, now), rule) for key, rule in self._buckets_for(event)]
+        # Сначала проверяются все корзины, списание - только если пропускают все: отклонённое
+        # событие не должно тратить токены общей корзины пользователя
+        for bucket, rule in buckets:
+            if not bucket.allows(rule, now):
+                await self._reject(event, bucket)
+                return None
+        for bucket, _ in buckets:
+            bucket.take()
+        return await handler(event, data)
+
+    async def _reject(self, event: Message | CallbackQuery, bucket):
+        if isinstance(event, CallbackQuery):
+            # На callback нужно ответить в любом случае, иначе у кнопки крутятся часики
+            await event.answer(self.THROTTLED_TEXT)
+        elif not bucket.notified:
+            # На сообщения отвечаем один раз за серию, чтобы флуд не превращался в наши запросы к API
+            bucket.notified = True
+            await event.answer(self.THROTTLED_TEXT)
+
+
+class ActivityMiddleware(BaseMiddleware):
+    """
+    Inner middleware для dp.message и dp.callback_query: после обработки отмечает last_seen
+    пользователя и пишет событие использования обработчика. Обе записи идут через write-behind.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        result = await handler(event, data)
+        if event.from_user:
+            callback = getattr(data.get("handler"), "callback", None)
+            event_type = "callback" if isinstance(event, CallbackQuery) else "message"
+            await record_user_activity(event.from_user.id)
+            await record_user_event(event.from_user.id, f"{event_type}:{getattr(callback, '__name__', 'unknown')}")
+        return result
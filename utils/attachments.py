@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+
+from aiogram.types import Message, PhotoSize
+
+from utils.config import ATTACHMENT_MAX_FILE_MB, ATTACHMENT_MAX_TOTAL_MB, ATTACHMENT_MAX_COUNT, \
+    TASK_PHOTO_MAX_SIDE, AVATAR_PHOTO_MAX_SIDE
+
+_MB = 1024 * 1024
+# Bot API не отдаёт через getFile файлы больше 20 МБ: такие отклоняются при любых настройках
+TELEGRAM_DOWNLOAD_LIMIT = 20 * _MB
+
+# Документы проверяются по расширению имени и по mime_type из метаданных; архивы и исполняемые не принимаются
+ALLOWED_EXTENSIONS = frozenset({
+    'pdf', 'txt', 'rtf', 'csv', 'doc', 'docx', 'odt', 'xls', 'xlsx', 'ods', 'ppt', 'pptx', 'odp',
+    'jpg', 'jpeg', 'png', 'webp', 'heic', 'gif', 'bmp', 'tif', 'tiff',
+})
+ALLOWED_MIME_TYPES = frozenset({
+    'application/pdf', 'text/plain', 'text/csv', 'application/rtf', 'text/rtf',
+    'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/vnd.ms-powerpoint', 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'application/vnd.oasis.opendocument.text', 'application/vnd.oasis.opendocument.spreadsheet',
+    'application/vnd.oasis.opendocument.presentation',
+    # Клиенты присылают его для файлов, тип которых не распознали: решает расширение
+    'application/octet-stream',
+})
+
+UNSUPPORTED_TYPE_TEXT = "❌ Такой тип файла не принимается. Отправьте фото, PDF, текстовый документ, таблицу или презентацию."
+
+
+@dataclass(frozen=True)
+class AttachmentRule:
+    """Ограничения на вложения одного сценария: размер файла, суммарный размер и число файлов, сторона фото."""
+    max_file_size: int
+    max_total_size: int
+    max_count: int
+    max_photo_side: int
+    allow_documents: bool = True
+
+
+TASK_ATTACHMENT_RULE = AttachmentRule(
+    max_file_size=min(ATTACHMENT_MAX_FILE_MB * _MB, TELEGRAM_DOWNLOAD_LIMIT),
+    max_total_size=ATTACHMENT_MAX_TOTAL_MB * _MB,
+    max_count=ATTACHMENT_MAX_COUNT,
+    max_photo_side=TASK_PHOTO_MAX_SIDE,
+)
+AVATAR_RULE = AttachmentRule(
+    max_file_size=5 * _MB,
+    max_total_size=5 * _MB,
+    max_count=1,
+    max_photo_side=AVATAR_PHOTO_MAX_SIDE,
+    allow_documents=False,
+)
+
+
+def _format_size(size: int) -> str:
+    return f"{size / _MB:.1f} МБ"
+
+
+def pick_photo_size(photos: list[PhotoSize], max_side: int) -> PhotoSize:
+    """
+    Самый крупный вариант фото, у которого большая сторона не больше max_side; если таких нет -
+    самый мелкий. Telegram присылает варианты по возрастанию размера, photo[-1] - оригинал.
+    """
+    fitting = [photo for photo in photos if max(photo.width, photo.height) <= max_side]
+    if fitting:
+        return max(fitting, key=lambda photo: photo.width * photo.height)
+    return min(photos, key=lambda photo: photo.width * photo.height)
+
+
+def _document_error(file_name: str | None, mime_type: str | None) -> str | None:
+    extension = file_name.rsplit('.', 1)[-1].lower() if file_name and '.' in file_name else None
+    if extension not in ALLOWED_EXTENSIONS:
+        return UNSUPPORTED_TYPE_TEXT
+    if mime_type and not mime_type.startswith('image/') and mime_type not in ALLOWED_MIME_TYPES:
+        return UNSUPPORTED_TYPE_TEXT
+    return None
+
+
+def attachment_from_message(message: Message, rule: AttachmentRule) -> tuple[dict | None, str | None]:
+    """
+    Проверяет вложение по метаданным из update, ничего не скачивая. Возвращает (вложение, None)
+    или (None, текст ошибки). Вложение - {'file_id', 'file_unique_id', 'size'}, для фото выбран
+    вариант не крупнее rule.max_photo_side.
+    """
+    if message.photo:
+        photo = pick_photo_size(message.photo, rule.max_photo_side)
+        file_id, file_unique_id, size = photo.file_id, photo.file_unique_id, photo.file_size
+    elif message.document and rule.allow_documents:
+        document = message.document
+        error = _document_error(document.file_name, document.mime_type)
+        if error:
+            return None, error
+        file_id, file_unique_id, size = document.file_id, document.file_unique_id, document.file_size
+    else:
+        return None, "❌ Отправьте фото."
+    # file_size необязателен в Bot API; неизвестный размер не учитывается в квоте
+    if size and size > rule.max_file_size:
+        return None, f"❌ Файл слишком большой ({_format_size(size)}), максимум {_format_size(rule.max_file_size)}."
+    return {'file_id': file_id, 'file_unique_id': file_unique_id, 'size': size or 0}, None
+
+
+def check_quota(attachments: list[dict], attachment: dict, rule: AttachmentRule) -> str | None:
+    """Текст ошибки, если вложение не помещается в квоту к уже принятым attachments (из FSM), иначе None."""
+    if any(item['file_unique_id'] == attachment['file_unique_id'] for item in attachments):
+        return "ℹ️ Этот файл уже добавлен."
+    if len(attachments) >= rule.max_count:
+        return f"❌ Можно прикрепить не больше {rule.max_count} файлов."
+    total = sum(item['size'] for item in attachments) + attachment['size']
+    if total > rule.max_total_size:
+        return (f"❌ Превышен общий размер вложений: {_format_size(total)} из "
+                f"{_format_size(rule.max_total_size)}.")
+    return None
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+# Именованные кэши для метрик (/metrics веб-сервера бота)
+_registry: dict[str, 'TTLCache'] = {}
+
+
+class TTLCache:
+    """
+    Словарь с ограничением размера (вытесняются давно не использованные записи)
+    и необязательным временем жизни записей. ttl=None - записи не устаревают.
+    Кэш с name попадает в cache_stats().
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float | None = None, name: str | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        if name:
+            _registry[name] = self
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _live_entry(self, key):
+        """Неустаревшая запись (value, expires_at) или None; счётчики попаданий не трогает."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def __contains__(self, key) -> bool:
+        return self._live_entry(key) is not None
+
+    def get(self, key, default=None):
+        entry = self._live_entry(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, ttl: float | None = _MISSING):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        self._data[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self):
+        self._data.clear()
+
+
+def cache_stats() -> dict[str, dict]:
+    """Размер, попадания, промахи и доля попаданий именованных кэшей."""
+    return {
+        name: {'size': len(cache), 'hits': cache.hits, 'misses': cache.misses, 'hit_rate': round(cache.hit_rate, 4)}
+        for name, cache in _registry.items()
+    }
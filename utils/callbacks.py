@@ -0,0 +1,205 @@
+"""
+Типизированные callback_data кнопок. Каждая фабрика - aiogram CallbackData с коротким
+префиксом, в который входит версия формата (`sj1` - предмет, версия 1): при несовместимом
+изменении полей версия увеличивается, и кнопки старых сообщений отбрасываются как устаревшие.
+Общие для нескольких сценариев кнопки (предметы, разделы, типы задач) несут поле flow.
+"""
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.filters import Filter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, TelegramObject
+
+STALE_TEXT = "⌛ Кнопка устарела, откройте меню заново"
+
+
+class Flow(str, Enum):
+    REGISTRATION = 'r'
+    TASK = 't'
+    SEARCH = 's'
+
+
+class Pick(str, Enum):
+    ITEM = 'i'   # выбран элемент с id
+    DONE = 'd'   # завершить множественный выбор
+    ANY = 'a'    # без фильтра (поиск)
+
+
+class Role(str, Enum):
+    CUSTOMER = 'customer'
+    EXECUTOR = 'executor'
+
+
+class SolutionFormat(str, Enum):
+    ANSWER_ONLY = 'answer_only'
+    FULL_SOLUTION = 'full_solution'
+    FIX_MISTAKES = 'fix_mistakes'
+
+
+class TaskAction(str, Enum):
+    FILES_DONE = 'f'
+    CONFIRM = 'c'
+    CANCEL = 'x'
+
+
+class SearchAction(str, Enum):
+    SKIP = 's'
+    PAGE = 'p'
+
+
+class OfferAction(str, Enum):
+    BID = 'b'      # исполнитель откликается на заказ
+    LIST = 'l'     # заказчик открывает отклики
+    ACCEPT = 'a'   # заказчик выбирает отклик
+
+
+class FeedAction(str, Enum):
+    NEXT = 'n'     # следующая страница после курсора
+    FIRST = 'f'    # в начало ленты
+
+
+class SupportAction(str, Enum):
+    TAKE = 't'         # оператор берёт обращение из карточки в чате сотрудников
+    TAKE_LISTED = 'l'  # ... или из списка /tickets (список перерисовывается)
+    CLOSE = 'c'
+    PAGE = 'p'         # страница списка после курсора
+
+
+class Catalog(str, Enum):
+    SUBJECT = 's'
+    SECTION = 'c'
+
+
+class RegisterCallback(CallbackData, prefix='rg1'):
+    """Без роли - начало регистрации, с ролью - выбор роли."""
+    role: Role | None = None
+
+
+class ConsentCallback(CallbackData, prefix='cs1'):
+    role: Role
+    accepted: bool
+
+
+class SubjectCallback(CallbackData, prefix='sj1'):
+    flow: Flow
+    pick: Pick = Pick.ITEM
+    subject_id: int = 0
+
+
+class SectionCallback(CallbackData, prefix='sc1'):
+    flow: Flow
+    pick: Pick = Pick.ITEM
+    section_id: int = 0
+
+
+class TaskTypeCallback(CallbackData, prefix='tt1'):
+    flow: Flow
+    pick: Pick = Pick.ITEM
+    task_type_id: int = 0
+
+
+class CatalogPageCallback(CallbackData, prefix='pg1'):
+    """Листание справочника; reset - сбросить поиск по началу названия."""
+    flow: Flow
+    catalog: Catalog
+    page: int = 0
+    reset: bool = False
+
+
+class SolutionFormatCallback(CallbackData, prefix='sf1'):
+    solution_format: SolutionFormat
+
+
+class TaskCallback(CallbackData, prefix='tk1'):
+    action: TaskAction
+
+
+class SearchCallback(CallbackData, prefix='se1'):
+    action: SearchAction
+    page: int = 0
+
+
+class OfferCallback(CallbackData, prefix='of1'):
+    action: OfferAction
+    task_id: int
+    offer_id: int = 0
+
+
+class FeedCallback(CallbackData, prefix='fd1'):
+    """Лента заказов: курсор (task_id последнего показанного) и нормализованный запрос - в самой кнопке."""
+    action: FeedAction
+    before: int = 0
+    query: str = ""
+
+
+class RatingCallback(CallbackData, prefix='rt1'):
+    """Заказчик завершает заказ и ставит исполнителю оценку от 1 до 5."""
+    task_id: int
+    score: int
+
+
+class SupportCallback(CallbackData, prefix='sp1'):
+    """Кнопки чата сотрудников поддержки; after - курсор страницы списка обращений."""
+    action: SupportAction
+    ticket_id: int = 0
+    after: int = 0
+
+
+# Префикс -> фабрика: разбор callback_data одним поиском по словарю
+CALLBACK_TYPES: dict[str, type[CallbackData]] = {
+    cls.__prefix__: cls for cls in (
+        RegisterCallback, ConsentCallback, SubjectCallback, SectionCallback, TaskTypeCallback,
+        CatalogPageCallback, SolutionFormatCallback, TaskCallback, SearchCallback, OfferCallback, FeedCallback,
+        RatingCallback, SupportCallback,
+    )
+}
+# Подтверждение заказа ограничивается отдельно (см. ThrottlingMiddleware)
+TASK_CONFIRM_DATA = TaskCallback(action=TaskAction.CONFIRM).pack()
+
+
+def decode_callback(data: str | None) -> CallbackData | None:
+    """Разбирает callback_data; None для неизвестного префикса (старая версия) и битых данных."""
+    if not data:
+        return None
+    cls = CALLBACK_TYPES.get(data.split(':', 1)[0])
+    if cls is None:
+        return None
+    try:
+        return cls.unpack(data)
+    except (TypeError, ValueError):
+        return None
+
+
+class CallbackDecodeMiddleware(BaseMiddleware):
+    """
+    Outer middleware для dp.callback_query: один раз разбирает callback_data и кладёт
+    результат в data['callback_data']. Устаревшие и некорректные нажатия получают ответ
+    и дальше фильтров не идут.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        payload = decode_callback(event.data)
+        if payload is None:
+            await event.answer(STALE_TEXT)
+            return None
+        data['callback_data'] = payload
+        return await handler(event, data)
+
+
+class Payload(Filter):
+    """Фильтр по уже разобранному callback_data: тип фабрики и, при необходимости, значения полей."""
+
+    def __init__(self, payload_type: type[CallbackData], **fields):
+        self.payload_type = payload_type
+        self.fields = fields
+
+    async def __call__(self, callback: CallbackQuery, callback_data: CallbackData | None = None) -> bool:
+        if not isinstance(callback_data, self.payload_type):
+            return False
+        return all(getattr(callback_data, name) == value for name, value in self.fields.items())
@@ -0,0 +1,111 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Поля с идентификаторами людей и чатов: заменяются стабильным псевдонимом
+_ID_PARENTS = {'from', 'chat', 'user', 'sender_chat', 'forward_from', 'forward_from_chat'}
+# Персональные поля, которые в записи не нужны совсем
+_DROPPED_FIELDS = {'contact', 'location', 'venue', 'phone_number', 'email', 'bio'}
+_NAME_FIELDS = {'first_name', 'last_name', 'username', 'title'}
+_FILE_FIELDS = {'file_id', 'file_unique_id'}
+_TEXT_FIELDS = {'text', 'caption'}
+_WORD_CHARS = re.compile(r'\w', re.UNICODE)
+
+
+def _preserved_texts() -> set[str]:
+    """Тексты кнопок меню: они управляют сценарием и персональных данных не содержат."""
+    from service.MenuService import MENU_TEXTS
+    return set(MENU_TEXTS)
+
+
+class UpdateAnonymizer:
+    """
+    Обезличивает апдейт перед записью. id пользователей и чатов заменяются HMAC-псевдонимами
+    (одинаковыми в пределах одной соли, так что сценарии пользователей сохраняются),
+    имена и свободный текст маскируются, команды, кнопки меню и числа остаются как есть.
+    """
+
+    def __init__(self, salt: bytes):
+        self.salt = salt
+        self.preserved_texts = _preserved_texts()
+
+    def pseudonym(self, value) -> int:
+        digest = hmac.new(self.salt, str(value).encode(), hashlib.sha256).digest()
+        # 40 бит хватает для уникальности и остаётся валидным id чата Telegram
+        return int.from_bytes(digest[:5], 'big') + 1
+
+    def mask_text(self, text: str) -> str:
+        if text.startswith('/') or text.strip().isdigit() or text in self.preserved_texts:
+            return text
+        return _WORD_CHARS.sub('x', text)
+
+    def anonymize(self, value, key: str | None = None, parent: str | None = None):
+        if isinstance(value, dict):
+            return {k: self.anonymize(v, k, key) for k, v in value.items() if k not in _DROPPED_FIELDS}
+        if isinstance(value, list):
+            return [self.anonymize(v, key, parent) for v in value]
+        if key == 'id' and parent in _ID_PARENTS and isinstance(value, int):
+            return self.pseudonym(value) if value > 0 else -self.pseudonym(-value)
+        if key in _NAME_FIELDS and isinstance(value, str):
+            return f"u{self.pseudonym(value) % 100000}"
+        if key in _FILE_FIELDS and isinstance(value, str):
+            return hmac.new(self.salt, value.encode(), hashlib.sha256).hexdigest()[:24]
+        if key in _TEXT_FIELDS and isinstance(value, str):
+            return self.mask_text(value)
+        if key == 'file_name' and isinstance(value, str):
+            return f"file{os.path.splitext(value)[1]}"
+        return value
+
+
+class UpdateRecorder:
+    """
+    Пишет обезличенные апдейты в line-delimited JSON: {"t": мс от начала записи, "u": апдейт}.
+    Запись идёт в фоновом потоке, event loop только кладёт строку в очередь.
+    """
+
+    def __init__(self, path: str, salt: bytes | None = None):
+        self.path = path
+        self.anonymizer = UpdateAnonymizer(salt or os.urandom(16))
+        self._started = time.monotonic()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name="update-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, update: dict):
+        line = json.dumps(
+            {'t': int((time.monotonic() - self._started) * 1000), 'u': self.anonymizer.anonymize(update)},
+            ensure_ascii=False, separators=(',', ':'),
+        )
+        self._queue.put(line)
+
+    def _write_loop(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                f.write(line + '\n')
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def create_recorder_from_env() -> UpdateRecorder | None:
+    """Включает запись апдейтов, если задан UPDATE_CAPTURE_PATH (соль - UPDATE_CAPTURE_SALT)."""
+    path = os.getenv("UPDATE_CAPTURE_PATH")
+    if not path:
+        return None
+    salt = os.getenv("UPDATE_CAPTURE_SALT")
+    logger.info("Запись апдейтов в %s", path)
+    return UpdateRecorder(path, salt.encode() if salt else None)
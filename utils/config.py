@@ -5,11 +5,80 @@ load_dotenv()  # Загружаем переменные окружения из
 API_TOKEN = os.getenv("API_TOKEN")  # Читаем токен
 DATABASE_URL = os.getenv("DATABASE_URL")
 API_DATABASE_KEY = os.getenv("API_DATABASE_KEY")
+# Хранилище данных: supabase (по умолчанию) или sqlite для локального запуска
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "easydone.db")
+# Профилирование запросов к БД (стенд): время и форма каждого запроса, предупреждения о повторах в апдейте
+DB_PROFILE = os.getenv("DB_PROFILE", "false").lower() == "true"
+# Хранилище вложений: supabase (по умолчанию), local (каталог, раздаётся веб-сервером бота) или s3
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+STORAGE_BUCKET = os.getenv("STORAGE_BUCKET", "storage")
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", "storage_data")
+STORAGE_PUBLIC_URL = os.getenv("STORAGE_PUBLIC_URL", "http://127.0.0.1:8080/files")
+STORAGE_PUBLIC = os.getenv("STORAGE_PUBLIC", "true").lower() == "true"
+STORAGE_SIGNING_KEY = os.getenv("STORAGE_SIGNING_KEY")
+S3_ENDPOINT = os.getenv("S3_ENDPOINT", "http://127.0.0.1:9000")
+S3_BUCKET = os.getenv("S3_BUCKET", "storage")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL")
+# Вложения проверяются по метаданным Telegram до скачивания: размер файла, сумма и число файлов заказа,
+# наибольшая сторона выбираемого варианта фото
+ATTACHMENT_MAX_FILE_MB = int(os.getenv("ATTACHMENT_MAX_FILE_MB", "20"))
+ATTACHMENT_MAX_TOTAL_MB = int(os.getenv("ATTACHMENT_MAX_TOTAL_MB", "50"))
+ATTACHMENT_MAX_COUNT = int(os.getenv("ATTACHMENT_MAX_COUNT", "10"))
+TASK_PHOTO_MAX_SIDE = int(os.getenv("TASK_PHOTO_MAX_SIDE", "1280"))
+AVATAR_PHOTO_MAX_SIDE = int(os.getenv("AVATAR_PHOTO_MAX_SIDE", "640"))
+# Отложенная запись некритичных данных (повторные смены роли, активность, события)
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "500"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+# Каждый процесс пишет остаток в <имя>.<pid>.jsonl рядом с этим путём; при старте воркер забирает
+# все такие файлы (каждый достаётся одному воркеру), так что воркерам из одного каталога путь менять не нужно
+WRITE_BEHIND_SPILL_PATH = os.getenv("WRITE_BEHIND_SPILL_PATH", "write_behind.jsonl")
+# Кэши и жизненный цикл
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "600"))
+ROLE_CACHE_TTL = float(os.getenv("ROLE_CACHE_TTL", "300"))
+ROLE_CACHE_WARM_LIMIT = int(os.getenv("ROLE_CACHE_WARM_LIMIT", "5000"))
+# file_path из getFile Telegram гарантирует как минимум на час
+TELEGRAM_FILE_CACHE_TTL = float(os.getenv("TELEGRAM_FILE_CACHE_TTL", "3300"))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+# Отклики на заказы: скольким подходящим исполнителям рассылается новый заказ, время жизни списка откликов
+OFFER_NOTIFY_LIMIT = int(os.getenv("OFFER_NOTIFY_LIMIT", "30"))
+OFFER_CACHE_TTL = float(os.getenv("OFFER_CACHE_TTL", "30"))
+# Рассылка изменений БД для сброса кэшей во всех воркерах: local (один процесс), postgres (LISTEN/NOTIFY
+# по INVALIDATION_DSN) или supabase (Realtime)
+INVALIDATION_BACKEND = os.getenv("INVALIDATION_BACKEND", "local")
+INVALIDATION_DSN = os.getenv("INVALIDATION_DSN")
+# Поддержка: чат сотрудников (id группы), за сколько секунд склеиваются сообщения одного обращения
+# и пауза между сообщениями бота в чат (Telegram пропускает около 20 сообщений в минуту в одну группу)
+SUPPORT_CHAT_ID = int(os.getenv("SUPPORT_CHAT_ID", "0")) or None
+SUPPORT_COALESCE_SECONDS = float(os.getenv("SUPPORT_COALESCE_SECONDS", "5"))
+SUPPORT_STAFF_SEND_INTERVAL = float(os.getenv("SUPPORT_STAFF_SEND_INTERVAL", "3"))
+# Встроенный веб-сервер бота (пробы /healthz, /readyz, метрики /metrics и раздача локального хранилища)
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "8080"))
 
 
-if not API_TOKEN:
-    raise ValueError("Токен чат-бота не найден в .env файле. Проверьте настройку API_TOKEN.")
-if not API_DATABASE_KEY:
-    raise ValueError("Токен ключа базы данных не найден в .env файле. Проверьте настройку API_DATABASE_KEY.")
-if not DATABASE_URL:
-    raise ValueError("Токен URL базы данных не найден в .env файле. Проверьте настройку DATABASE_URL.")
+def validate_config():
+    """Проверяет настройки. Вызывается при запуске бота, чтобы импорт модулей работал и без .env."""
+    if not API_TOKEN:
+        raise ValueError("Токен чат-бота не найден в .env файле. Проверьте настройку API_TOKEN.")
+    if DATABASE_BACKEND not in ("supabase", "sqlite"):
+        raise ValueError("Неизвестный DATABASE_BACKEND. Допустимые значения: supabase, sqlite.")
+    if STORAGE_BACKEND not in ("supabase", "local", "s3"):
+        raise ValueError("Неизвестный STORAGE_BACKEND. Допустимые значения: supabase, local, s3.")
+    if STORAGE_BACKEND == "local" and not STORAGE_PUBLIC and not STORAGE_SIGNING_KEY:
+        raise ValueError("Для непубличного локального хранилища нужен STORAGE_SIGNING_KEY.")
+    if STORAGE_BACKEND == "s3" and not (S3_ACCESS_KEY and S3_SECRET_KEY):
+        raise ValueError("Для STORAGE_BACKEND=s3 нужны S3_ACCESS_KEY и S3_SECRET_KEY.")
+    if INVALIDATION_BACKEND not in ("local", "postgres", "supabase"):
+        raise ValueError("Неизвестный INVALIDATION_BACKEND. Допустимые значения: local, postgres, supabase.")
+    if INVALIDATION_BACKEND == "postgres" and not INVALIDATION_DSN:
+        raise ValueError("Для INVALIDATION_BACKEND=postgres нужен INVALIDATION_DSN.")
+    if "supabase" in (DATABASE_BACKEND, STORAGE_BACKEND, INVALIDATION_BACKEND):
+        if not API_DATABASE_KEY:
+            raise ValueError("Токен ключа базы данных не найден в .env файле. Проверьте настройку API_DATABASE_KEY.")
+        if not DATABASE_URL:
+            raise ValueError("Токен URL базы данных не найден в .env файле. Проверьте настройку DATABASE_URL.")
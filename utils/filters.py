@@ -2,10 +2,18 @@ from aiogram.filters import Filter
 from aiogram.types import Message
 from service.DataBaseService import get_user_role
 
-class RoleFilter(Filter):
-    def __init__(self, role: str):
-        self.role = role
+class MenuButtonFilter(Filter):
+    """
+    Кнопки главного меню: сначала дешёвая проверка текста по множеству, затем одно
+    получение роли и поиск обработчика по (роль, текст). Обработчик передаётся в handler как menu_action.
+    """
+    def __init__(self, routes: dict):
+        self.routes = routes
+        self.texts = frozenset(text for _, text in routes)
 
-    async def __call__(self, message: Message) -> bool:
-        user_role_from_db = await get_user_role(message.from_user.id) # <--- Получаем роль из БД
-        return user_role_from_db == self.role # <--- Сравниваем
\ No newline at end of file
+    async def __call__(self, message: Message) -> bool | dict:
+        if message.text not in self.texts:
+            return False
+        role = await get_user_role(message.from_user.id)
+        action = self.routes.get((role, message.text))
+        return {'menu_action': action} if action else False
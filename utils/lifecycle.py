@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """
+    Состояние процесса бота для проб и корректной остановки: готовность (прогрев завершён),
+    режим дренажа и счётчик незавершённой работы (апдейты в обработке, загрузки файлов).
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        # Этапы запуска (секунды от started_at): imports, dispatcher, ready, first_update
+        self.phases: dict[str, float] = {}
+        self.ready = False
+        self.draining = False
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def mark(self, phase: str):
+        """Запоминает момент завершения этапа запуска (повторные отметки игнорируются)."""
+        if phase not in self.phases:
+            self.phases[phase] = self.uptime
+            logger.info("Startup phase %s reached at %.3fs", phase, self.phases[phase])
+
+    @asynccontextmanager
+    async def track(self):
+        """Отмечает участок работы, который нельзя обрывать при остановке."""
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Переводит процесс в дренаж и ждёт завершения начатой работы не дольше timeout."""
+        self.draining = True
+        self.ready = False
+        logger.info("Draining %s in-flight operations (deadline %ss)", self._in_flight, timeout)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Drain deadline exceeded, %s operations still running", self._in_flight)
+            return False
+
+
+lifecycle = Lifecycle()
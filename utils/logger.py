@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+# Контекст текущего апдейта. Заполняется middleware из utils/Middleware.py,
+# у каждого апдейта (asyncio-задачи) своя копия контекста.
+update_id_var: ContextVar[int | None] = ContextVar("update_id", default=None)
+user_id_var: ContextVar[int | None] = ContextVar("user_id", default=None)
+handler_var: ContextVar[str | None] = ContextVar("handler", default=None)
+state_var: ContextVar[str | None] = ContextVar("state", default=None)
+
+CONTEXT_VARS = {
+    "update_id": update_id_var,
+    "user_id": user_id_var,
+    "handler": handler_var,
+    "state": state_var,
+}
+
+# Стандартные атрибуты LogRecord, которые не нужно дублировать в JSON как extra-поля
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def bind_context(**fields) -> dict:
+    """Устанавливает поля контекста логирования, возвращает токены для reset_context."""
+    return {name: CONTEXT_VARS[name].set(value) for name, value in fields.items()}
+
+
+def reset_context(tokens: dict):
+    """Возвращает поля контекста к значениям до bind_context."""
+    for name, token in tokens.items():
+        CONTEXT_VARS[name].reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Прикрепляет к записи поля контекста апдейта (update_id, user_id, handler, state)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, var in CONTEXT_VARS.items():
+            if not hasattr(record, name):
+                setattr(record, name, var.get())
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Ограничивает частоту однотипных записей (один логгер + один шаблон сообщения).
+    Пропускает не более `burst` записей за `interval` секунд, остальные отбрасывает;
+    число отброшенных попадает в поле `suppressed` следующей пропущенной записи.
+    Применяется только к записям уровня не выше `max_level`.
+    """
+
+    def __init__(self, burst: int = 5, interval: float = 1.0, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        self._windows: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                # [начало окна, пропущено в окне, отброшено с последней пропущенной записи]
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, suppressed]
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if window[2]:
+                record.suppressed = window[2]
+                window[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну JSON-строку."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in CONTEXT_VARS:
+            value = getattr(record, name, None)
+            if value is not None:
+                payload[name] = value
+        for name, value in vars(record).items():
+            if name not in _RESERVED_ATTRS and name not in payload and name not in CONTEXT_VARS:
+                payload[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler, который сохраняет traceback отдельным полем, а не склеивает его с сообщением.
+    Вызывается в потоке event loop, поэтому здесь же отрабатывают фильтры контекста и частоты.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: QueueListener | None = None
+
+
+def setup_logging(level: str | None = None) -> QueueListener:
+    """
+    Настраивает корневой логгер: записи уходят в очередь, а пишет их в stdout
+    фоновый поток QueueListener, так что медленный вывод не блокирует event loop.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(RateLimitFilter(
+        burst=int(os.getenv("LOG_RATE_LIMIT_BURST", "5")),
+        interval=float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "1.0")),
+    ))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Дописывает оставшиеся в очереди записи и останавливает фоновый поток."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
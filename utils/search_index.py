@@ -0,0 +1,165 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Hashable, Iterable
+
+_WORD_RE = re.compile(r"[0-9a-zа-я]+")
+_CYRILLIC_RE = re.compile(r"[а-я]")
+# Служебные слова, которые не несут смысла в поиске
+STOP_WORDS = frozenset("""
+    и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было вот
+    от меня еще нет о из ему теперь когда даже ну ли если уже или ни быть был него до вас нибудь опять уж
+    вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам чтоб без
+    будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один
+    почти мой тем чтобы нее были куда зачем всех никогда можно при наконец два об другой хоть после над
+    больше тот через эти нас про всего них какая много разве три эту моя впрочем хорошо свою этой перед
+    иногда лучше чуть том нельзя такой им более всегда конечно всю между
+""".split())
+# Окончания существительных, прилагательных и глаголов, от длинных к коротким
+_SUFFIXES = tuple(sorted("""
+    иями ями ами иях ях ах ией ей ой ий ый ая яя ое ее ые ие ую юю ого его ому ему ыми ими ом ем ов ев
+    ам ям ия ья ье ии ость ости остью ться тся ать ять ить еть ешь ете ите ует уют ают
+    а я о е ы и у ю ь й
+""".split(), key=len, reverse=True))
+_MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    """Лёгкий стемминг для русского: отрезает самое длинное окончание, оставляя основу от трёх букв."""
+    if not _CYRILLIC_RE.search(word):
+        return word
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Нормализует текст в список основ: нижний регистр, ё -> е, без стоп-слов."""
+    if not text:
+        return []
+    words = _WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс в памяти процесса. Документ - dict с текстовыми полями
+    (`fields`: имя поля -> вес) и полями-фасетами (`facets`: списки id для точной фильтрации).
+    Обновляется поштучно через upsert/remove, поиск не обращается к БД.
+    """
+
+    def __init__(self, fields: dict[str, float], facets: Iterable[str] = ()):
+        self.fields = fields
+        self.facets = tuple(facets)
+        self._docs: dict[Hashable, dict] = {}
+        self._terms: dict[Hashable, Counter] = {}
+        self._postings: dict[str, dict[Hashable, float]] = {}
+        self._facet_postings: dict[str, dict[Hashable, set]] = {facet: {} for facet in self.facets}
+        self._vocabulary: list[str] | None = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._docs
+
+    def get(self, doc_id) -> dict | None:
+        return self._docs.get(doc_id)
+
+    def upsert(self, doc_id, doc: dict):
+        """Добавляет документ или заменяет его прежнюю версию."""
+        self.remove(doc_id)
+        weights = Counter()
+        for field, weight in self.fields.items():
+            for term in tokenize(doc.get(field)):
+                weights[term] += weight
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                self._vocabulary = None
+            self._postings[term][doc_id] = weight
+        for facet in self.facets:
+            for value in doc.get(facet) or ():
+                self._facet_postings[facet].setdefault(value, set()).add(doc_id)
+        self._docs[doc_id] = doc
+        self._terms[doc_id] = weights
+
+    def remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary = None
+        for facet in self.facets:
+            for value in doc.get(facet) or ():
+                ids = self._facet_postings[facet].get(value)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._facet_postings[facet][value]
+
+    def _matching_terms(self, term: str) -> list[str]:
+        # Точное совпадение основы, иначе - все термы с таким префиксом (недописанное слово)
+        if term in self._postings:
+            return [term]
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect_left(self._vocabulary, term)
+        matches = []
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query: str = "", filters: dict | None = None, offset: int = 0, limit: int = 10,
+               tiebreak: Callable[[dict], float] | None = None) -> tuple[int, list[dict]]:
+        """
+        Возвращает (всего найдено, страница документов). Фильтры - {фасет: значение},
+        None-значения пропускаются. Все слова запроса должны встретиться в документе;
+        порядок - по релевантности (TF-IDF, с точностью 0.1), затем по tiebreak (меньше - выше).
+        """
+        candidates: set | None = None
+        for facet, value in (filters or {}).items():
+            if value is None:
+                continue
+            ids = self._facet_postings[facet].get(value, set())
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return 0, []
+
+        scores: dict | None = None
+        total_docs = len(self._docs) or 1
+        for term in dict.fromkeys(tokenize(query)):
+            term_scores: dict = {}
+            for matched in self._matching_terms(term):
+                postings = self._postings[matched]
+                idf = math.log(1 + total_docs / len(postings))
+                for doc_id, weight in postings.items():
+                    term_scores[doc_id] = term_scores.get(doc_id, 0.0) + idf * weight / (weight + 1)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items()
+                          if doc_id in term_scores}
+            if not scores:
+                return 0, []
+
+        if scores is None:
+            scores = dict.fromkeys(self._docs if candidates is None else candidates, 0.0)
+        elif candidates is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if doc_id in candidates}
+
+        def rank(doc_id):
+            # Близкие по релевантности документы упорядочивает tiebreak
+            return -round(scores[doc_id], 1), tiebreak(self._docs[doc_id]) if tiebreak else 0, str(doc_id)
+
+        page = heapq.nsmallest(offset + limit, scores, key=rank)[offset:]
+        return len(scores), [self._docs[doc_id] for doc_id in page]
@@ -0,0 +1,16 @@
+import json
+from pathlib import Path
+
+
+def load_state(path: Path) -> dict:
+    """Состояние возобновляемой задачи (выгрузки, рассылки); пустое, если файла ещё нет."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_state(path: Path, state: dict):
+    # Через временный файл: прерванная запись не портит состояние
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    tmp_path.write_text(json.dumps(state, indent=2), encoding='utf-8')
+    tmp_path.replace(path)
@@ -0,0 +1,82 @@
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class BucketRule:
+    """Параметры token bucket: ёмкость (допустимый всплеск) и скорость пополнения в токенах/сек."""
+    capacity: float
+    refill_rate: float
+
+
+# Общий лимит пользователя на любые сообщения и нажатия
+USER_RULE = BucketRule(capacity=20, refill_rate=3)
+# Лимит на одно действие (одинаковые callback без учёта id, например переключение чекбоксов предметов)
+CALLBACK_RULE = BucketRule(capacity=10, refill_rate=2)
+# Дорогие действия: загрузка файла и подтверждение заказа (скачивание, Storage, несколько запросов к БД)
+FILE_UPLOAD_RULE = BucketRule(capacity=10, refill_rate=0.5)
+TASK_CONFIRM_RULE = BucketRule(capacity=2, refill_rate=1 / 30)
+
+_DIGITS = re.compile(r'\d+')
+
+
+def callback_action(data: str | None) -> str:
+    """Ключ действия callback без идентификаторов: `sj1:r:i:12` -> `sj#:r:i:#`."""
+    return _DIGITS.sub('#', data or '')[:32]
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated', 'notified')
+
+    def __init__(self, rule: BucketRule, now: float):
+        self.tokens = rule.capacity
+        self.updated = now
+        # Сообщали ли пользователю о лимите с момента последнего успешного действия
+        self.notified = False
+
+    def allows(self, rule: BucketRule, now: float, cost: float = 1.0) -> bool:
+        """Пополняет корзину на момент now и проверяет, хватает ли токенов; сами токены не списываются."""
+        self.tokens = min(rule.capacity, self.tokens + (now - self.updated) * rule.refill_rate)
+        self.updated = now
+        return self.tokens >= cost
+
+    def take(self, cost: float = 1.0):
+        self.tokens -= cost
+        self.notified = False
+
+
+class BucketStore:
+    """
+    Набор token bucket с ограничением по памяти: давно не использованные корзины
+    (дольше idle_ttl) и самые старые сверх max_size вытесняются. Порядок OrderedDict -
+    порядок последнего обращения, поэтому вытеснение идёт с начала за O(1).
+    """
+
+    def __init__(self, max_size: int = 100_000, idle_ttl: float = 600.0):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._buckets: OrderedDict[tuple, TokenBucket] = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def get(self, key: tuple, rule: BucketRule, now: float | None = None) -> TokenBucket:
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rule, now)
+            self._evict(now)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _evict(self, now: float):
+        buckets = self._buckets
+        while buckets:
+            key, oldest = next(iter(buckets.items()))
+            if len(buckets) > self.max_size or now - oldest.updated > self.idle_ttl:
+                del buckets[key]
+            else:
+                break
@@ -0,0 +1,48 @@
+from typing import Hashable, Iterable
+
+
+def _normalize(text: str) -> str:
+    return text.lower().replace('ё', 'е')
+
+
+class PrefixTrie:
+    """
+    Префиксное дерево для поиска по началу слова. Значение добавляется под каждым словом
+    названия, и каждый узел хранит множество значений своего поддерева, поэтому поиск -
+    это проход по символам префикса без обхода дерева.
+    """
+    __slots__ = ('_root',)
+
+    def __init__(self):
+        self._root: dict = {'': set()}
+
+    def insert(self, text: str, value: Hashable):
+        """Индексирует значение под всеми словами текста (`Теория вероятностей` -> `теория`, `вероятностей`)."""
+        for word in _normalize(text).split():
+            node = self._root
+            node[''].add(value)
+            for char in word:
+                node = node.setdefault(char, {'': set()})
+                node[''].add(value)
+
+    def find(self, prefix: str) -> set:
+        """Значения, у которых какое-либо слово начинается с prefix (все слова префикса должны совпасть)."""
+        words = _normalize(prefix).split()
+        if not words:
+            return set(self._root[''])
+        result: set | None = None
+        for word in words:
+            node = self._root
+            for char in word:
+                node = node.get(char)
+                if node is None:
+                    return set()
+            result = set(node['']) if result is None else result & node['']
+        return result
+
+    @classmethod
+    def build(cls, items: Iterable[tuple[str, Hashable]]) -> 'PrefixTrie':
+        trie = cls()
+        for text, value in items:
+            trie.insert(text, value)
+        return trie
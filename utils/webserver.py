@@ -0,0 +1,49 @@
+import logging
+
+from aiohttp import web
+
+from utils.config import WEB_HOST, WEB_PORT, STORAGE_BACKEND, DB_PROFILE
+from utils.lifecycle import lifecycle
+
+logger = logging.getLogger(__name__)
+
+
+async def healthz(request: web.Request) -> web.Response:
+    """Liveness: процесс жив и event loop отвечает."""
+    return web.json_response({'status': 'ok'})
+
+
+async def readyz(request: web.Request) -> web.Response:
+    """Readiness: прогрев завершён и процесс не в дренаже."""
+    body = {'ready': lifecycle.ready, 'draining': lifecycle.draining, 'in_flight': lifecycle.in_flight}
+    return web.json_response(body, status=200 if lifecycle.ready else 503)
+
+
+async def metrics(request: web.Request) -> web.Response:
+    """Статистика именованных кэшей и, при DB_PROFILE, запросов к БД по обработчикам."""
+    from utils.cache import cache_stats
+    result = {'caches': cache_stats()}
+    if DB_PROFILE:
+        from database.profiler import profiler
+        result['queries'] = profiler.stats()
+    return web.json_response(result)
+
+
+def create_web_app() -> web.Application:
+    """Собирает aiohttp-приложение бота: пробы, метрики кэшей и раздача файлов локального хранилища."""
+    app = web.Application()
+    app.router.add_get('/healthz', healthz)
+    app.router.add_get('/readyz', readyz)
+    app.router.add_get('/metrics', metrics)
+    if STORAGE_BACKEND == 'local':
+        from storage.storage import get_storage
+        get_storage().setup_routes(app)
+    return app
+
+
+async def start_web_server(app: web.Application) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEB_HOST, WEB_PORT).start()
+    logger.info("Веб-сервер запущен на %s:%s", WEB_HOST, WEB_PORT)
+    return runner